@@ -0,0 +1,93 @@
+"""
+Local load test of the read API: latency percentiles and requests/sec with
+and without the in-process cache.
+
+    python -m benchmarks.bench_api [--requests 2000] [--concurrency 8]
+
+Needs the database from database.ini with a league season already loaded
+(league 9, 2024-2025). The server runs in this process on a free port.
+"""
+import sys
+import time
+import random
+import argparse
+import threading
+import http.client
+import numpy as np
+from pathlib import Path
+from concurrent.futures import ThreadPoolExecutor
+
+sys.path.append(str(Path(__file__).resolve().parent.parent))
+from connect import transaction
+from src.api.server import make_server
+
+LEAGUE_ID = '9'
+SEASON_ID = '2024-2025'
+
+def request_paths(n_requests, seed=0):
+    """
+    A bot/dashboard-like mix: top-N rankings, team squads, single players and team tables.
+    """
+    with transaction() as cur:
+        cur.execute("SELECT team_id FROM football.teams WHERE league_id = %s AND season_id = %s", (LEAGUE_ID, SEASON_ID))
+        team_ids = [row[0] for row in cur.fetchall()]
+        cur.execute("SELECT player_id FROM football.players WHERE league_id = %s AND season_id = %s LIMIT 50",
+                    (LEAGUE_ID, SEASON_ID))
+        player_ids = [row[0] for row in cur.fetchall()]
+
+    base = f'/leagues/{LEAGUE_ID}/seasons/{SEASON_ID}'
+    templates = [
+        lambda: f'{base}/players?order_by=xg&limit=10&table=player_shooting',
+        lambda: f'{base}/players?order_by=gls&limit=10',
+        lambda: f'{base}/players?team_id={random.choice(team_ids)}',
+        lambda: f'{base}/players/{random.choice(player_ids)}',
+        lambda: f'{base}/teams?table=general_stats',
+        lambda: f'{base}/teams/{random.choice(team_ids)}?table=shooting_stats',
+    ]
+    random.seed(seed)
+    return [random.choice(templates)() for _ in range(n_requests)]
+
+def run_client(port, paths):
+    conn = http.client.HTTPConnection('127.0.0.1', port)
+    latencies = []
+    for path in paths:
+        start = time.perf_counter()
+        conn.request('GET', path)
+        response = conn.getresponse()
+        response.read()
+        if response.status != 200:
+            raise RuntimeError(f'{path} returned {response.status}')
+        latencies.append(time.perf_counter() - start)
+    conn.close()
+    return latencies
+
+def load_test(paths, concurrency, use_cache):
+    server = make_server('127.0.0.1', 0, use_cache=use_cache)
+    port = server.server_address[1]
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    try:
+        start = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=concurrency) as executor:
+            results = executor.map(run_client, [port] * concurrency, [paths[i::concurrency] for i in range(concurrency)])
+            latencies = np.concatenate([np.array(result) for result in results])
+        elapsed = time.perf_counter() - start
+    finally:
+        server.shutdown()
+        server.server_close()
+    return latencies, elapsed
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--requests', type=int, default=2000)
+    parser.add_argument('--concurrency', type=int, default=8)
+    args = parser.parse_args()
+
+    paths = request_paths(args.requests)
+    print(f"{'mode':>9} {'p50 ms':>8} {'p99 ms':>8} {'req/s':>9}")
+    for mode, use_cache in [('no cache', False), ('cached', True)]:
+        latencies, elapsed = load_test(paths, args.concurrency, use_cache)
+        p50, p99 = np.percentile(latencies, [50, 99]) * 1000
+        print(f"{mode:>9} {p50:8.2f} {p99:8.2f} {len(latencies) / elapsed:9.0f}")
+
+if __name__ == '__main__':
+    main()
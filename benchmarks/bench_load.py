@@ -0,0 +1,64 @@
+"""
+Rows/sec of the COPY loader against cursor.executemany.
+
+    python -m benchmarks.bench_load [--rows 10000 100000] [--columns 30]
+
+Needs the database from database.ini (e.g. the docker-compose Postgres).
+Works in a scratch table football.bench_load whose transaction is rolled back.
+"""
+import sys
+import time
+import argparse
+import numpy as np
+import pandas as pd
+from pathlib import Path
+
+sys.path.append(str(Path(__file__).resolve().parent.parent))
+from connect import connection
+from src.load.load_stats import copy_dataframe
+
+def make_frame(n_rows, n_columns, seed=0):
+    rng = np.random.default_rng(seed)
+    df = pd.DataFrame(rng.integers(0, 300, size=(n_rows, n_columns)), columns=[f'stat_{i}' for i in range(n_columns)])
+    df.insert(0, 'player_id', [f'{i:08x}' for i in range(n_rows)])
+    return df
+
+def reset_table(cur, n_columns):
+    cur.execute("CREATE SCHEMA IF NOT EXISTS football")
+    cur.execute("DROP TABLE IF EXISTS football.bench_load")
+    stat_columns = ', '.join(f'stat_{i} INTEGER' for i in range(n_columns))
+    cur.execute(f"CREATE TABLE football.bench_load (player_id TEXT PRIMARY KEY, {stat_columns})")
+
+def time_executemany(cur, df):
+    insert_sql = f"INSERT INTO football.bench_load ({', '.join(df.columns)}) VALUES ({', '.join(['%s'] * len(df.columns))})"
+    rows = [tuple(row) for row in df.astype(object).itertuples(index=False)]
+    start = time.perf_counter()
+    cur.executemany(insert_sql, rows)
+    return time.perf_counter() - start
+
+def time_copy(cur, df):
+    start = time.perf_counter()
+    copy_dataframe(cur, df, 'bench_load')
+    return time.perf_counter() - start
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--rows', type=int, nargs='+', default=[10000, 100000])
+    parser.add_argument('--columns', type=int, default=30)
+    args = parser.parse_args()
+
+    with connection() as conn:
+        print(f"{'rows':>8} {'executemany rows/s':>19} {'COPY rows/s':>12} {'speedup':>8}")
+        for n_rows in args.rows:
+            df = make_frame(n_rows, args.columns)
+            with conn.cursor() as cur:
+                reset_table(cur, args.columns)
+                many = time_executemany(cur, df)
+                conn.rollback()
+                reset_table(cur, args.columns)
+                copy = time_copy(cur, df)
+                conn.rollback()
+            print(f"{n_rows:>8} {n_rows / many:19.0f} {n_rows / copy:12.0f} {many / copy:7.1f}x")
+
+if __name__ == '__main__':
+    main()
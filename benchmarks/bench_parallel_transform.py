@@ -0,0 +1,42 @@
+"""
+Speedup of the process-pool player transform at 1, 2, 4 and 8 workers.
+
+    python -m benchmarks.bench_parallel_transform [--players 40000] [--teams 80] [--workers 1 2 4 8]
+
+The synthetic input is split into one players_stats.json per team, like a
+multi-league backfill. Speedup is bounded by the number of CPU cores.
+"""
+import os
+import sys
+import time
+import argparse
+import tempfile
+from pathlib import Path
+
+sys.path.append(str(Path(__file__).resolve().parent.parent))
+from benchmarks.synthetic import write_player_files
+from src.transform.transform_player_stats import transform_player_stats
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--players', type=int, default=40000)
+    parser.add_argument('--teams', type=int, default=80)
+    parser.add_argument('--workers', type=int, nargs='+', default=[1, 2, 4, 8])
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        raw_dir = os.path.join(tmp_dir, 'raw')
+        write_player_files(raw_dir, args.players, n_teams=args.teams)
+
+        print(f"{args.players} players in {args.teams} files, {os.cpu_count()} CPUs")
+        print(f"{'workers':>8} {'seconds':>8} {'speedup':>8}")
+        baseline = None
+        for workers in args.workers:
+            start = time.perf_counter()
+            transform_player_stats(raw_dir, os.path.join(tmp_dir, f'processed_{workers}'), workers=workers)
+            elapsed = time.perf_counter() - start
+            baseline = baseline or elapsed
+            print(f"{workers:>8} {elapsed:8.2f} {baseline / elapsed:7.2f}x")
+
+if __name__ == '__main__':
+    main()
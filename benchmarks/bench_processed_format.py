@@ -0,0 +1,57 @@
+"""
+Round-trip benchmark of the processed hand-off: CSV vs partitioned Parquet.
+
+    python -m benchmarks.bench_processed_format [--players 50000] [--columns 6]
+
+Times writing every player section table, reading it back in full, and
+reading only --columns stat columns (what the loader does), and reports the
+size on disk.
+"""
+import os
+import sys
+import time
+import argparse
+import tempfile
+from pathlib import Path
+
+sys.path.append(str(Path(__file__).resolve().parent.parent))
+from benchmarks.synthetic import write_player_files
+from src.transform.transform_player_stats import transform_player_stats
+from src.transform.store import list_tables, read_columns, read_table
+
+def directory_size(directory):
+    return sum(os.path.getsize(os.path.join(root, name)) for root, _, names in os.walk(directory) for name in names)
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--players', type=int, default=50000)
+    parser.add_argument('--columns', type=int, default=6)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        raw_dir = os.path.join(tmp_dir, 'raw')
+        write_player_files(raw_dir, args.players)
+
+        print(f"{'format':>8} {'write (s)':>10} {'read all (s)':>13} {'read cols (s)':>14} {'disk MB':>8}")
+        for fmt in ('csv', 'parquet'):
+            output_dir = os.path.join(tmp_dir, fmt)
+            start = time.perf_counter()
+            transform_player_stats(raw_dir, output_dir, fmt=fmt)
+            write = time.perf_counter() - start
+
+            tables = list_tables(output_dir, '9', '2024-2025', fmt)
+            start = time.perf_counter()
+            for path in tables.values():
+                read_table(path)
+            read_all = time.perf_counter() - start
+
+            start = time.perf_counter()
+            for path in tables.values():
+                read_table(path, columns=['player_id'] + read_columns(path)[:args.columns])
+            read_cols = time.perf_counter() - start
+
+            size_mb = directory_size(output_dir) / 1024 / 1024
+            print(f"{fmt:>8} {write:10.2f} {read_all:13.2f} {read_cols:14.2f} {size_mb:8.1f}")
+
+if __name__ == '__main__':
+    main()
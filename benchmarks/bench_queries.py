@@ -0,0 +1,118 @@
+"""
+EXPLAIN ANALYZE timings of the FPL bot's typical queries against football.*.
+
+    python -m benchmarks.bench_queries [--extra-seasons 9] [--drop-indexes]
+
+Runs against the season already loaded (league 9, 2024-2025). --extra-seasons
+clones that season's teams, players, player_stats and player_shooting rows into
+more seasons first, so partition pruning and index use show up at a realistic
+size. --drop-indexes drops the secondary indexes to compare against sequential
+scans. Everything runs in one transaction that is rolled back.
+"""
+import sys
+import json
+import argparse
+from pathlib import Path
+from psycopg2 import sql
+
+sys.path.append(str(Path(__file__).resolve().parent.parent))
+from connect import connection
+from src.load.schema import ensure_partition, table_columns
+from src.load.load_stats import drop_secondary_indexes, load_league_season
+
+LEAGUE_ID = '9'
+SEASON_ID = '2024-2025'
+
+QUERIES = [
+    (
+        'top 10 by xG this season',
+        "SELECT player_id, xg FROM football.player_stats WHERE league_id = %(league)s AND season_id = %(season)s "
+        "ORDER BY xg DESC NULLS LAST LIMIT 10"
+    ),
+    (
+        'top 10 by xG per 90 (450+ min)',
+        "SELECT player_id, xg / NULLIF(min, 0) * 90 AS xg_p90 FROM football.player_stats "
+        "WHERE league_id = %(league)s AND season_id = %(season)s AND min >= 450 ORDER BY xg_p90 DESC NULLS LAST LIMIT 10"
+    ),
+    (
+        'all player stats for a team',
+        "SELECT * FROM football.player_stats WHERE team_id = %(team)s AND league_id = %(league)s AND season_id = %(season)s"
+    ),
+    (
+        'team squad joined to shooting',
+        "SELECT p.player_name, s.* FROM football.players p "
+        "JOIN football.player_shooting s USING (player_id, league_id, season_id) "
+        "WHERE p.team_id = %(team)s AND p.league_id = %(league)s AND p.season_id = %(season)s"
+    ),
+]
+
+CLONED_TABLES = ['player_stats', 'player_shooting']
+
+def clone_season(cur, season_id):
+    """
+    Copies the loaded season into season_id, for benchmarking at a larger size.
+    """
+    load_league_season(cur, LEAGUE_ID, season_id)
+    for table_name in ['teams', 'players'] + CLONED_TABLES:
+        if table_name in CLONED_TABLES:
+            ensure_partition(cur, table_name, LEAGUE_ID, season_id)
+        select_list = sql.SQL(', ').join(
+            sql.Literal(season_id) if col == 'season_id' else sql.Identifier(col)
+            for col in table_columns(cur, table_name)
+        )
+        cur.execute(
+            sql.SQL("INSERT INTO football.{} SELECT {} FROM football.{} WHERE league_id = %s AND season_id = %s").format(
+                sql.Identifier(table_name), select_list, sql.Identifier(table_name)),
+            (LEAGUE_ID, SEASON_ID)
+        )
+    cur.execute("ANALYZE")
+
+def plan_nodes(plan):
+    """
+    Flattens a JSON plan into 'Node Type on relation (index)' strings.
+    """
+    text = plan['Node Type']
+    if 'Relation Name' in plan:
+        text += f" on {plan['Relation Name']}"
+    if 'Index Name' in plan:
+        text += f" using {plan['Index Name']}"
+    nodes = [text]
+    for child in plan.get('Plans', []):
+        nodes.extend(plan_nodes(child))
+    return nodes
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--extra-seasons', type=int, default=0)
+    parser.add_argument('--drop-indexes', action='store_true')
+    args = parser.parse_args()
+
+    with connection() as conn:
+        with conn.cursor() as cur:
+            for offset in range(1, args.extra_seasons + 1):
+                start_year = int(SEASON_ID[:4]) - offset
+                clone_season(cur, f'{start_year}-{start_year + 1}')
+            if args.drop_indexes:
+                for table_name in ['players'] + CLONED_TABLES:
+                    drop_secondary_indexes(cur, table_name)
+                cur.execute("ANALYZE")
+
+            cur.execute(
+                "SELECT team_id FROM football.teams WHERE league_id = %s AND season_id = %s LIMIT 1",
+                (LEAGUE_ID, SEASON_ID)
+            )
+            params = {'league': LEAGUE_ID, 'season': SEASON_ID, 'team': cur.fetchone()[0]}
+
+            for name, query in QUERIES:
+                cur.execute(f"EXPLAIN (ANALYZE, BUFFERS, FORMAT JSON) {query}", params)
+                result = cur.fetchone()[0]
+                if isinstance(result, str):
+                    result = json.loads(result)
+                plan = result[0]
+                print(f"{name}: {plan['Execution Time']:.3f} ms")
+                for node in plan_nodes(plan['Plan']):
+                    print(f"    {node}")
+        conn.rollback()
+
+if __name__ == '__main__':
+    main()
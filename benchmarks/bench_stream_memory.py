@@ -0,0 +1,69 @@
+"""
+Peak-memory benchmark for streaming vs whole-file player transforms.
+
+    python -m benchmarks.bench_stream_memory [--sizes 5000 20000 80000] [--chunk-size 1000]
+
+Each size is written as a single players_stats.json and transformed in a
+fresh subprocess so ru_maxrss reflects only that run. Inputs are generated in
+a subprocess too, because Linux carries ru_maxrss over from the parent.
+"""
+import os
+import sys
+import time
+import argparse
+import resource
+import tempfile
+import subprocess
+from pathlib import Path
+
+sys.path.append(str(Path(__file__).resolve().parent.parent))
+from benchmarks.synthetic import write_player_files
+
+def run_child(raw_dir, out_dir, chunk_size):
+    from src.transform.transform_player_stats import transform_player_stats
+    start = time.perf_counter()
+    transform_player_stats(raw_dir, out_dir, chunk_size=chunk_size or None)
+    elapsed = time.perf_counter() - start
+    peak_mb = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+    print(f"{elapsed:.3f} {peak_mb:.1f}")
+
+def run_self(*args):
+    return subprocess.run(
+        [sys.executable, '-m', 'benchmarks.bench_stream_memory', *args],
+        check=True, capture_output=True, text=True, cwd=str(Path(__file__).resolve().parent.parent)
+    ).stdout.strip()
+
+def measure(raw_dir, out_dir, chunk_size):
+    output = run_self('--child', raw_dir, out_dir, str(chunk_size)).split()
+    return float(output[-2]), float(output[-1])
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--sizes', type=int, nargs='+', default=[5000, 20000, 80000])
+    parser.add_argument('--chunk-size', type=int, default=1000)
+    parser.add_argument('--child', nargs=3, help=argparse.SUPPRESS)
+    parser.add_argument('--generate', nargs=2, help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.generate:
+        raw_dir, n_players = args.generate
+        print(write_player_files(raw_dir, int(n_players), n_teams=1)[0])
+        return
+
+    if args.child:
+        raw_dir, out_dir, chunk_size = args.child
+        run_child(raw_dir, out_dir, int(chunk_size))
+        return
+
+    print(f"{'players':>8} {'file MB':>8} {'whole (s)':>10} {'whole MB':>9} {'stream (s)':>11} {'stream MB':>10}")
+    for n_players in args.sizes:
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            raw_dir = os.path.join(tmp_dir, 'raw')
+            player_file = run_self('--generate', raw_dir, str(n_players)).splitlines()[-1]
+            file_mb = os.path.getsize(player_file) / 1024 / 1024
+            whole_s, whole_mb = measure(raw_dir, os.path.join(tmp_dir, 'whole'), 0)
+            stream_s, stream_mb = measure(raw_dir, os.path.join(tmp_dir, 'stream'), args.chunk_size)
+        print(f"{n_players:>8} {file_mb:8.1f} {whole_s:10.2f} {whole_mb:9.1f} {stream_s:11.2f} {stream_mb:10.1f}")
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,70 @@
+"""
+Scaling benchmark for transform_player_stats on synthetic inputs.
+
+    python -m benchmarks.bench_transform_player_stats [--sizes 500 5000 50000] [--legacy-max 5000]
+
+The legacy per-player pd.concat implementation is timed alongside for sizes
+up to --legacy-max, since it grows quadratically and takes too long beyond that.
+"""
+import os
+import sys
+import glob
+import json
+import time
+import argparse
+import tempfile
+import pandas as pd
+from pathlib import Path
+
+sys.path.append(str(Path(__file__).resolve().parent.parent))
+from benchmarks.synthetic import write_player_files
+from src.transform.transform_player_stats import PLAYER_SECTIONS, transform_player_stats
+
+def legacy_transform(input_dir):
+    """
+    The previous implementation: one pd.json_normalize and pd.concat per player and section.
+    """
+    frames = {table_name: pd.DataFrame() for _, _, table_name in PLAYER_SECTIONS}
+    for input_file in glob.glob(os.path.join(input_dir, '*', 'players_stats.json')):
+        team_name = os.path.basename(os.path.dirname(input_file))
+        with open(input_file, 'r') as file:
+            raw_data = json.load(file)
+        for player_data in raw_data['players']:
+            for key, section, table_name in PLAYER_SECTIONS:
+                stats = pd.json_normalize(player_data['stats'][key])
+                stats['player_id'] = player_data['meta_data']['player_id']
+                stats['player_name'] = player_data['meta_data']['player_name']
+                stats['team_name'] = team_name
+                stats['player_country_code'] = player_data['meta_data']['player_country_code']
+                stats['player_age'] = player_data['meta_data']['age']
+                stats['section'] = section
+                frames[table_name] = pd.concat([frames[table_name], stats], ignore_index=True)
+    return frames
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--sizes', type=int, nargs='+', default=[500, 5000, 50000])
+    parser.add_argument('--legacy-max', type=int, default=5000)
+    args = parser.parse_args()
+
+    print(f"{'players':>8} {'columnar (s)':>13} {'legacy (s)':>11}")
+    for n_players in args.sizes:
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            raw_dir = os.path.join(tmp_dir, 'raw')
+            write_player_files(raw_dir, n_players)
+
+            start = time.perf_counter()
+            transform_player_stats(raw_dir, os.path.join(tmp_dir, 'processed'))
+            columnar = time.perf_counter() - start
+
+            legacy = None
+            if n_players <= args.legacy_max:
+                start = time.perf_counter()
+                legacy_transform(raw_dir)
+                legacy = time.perf_counter() - start
+
+        legacy_text = f'{legacy:11.2f}' if legacy is not None else f"{'skipped':>11}"
+        print(f"{n_players:>8} {columnar:13.2f} {legacy_text}")
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,310 @@
+"""
+End-to-end benchmark suite: time and peak memory of every pipeline stage at
+several data sizes, saved as JSON and compared against a baseline.
+
+    python -m benchmarks.suite [--scales small medium large] [--stages transform_players load]
+                               [--baseline data/benchmarks/baseline.json] [--threshold 0.2]
+                               [--save-baseline]
+
+Each scale generates FBref-shaped raw data (teams x players x seasons), then
+runs transform_team_stats, transform_player_stats, create_table_from_csv and
+load_stats season by season. Every stage runs in a fresh subprocess, so its
+peak RSS is its own; the Python heap peak is measured with tracemalloc around
+the timed call only.
+
+The database stages need database.ini. They run in a scratch database
+(<database>_bench) that is created for each scale and dropped afterwards, so
+the real football schema, its migrations and the schema type cache are never
+touched. Without a database they are skipped.
+"""
+import os
+import sys
+import json
+import time
+import argparse
+import platform
+import resource
+import tempfile
+import subprocess
+import tracemalloc
+from datetime import datetime, timezone
+from pathlib import Path
+
+sys.path.append(str(Path(__file__).resolve().parent.parent))
+
+# (teams, players per team, seasons)
+SCALES = {
+    'small': (20, 25, 1),
+    'medium': (100, 30, 2),
+    'large': (400, 30, 4),
+}
+STAGES = ['transform_teams', 'transform_players', 'create_tables', 'load']
+TRANSFORM_STAGES = ['transform_teams', 'transform_players']
+DATABASE_STAGES = ['create_tables', 'load']
+LEAGUE_ID = 'bench'
+LAST_SEASON_START = 2024
+
+RESULTS_DIR = 'data/benchmarks'
+BASELINE_FILE = os.path.join(RESULTS_DIR, 'baseline.json')
+# A stage is a regression when it is this much slower (or uses this much more memory) than the baseline.
+THRESHOLD = 0.2
+
+def season_ids(n_seasons):
+    return [f'{year}-{year + 1}' for year in range(LAST_SEASON_START - n_seasons + 1, LAST_SEASON_START + 1)]
+
+def processed_dir(workdir, kind):
+    return os.path.join(workdir, 'processed', kind)
+
+def season_dir(workdir, season_id):
+    return os.path.join(workdir, 'raw', f'league={LEAGUE_ID}', f'season={season_id}')
+
+def child_transform_teams(workdir, season_id):
+    from src.transform.transform_team_stats import transform_team_stats
+    yield
+    frames = transform_team_stats(os.path.join(season_dir(workdir, season_id), 'team_stats.json'),
+                                  processed_dir(workdir, 'team_stats'), league_id=LEAGUE_ID, season_id=season_id)
+    yield sum(len(df) for df in frames.values())
+
+def child_transform_players(workdir, season_id):
+    from src.transform.transform_player_stats import transform_player_stats
+    yield
+    frames = transform_player_stats(season_dir(workdir, season_id), processed_dir(workdir, 'player_stats'),
+                                    league_id=LEAGUE_ID, season_id=season_id)
+    yield sum(len(df) for df in frames.values())
+
+def child_create_tables(workdir, season_id):
+    """
+    Writes the processed tables out as bench_<table>.csv first (untimed), then
+    times create_table_from_csv on each, inside a transaction that is rolled back.
+    """
+    from connect import connection
+    from src.load import type_inference
+    from src.load.schema import create_reference_tables, create_table_from_csv
+    from src.transform.store import list_tables, read_table
+
+    type_inference.SCHEMA_CACHE_FILE = os.path.join(workdir, 'schema_types.json')
+    csv_files = []
+    for kind, table_type in [('team_stats', 'team'), ('player_stats', 'player')]:
+        for table_name, path in list_tables(processed_dir(workdir, kind), LEAGUE_ID, season_id).items():
+            csv_file = os.path.join(workdir, 'csv', f'bench_{table_name}.csv')
+            os.makedirs(os.path.dirname(csv_file), exist_ok=True)
+            read_table(path).to_csv(csv_file, index=False)
+            csv_files.append((csv_file, table_type))
+
+    with connection() as conn:
+        with conn.cursor() as cur:
+            cur.execute("CREATE SCHEMA IF NOT EXISTS football")
+            create_reference_tables(cur)
+            yield
+            for csv_file, table_type in csv_files:
+                create_table_from_csv(cur, csv_file, table_type)
+            yield len(csv_files)
+        conn.rollback()
+
+def child_load(workdir, season_id):
+    from connect import transaction
+    from src.load import type_inference
+    from src.load.schema import create_reference_tables, create_team_stats_tables, create_player_stats_tables
+    from src.load.load_stats import load_stats
+
+    type_inference.SCHEMA_CACHE_FILE = os.path.join(workdir, 'schema_types.json')
+    with transaction() as cur:
+        cur.execute("CREATE SCHEMA IF NOT EXISTS football")
+        create_reference_tables(cur)
+        create_team_stats_tables(cur, processed_dir(workdir, 'team_stats'), LEAGUE_ID, season_id)
+        create_player_stats_tables(cur, processed_dir(workdir, 'player_stats'), LEAGUE_ID, season_id)
+    yield
+    loaded = load_stats(LEAGUE_ID, season_id, processed_dir=os.path.join(workdir, 'processed'))
+    yield sum(loaded.values())
+
+CHILDREN = {
+    'transform_teams': child_transform_teams,
+    'transform_players': child_transform_players,
+    'create_tables': child_create_tables,
+    'load': child_load,
+}
+
+def run_child(stage, workdir, season_id):
+    """
+    Runs one stage for one season in this (fresh) process. Each child function
+    yields once when its setup is done and then yields its row count, so only
+    the stage call itself is timed. Prints one JSON line with the measurements.
+    """
+    if stage in DATABASE_STAGES:
+        from connect import get_pool
+        # Created first, so every pooled connection of this process goes to the scratch database.
+        get_pool(scratch_config())
+    steps = CHILDREN[stage](workdir, season_id)
+    next(steps)
+    tracemalloc.start()
+    start = time.perf_counter()
+    rows = next(steps)
+    seconds = time.perf_counter() - start
+    _, py_peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    steps.close()
+    print(json.dumps({
+        'seconds': seconds,
+        'rows': rows,
+        'py_peak_mb': py_peak / 1024 / 1024,
+        'rss_peak_mb': resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024,
+    }))
+
+def run_self(workdir, *args):
+    """
+    Runs this module in a subprocess and returns the JSON it printed last. The
+    child keeps its manifest in workdir so the real one is left untouched.
+    """
+    env = dict(os.environ, ETL_MANIFEST_FILE=os.path.join(workdir, 'manifest.json'))
+    completed = subprocess.run([sys.executable, '-m', 'benchmarks.suite', *args], env=env,
+                               capture_output=True, text=True, cwd=Path(__file__).resolve().parent.parent)
+    if completed.returncode != 0:
+        raise RuntimeError(f"{' '.join(args[:2])} failed:\n{completed.stderr.strip()}")
+    return json.loads(completed.stdout.strip().splitlines()[-1])
+
+def generate(workdir, n_teams, players_per_team, n_seasons):
+    from benchmarks.synthetic import write_raw_dataset
+    write_raw_dataset(os.path.join(workdir, 'raw'), LEAGUE_ID, season_ids(n_seasons), n_teams, players_per_team)
+    print(json.dumps({'seasons': n_seasons}))
+
+def scratch_config():
+    """
+    database.ini settings with the database replaced by <database>_bench.
+    """
+    from config import load_config
+    config = load_config()
+    name = config.pop('database', None) or config.pop('dbname')
+    config['dbname'] = f'{name}_bench'
+    return config
+
+def recreate_scratch_database(create=True):
+    """
+    Drops the scratch database and, unless create is False, creates it again empty.
+    """
+    from psycopg2 import sql
+    from connect import connect
+    conn = connect()
+    # CREATE/DROP DATABASE cannot run inside a transaction block.
+    conn.autocommit = True
+    try:
+        with conn.cursor() as cur:
+            name = sql.Identifier(scratch_config()['dbname'])
+            cur.execute(sql.SQL("DROP DATABASE IF EXISTS {} WITH (FORCE)").format(name))
+            if create:
+                cur.execute(sql.SQL("CREATE DATABASE {}").format(name))
+    finally:
+        conn.close()
+
+def database_available():
+    try:
+        from connect import connect
+        connect().close()
+        return True
+    except Exception as e:
+        print(f"Database unavailable, skipping {', '.join(DATABASE_STAGES)}: {e}")
+        return False
+
+def run_scale(scale, stages):
+    """
+    Returns:
+        dict: Stage -> seconds and rows summed over the seasons, and the largest peaks.
+    """
+    n_teams, players_per_team, n_seasons = SCALES[scale]
+    results = {}
+    use_database = any(stage in DATABASE_STAGES for stage in stages)
+    with tempfile.TemporaryDirectory() as workdir:
+        run_self(workdir, '--generate', workdir, str(n_teams), str(players_per_team), str(n_seasons))
+        if use_database:
+            recreate_scratch_database()
+        try:
+            # The transforms write the processed files every later stage reads, so they always run.
+            for stage in [stage for stage in STAGES if stage in stages or stage in TRANSFORM_STAGES]:
+                totals = {'seconds': 0.0, 'rows': 0, 'py_peak_mb': 0.0, 'rss_peak_mb': 0.0}
+                for season_id in season_ids(n_seasons):
+                    measured = run_self(workdir, '--child', stage, workdir, season_id)
+                    totals['seconds'] += measured['seconds']
+                    totals['rows'] += measured['rows']
+                    totals['py_peak_mb'] = max(totals['py_peak_mb'], measured['py_peak_mb'])
+                    totals['rss_peak_mb'] = max(totals['rss_peak_mb'], measured['rss_peak_mb'])
+                if stage not in stages:
+                    continue
+                results[stage] = totals
+                print(f"{scale:>7} {stage:<18} {totals['seconds']:8.3f}s {totals['rows']:>9} rows "
+                      f"{totals['py_peak_mb']:8.1f} MB heap {totals['rss_peak_mb']:8.1f} MB RSS")
+        finally:
+            if use_database:
+                recreate_scratch_database(create=False)
+    return results
+
+def compare(results, baseline, threshold=THRESHOLD):
+    """
+    Compares seconds and heap peaks with the baseline.
+
+    Returns:
+        list: One message per stage that regressed by more than threshold.
+    """
+    regressions = []
+    print(f"\n{'scale':>7} {'stage':<18} {'baseline s':>10} {'now s':>8} {'change':>8}")
+    for scale, stages in results.items():
+        for stage, measured in stages.items():
+            previous = baseline.get('results', {}).get(scale, {}).get(stage)
+            if previous is None:
+                continue
+            change = measured['seconds'] / previous['seconds'] - 1 if previous['seconds'] else 0.0
+            print(f"{scale:>7} {stage:<18} {previous['seconds']:10.3f} {measured['seconds']:8.3f} {change:+8.1%}")
+            if change > threshold:
+                regressions.append(f"{scale}/{stage}: {change:+.1%} time")
+            if previous['py_peak_mb'] and measured['py_peak_mb'] / previous['py_peak_mb'] - 1 > threshold:
+                regressions.append(f"{scale}/{stage}: {measured['py_peak_mb'] / previous['py_peak_mb'] - 1:+.1%} memory")
+    return regressions
+
+def save_results(results, path):
+    os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+    with open(path, 'w') as f:
+        json.dump(results, f, indent=2)
+    print(f"Results saved to {path}")
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--scales', nargs='+', choices=list(SCALES), default=['small', 'medium'])
+    parser.add_argument('--stages', nargs='+', choices=STAGES, default=STAGES)
+    parser.add_argument('--output', help='Results file (default data/benchmarks/<timestamp>.json).')
+    parser.add_argument('--baseline', default=BASELINE_FILE)
+    parser.add_argument('--threshold', type=float, default=THRESHOLD)
+    parser.add_argument('--save-baseline', action='store_true', help='Also store these results as the baseline.')
+    args = parser.parse_args()
+
+    stages = list(args.stages)
+    if any(stage in DATABASE_STAGES for stage in stages) and not database_available():
+        stages = [stage for stage in stages if stage not in DATABASE_STAGES]
+
+    started = datetime.now(timezone.utc)
+    results = {
+        'meta': {
+            'started': started.isoformat(),
+            'python': platform.python_version(),
+            'platform': platform.platform(),
+            'cpus': os.cpu_count(),
+            'scales': {scale: SCALES[scale] for scale in args.scales},
+        },
+        'results': {scale: run_scale(scale, stages) for scale in args.scales},
+    }
+    save_results(results, args.output or os.path.join(RESULTS_DIR, f"{started:%Y%m%dT%H%M%S}.json"))
+
+    if args.save_baseline:
+        save_results(results, args.baseline)
+    elif os.path.exists(args.baseline):
+        with open(args.baseline, 'r') as f:
+            regressions = compare(results['results'], json.load(f), args.threshold)
+        if regressions:
+            print(f"Regressions over {args.threshold:.0%}: " + '; '.join(regressions))
+            sys.exit(1)
+        print(f"No regressions over {args.threshold:.0%}.")
+
+if __name__ == '__main__':
+    if len(sys.argv) > 1 and sys.argv[1] == '--child':
+        run_child(*sys.argv[2:5])
+    elif len(sys.argv) > 1 and sys.argv[1] == '--generate':
+        generate(sys.argv[2], *map(int, sys.argv[3:6]))
+    else:
+        main()
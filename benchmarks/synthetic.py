@@ -0,0 +1,128 @@
+import os
+import json
+import random
+
+# Stat names per section, shaped like the FBref player-season-stats payload.
+PLAYER_SECTION_FIELDS = {
+    'stats': ['games_played', 'games_starts', 'min', 'gls', 'ast', 'non_pen_gls', 'pk_made', 'pk_att',
+              'yellow_cards', 'red_cards', 'xg', 'non_pen_xg', 'xg_assist', 'pass_prog', 'carries_prog'],
+    'shooting': ['shots', 'shots_on_target', 'pct_shots_on_target', 'shots_p90', 'avg_shot_dist', 'fk_shots',
+                 'xg', 'non_pen_xg', 'non_pen_xg_per_shot'],
+    'passing': ['pass_cmp', 'pass_att', 'pct_pass_cmp', 'pass_ttl_dist', 'pass_prog_ttl_dist', 'xa',
+                'key_passes', 'pass_fthird', 'pass_opp_box', 'cross_opp_box'],
+    'passing_types': ['pass_live', 'pass_dead', 'pass_fk', 'through_balls', 'switches', 'crosses',
+                      'throw_ins', 'corner_kicks', 'pass_offside', 'pass_blocked'],
+    'gca': ['ttl_sca', 'sca_p90', 'sca_pass_live', 'sca_pass_dead', 'ttl_gca', 'gca_p90', 'gca_pass_live'],
+    'defense': ['ttl_tkl', 'tkl_won', 'tkl_def_third', 'tkl_mid_third', 'tkl_att_third', 'blocks',
+                'int', 'clearances', 'def_error'],
+    'possession': ['touches', 'touch_def_box', 'touch_att_box', 'take_on_att', 'take_on_suc',
+                   'carries', 'ttl_carries_dist', 'miscontrols', 'dispossessed'],
+    'playingtime': ['games_played', 'min', 'pct_squad_min', 'games_starts', 'games_subs', 'ppm',
+                    'on_goals_for', 'on_goals_ag', 'xg_plus_minus'],
+    'misc': ['yellow_cards', 'red_cards', 'fls_com', 'fls_drawn', 'offside', 'pk_won', 'pk_conceded',
+             'og', 'ball_recov', 'air_dual_won', 'air_dual_lost'],
+}
+
+def _stat_value(rng, field):
+    if field.startswith('pct_') or field.endswith('_p90') or field.startswith('xg') or field in ('xa', 'ppm'):
+        return round(rng.uniform(0, 100), 2)
+    return rng.randint(0, 300)
+
+def make_player(rng, player_id):
+    return {
+        'meta_data': {
+            'player_id': player_id,
+            'player_name': f'Player {player_id}',
+            'player_country_code': rng.choice(['ENG', 'FRA', 'ESP', 'BRA', 'NED', 'POR']),
+            'age': rng.randint(17, 38),
+        },
+        'stats': {
+            section: {field: _stat_value(rng, field) for field in fields}
+            for section, fields in PLAYER_SECTION_FIELDS.items()
+        },
+    }
+
+def write_player_files(root_dir, n_players, n_teams=20, seed=0):
+    """
+    Writes <root_dir>/<team_name>/players_stats.json for n_teams teams with
+    n_players spread across them. Returns the list of files written.
+    """
+    rng = random.Random(seed)
+    files = []
+    for team in range(n_teams):
+        team_players = range(team, n_players, n_teams)
+        payload = {'players': [make_player(rng, f'{player:08x}') for player in team_players]}
+        filename = os.path.join(root_dir, f'Team {team:02d}', 'players_stats.json')
+        os.makedirs(os.path.dirname(filename), exist_ok=True)
+        with open(filename, 'w') as f:
+            json.dump(payload, f)
+        files.append(filename)
+    return files
+
+TEAM_SECTION_FIELDS = dict(PLAYER_SECTION_FIELDS, **{
+    'keepers': ['ga', 'ga90', 'sot_ag', 'saves', 'pct_saves', 'w', 'd', 'l', 'clean_sheets', 'pct_clean_sheets'],
+    'keepersadv': ['ga', 'pk_ag', 'fk_ag', 'ck_ag', 'og_ag', 'ps_xg', 'ps_xg_per_sot', 'launch_cmp',
+                   'launch_att', 'pct_launch_cmp'],
+})
+
+def make_team(rng, team_id):
+    return {
+        'meta_data': {
+            'team_id': team_id,
+            'team_name': f'Team {team_id}',
+        },
+        'stats': {
+            section: {field: _stat_value(rng, field) for field in fields}
+            for section, fields in TEAM_SECTION_FIELDS.items()
+        },
+    }
+
+def write_team_file(filename, n_teams=20, seed=0):
+    """
+    Writes a team-season-stats payload with n_teams teams to filename.
+    """
+    rng = random.Random(seed)
+    payload = {'data': [make_team(rng, f'{team:08x}') for team in range(n_teams)]}
+    os.makedirs(os.path.dirname(filename), exist_ok=True)
+    with open(filename, 'w') as f:
+        json.dump(payload, f)
+    return filename
+
+def write_raw_season(season_dir, n_teams=20, players_per_team=25, seed=0):
+    """
+    Writes one league season in the raw layout the extract step produces:
+    <season_dir>/team_stats.json and <season_dir>/<team_name>/players_stats.json
+    for every team, with team names that match between the two.
+
+    Returns:
+        list: The files written.
+    """
+    rng = random.Random(seed)
+    teams = [make_team(rng, f'{team:08x}') for team in range(n_teams)]
+    files = [os.path.join(season_dir, 'team_stats.json')]
+    os.makedirs(season_dir, exist_ok=True)
+    with open(files[0], 'w') as f:
+        json.dump({'data': teams}, f)
+
+    for team in teams:
+        team_id = team['meta_data']['team_id']
+        payload = {'players': [make_player(rng, f'{team_id[-4:]}{player:04x}') for player in range(players_per_team)]}
+        filename = os.path.join(season_dir, team['meta_data']['team_name'], 'players_stats.json')
+        os.makedirs(os.path.dirname(filename), exist_ok=True)
+        with open(filename, 'w') as f:
+            json.dump(payload, f)
+        files.append(filename)
+    return files
+
+def write_raw_dataset(raw_dir, league_id='9', seasons=('2024-2025',), n_teams=20, players_per_team=25, seed=0):
+    """
+    Writes several seasons of one league under <raw_dir>/league=<id>/season=<id>/.
+
+    Returns:
+        dict: Season id -> season directory.
+    """
+    season_dirs = {}
+    for offset, season_id in enumerate(seasons):
+        season_dirs[season_id] = os.path.join(raw_dir, f'league={league_id}', f'season={season_id}')
+        write_raw_season(season_dirs[season_id], n_teams, players_per_team, seed + offset)
+    return season_dirs
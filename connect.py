@@ -1,15 +1,168 @@
+import os
+import time
+import threading
+from contextlib import contextmanager
 import psycopg2
+from psycopg2 import pool
+from psycopg2.extensions import cursor as base_cursor
 from config import load_config
+from src.metrics import observe
 
-def connect(config):
+MIN_CONNECTIONS = int(os.getenv('DB_POOL_MIN', '1'))
+MAX_CONNECTIONS = int(os.getenv('DB_POOL_MAX', '8'))
+# Milliseconds before a statement is cancelled; 0 means no limit.
+STATEMENT_TIMEOUT_MS = int(os.getenv('DB_STATEMENT_TIMEOUT_MS', '0'))
 
-    try:
-        with psycopg2.connect(**config) as conn:
+_pool = None
+_slots = threading.BoundedSemaphore(MAX_CONNECTIONS)
+_lock = threading.Lock()
+_metrics = {
+    'checkouts': 0,
+    'in_use': 0,
+    'wait_seconds': 0.0,
+    'max_wait_seconds': 0.0,
+}
+
+
+class TimedCursor(base_cursor):
+    """
+    Cursor that records every statement's duration in the db_statement_seconds
+    histogram, labelled by its leading keyword (SELECT, INSERT, COPY, ...).
+    """
+
+    def _observe(self, start, verb=None):
+        if verb is None:
+            verb = self.query.split(None, 1)[0].decode().upper() if self.query else 'UNKNOWN'
+        observe('db_statement_seconds', time.perf_counter() - start, statement=verb)
+
+    def execute(self, query, vars=None):
+        start = time.perf_counter()
+        try:
+            return super().execute(query, vars)
+        finally:
+            self._observe(start)
+
+    def executemany(self, query, vars_list):
+        start = time.perf_counter()
+        try:
+            return super().executemany(query, vars_list)
+        finally:
+            self._observe(start)
+
+    def copy_expert(self, sql, file, size=8192):
+        start = time.perf_counter()
+        try:
+            return super().copy_expert(sql, file, size)
+        finally:
+            self._observe(start, 'COPY')
+
+
+def connect(config=None):
+    """
+    Opens a standalone connection. Prefer connection()/transaction(), which
+    reuse pooled connections.
+    """
+    return psycopg2.connect(cursor_factory=TimedCursor, **(config or load_config()))
+
+def get_pool(config=None):
+    """
+    Returns the process-wide ThreadedConnectionPool, creating it on first use.
+    """
+    global _pool
+    with _lock:
+        if _pool is None:
+            _pool = pool.ThreadedConnectionPool(MIN_CONNECTIONS, MAX_CONNECTIONS, cursor_factory=TimedCursor,
+                                                **(config or load_config()))
             print('Connected to the PostgreSQL database')
-            return conn
-    except (psycopg2.DatabaseError, Exception) as error:
-        print(f'Error connecting to the database: {error}')
+        return _pool
+
+def close_pool():
+    global _pool
+    with _lock:
+        if _pool is not None:
+            _pool.closeall()
+            _pool = None
+
+@contextmanager
+def connection():
+    """
+    Checks a connection out of the pool and returns it afterwards. When every
+    connection is in use this waits for one instead of failing.
+    """
+    start = time.perf_counter()
+    _slots.acquire()
+    waited = time.perf_counter() - start
+    try:
+        conn = get_pool().getconn()
+    except Exception:
+        _slots.release()
+        raise
+    with _lock:
+        _metrics['checkouts'] += 1
+        _metrics['in_use'] += 1
+        _metrics['wait_seconds'] += waited
+        _metrics['max_wait_seconds'] = max(_metrics['max_wait_seconds'], waited)
+    try:
+        yield conn
+    finally:
+        if not conn.closed and conn.get_transaction_status() != psycopg2.extensions.TRANSACTION_STATUS_IDLE:
+            conn.rollback()
+        get_pool().putconn(conn, close=bool(conn.closed))
+        with _lock:
+            _metrics['in_use'] -= 1
+        _slots.release()
+
+@contextmanager
+def transaction(statement_timeout=STATEMENT_TIMEOUT_MS):
+    """
+    Yields a cursor inside a transaction on a pooled connection. Commits on
+    success and rolls back if the block raises.
+
+    Args:
+        statement_timeout (int): Milliseconds before a statement is cancelled; 0 means no limit.
+    """
+    with connection() as conn:
+        try:
+            with conn.cursor() as cur:
+                if statement_timeout:
+                    cur.execute("SET LOCAL statement_timeout = %s", (int(statement_timeout),))
+                yield cur
+            conn.commit()
+        except Exception:
+            conn.rollback()
+            raise
+
+@contextmanager
+def server_side_cursor(query, params=None, itersize=2000, statement_timeout=STATEMENT_TIMEOUT_MS):
+    """
+    Runs a query on a named (server-side) cursor so large results are fetched
+    itersize rows at a time instead of all at once. Iterate over the yielded cursor.
+    """
+    with connection() as conn:
+        try:
+            if statement_timeout:
+                with conn.cursor() as cur:
+                    cur.execute("SET LOCAL statement_timeout = %s", (int(statement_timeout),))
+            with conn.cursor(name=f'read_{threading.get_ident()}_{time.monotonic_ns()}') as cur:
+                cur.itersize = itersize
+                cur.execute(query, params)
+                yield cur
+            conn.commit()
+        except Exception:
+            conn.rollback()
+            raise
+
+def pool_metrics():
+    """
+    Checkout count, connections in use and time spent waiting for a free connection.
+    """
+    with _lock:
+        metrics = dict(_metrics)
+    metrics['avg_wait_seconds'] = metrics['wait_seconds'] / metrics['checkouts'] if metrics['checkouts'] else 0.0
+    return metrics
 
 if __name__ == '__main__':
-    config = load_config()
-    connect(config)
\ No newline at end of file
+    with transaction() as cur:
+        cur.execute('SELECT version()')
+        print(cur.fetchone()[0])
+    print(pool_metrics())
@@ -0,0 +1,265 @@
+import os
+import sys
+import json
+import time
+import select
+import hashlib
+import decimal
+import threading
+from pathlib import Path
+from collections import OrderedDict
+from psycopg2 import sql
+
+sys.path.append(str(Path(__file__).resolve().parent.parent.parent))
+from connect import connect, server_side_cursor, transaction
+from src.load.schema import table_columns
+from src.load.load_stats import LOAD_CHANNEL
+from src.transform.transform_player_stats import PLAYER_SECTIONS
+from src.transform.transform_team_stats import TEAM_SECTIONS
+
+API_CACHE_ENTRIES = int(os.getenv('API_CACHE_ENTRIES', '1024'))
+# Seconds a cached result is served before it is queried again, even without a new load.
+API_CACHE_TTL = float(os.getenv('API_CACHE_TTL', '300'))
+MAX_LIMIT = 1000
+# Results that may hold more rows than this are read through a server-side cursor, this many rows at a time.
+API_FETCH_SIZE = int(os.getenv('API_FETCH_SIZE', '200'))
+# Longest wait between attempts to reconnect the load listener.
+LISTEN_BACKOFF_MAX = float(os.getenv('API_LISTEN_BACKOFF_MAX', '60'))
+
+PLAYER_TABLES = [table_name for _, _, table_name in PLAYER_SECTIONS]
+TEAM_TABLES = [table_name for _, table_name in TEAM_SECTIONS]
+
+
+class QueryError(ValueError):
+    """
+    A request that names an unknown table or column, or has an invalid parameter.
+    """
+
+
+class QueryCache:
+    """
+    In-process LRU cache of serialised query results with a TTL. Every entry
+    keeps its body and ETag so repeated requests never touch the database.
+    """
+
+    def __init__(self, max_entries=API_CACHE_ENTRIES, ttl=API_CACHE_TTL):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.entries = OrderedDict()
+        # Bumped by clear(), so a result queried before a load cannot be cached after it.
+        self.generation = 0
+        self.lock = threading.Lock()
+        self.counters = {'hits': 0, 'misses': 0, 'evictions': 0, 'invalidations': 0}
+
+    def get(self, key):
+        with self.lock:
+            entry = self.entries.get(key)
+            if entry is None or time.monotonic() - entry[0] > self.ttl:
+                self.counters['misses'] += 1
+                return None
+            self.entries.move_to_end(key)
+            self.counters['hits'] += 1
+            return entry[1]
+
+    def put(self, key, value, generation):
+        with self.lock:
+            if generation != self.generation:
+                return
+            self.entries[key] = (time.monotonic(), value)
+            self.entries.move_to_end(key)
+            while len(self.entries) > self.max_entries:
+                self.entries.popitem(last=False)
+                self.counters['evictions'] += 1
+
+    def clear(self):
+        with self.lock:
+            self.entries.clear()
+            self.generation += 1
+            self.counters['invalidations'] += 1
+
+    def stats(self):
+        with self.lock:
+            return dict(self.counters, entries=len(self.entries))
+
+
+_cache = QueryCache()
+_columns = {}
+_columns_lock = threading.Lock()
+
+def get_cache():
+    return _cache
+
+def invalidate():
+    """
+    Drops every cached result and column list. Called when a load commits.
+    """
+    with _columns_lock:
+        _columns.clear()
+    _cache.clear()
+
+def listen_for_loads(stop_event=None):
+    """
+    Clears the cache whenever load_stats commits. Runs on a dedicated
+    connection that LISTENs on the load channel, so it belongs in a daemon thread.
+
+    If the connection cannot be opened or drops, it is opened again with
+    exponential backoff (up to LISTEN_BACKOFF_MAX seconds). The cache is
+    cleared on every reconnect, as loads may have committed in between.
+    """
+    stop_event = stop_event or threading.Event()
+    delay = 1.0
+    while not stop_event.is_set():
+        conn = None
+        try:
+            conn = connect()
+            conn.autocommit = True
+            with conn.cursor() as cur:
+                cur.execute(sql.SQL("LISTEN {}").format(sql.Identifier(LOAD_CHANNEL)))
+            if delay > 1.0:
+                invalidate()
+                print("Load listener reconnected, API cache cleared.")
+            delay = 1.0
+            while not stop_event.is_set():
+                if select.select([conn], [], [], 1.0)[0]:
+                    conn.poll()
+                    if conn.notifies:
+                        conn.notifies.clear()
+                        invalidate()
+                        print("Stats reloaded, API cache cleared.")
+        except Exception as error:
+            print(f"Load listener failed ({error}), reconnecting in {delay:.0f}s")
+            stop_event.wait(delay)
+            delay = min(delay * 2, LISTEN_BACKOFF_MAX)
+        finally:
+            if conn is not None:
+                conn.close()
+
+def start_listener():
+    stop_event = threading.Event()
+    threading.Thread(target=listen_for_loads, args=(stop_event,), daemon=True).start()
+    return stop_event
+
+def columns_of(table_name):
+    with _columns_lock:
+        if table_name not in _columns:
+            with transaction() as cur:
+                _columns[table_name] = list(table_columns(cur, table_name))
+        return _columns[table_name]
+
+def _json_default(value):
+    if isinstance(value, decimal.Decimal):
+        return float(value)
+    raise TypeError(f'{type(value).__name__} is not JSON serialisable')
+
+def encode(result):
+    """
+    Serialises a result and derives its ETag from the body.
+
+    Returns:
+        tuple: (body bytes, quoted ETag)
+    """
+    body = json.dumps(result, default=_json_default).encode()
+    return body, f'"{hashlib.sha1(body).hexdigest()}"'
+
+def _fetch(query, params, limit):
+    if limit <= API_FETCH_SIZE:
+        with transaction() as cur:
+            cur.execute(query, params)
+            names = [column.name for column in cur.description]
+            return [dict(zip(names, row)) for row in cur.fetchall()]
+    rows = []
+    with server_side_cursor(query, params, itersize=API_FETCH_SIZE) as cur:
+        for row in cur:
+            if not rows:
+                # A named cursor only has a description once the first batch is fetched.
+                names = [column.name for column in cur.description]
+            rows.append(dict(zip(names, row)))
+    return rows
+
+def _order_and_limit(table_name, key_col, order_by, limit):
+    try:
+        limit = int(limit)
+    except (TypeError, ValueError):
+        raise QueryError(f'limit must be an integer, got {limit!r}')
+    if not 1 <= limit <= MAX_LIMIT:
+        raise QueryError(f'limit must be between 1 and {MAX_LIMIT}')
+    if order_by is None:
+        return sql.SQL("ORDER BY s.{} LIMIT {}").format(sql.Identifier(key_col), sql.Literal(limit))
+    if order_by not in columns_of(table_name):
+        raise QueryError(f'Unknown column {order_by!r} in {table_name}')
+    return sql.SQL("ORDER BY s.{} DESC NULLS LAST LIMIT {}").format(sql.Identifier(order_by), sql.Literal(limit))
+
+def player_stats(league_id, season_id, table_name='player_stats', player_id=None, team_id=None,
+                 order_by=None, limit=100):
+    """
+    Rows of one player stats table for a league season, with the player and team names.
+
+    Args:
+        table_name (str): One of PLAYER_TABLES.
+        player_id (str): Only this player.
+        team_id (str): Only this team's players.
+        order_by (str): Stat column to rank by, highest first (uses the ranking indexes).
+        limit (int): At most this many rows (1 to MAX_LIMIT).
+    """
+    if table_name not in PLAYER_TABLES:
+        raise QueryError(f'Unknown player table {table_name!r}')
+    filters = [sql.SQL("s.league_id = %s"), sql.SQL("s.season_id = %s")]
+    params = [league_id, season_id]
+    if player_id is not None:
+        filters.append(sql.SQL("s.player_id = %s"))
+        params.append(player_id)
+    if team_id is not None:
+        filters.append(sql.SQL("s.team_id = %s"))
+        params.append(team_id)
+    query = sql.SQL(
+        "SELECT p.player_name, t.team_name, s.* FROM football.{} s "
+        "JOIN football.players p USING (player_id, league_id, season_id) "
+        "JOIN football.teams t ON t.team_id = s.team_id AND t.league_id = s.league_id AND t.season_id = s.season_id "
+        "WHERE {} {}"
+    ).format(sql.Identifier(table_name), sql.SQL(' AND ').join(filters),
+             _order_and_limit(table_name, 'player_id', order_by, limit))
+    return _fetch(query, params, int(limit))
+
+def team_stats(league_id, season_id, table_name='general_stats', team_id=None, order_by=None, limit=100):
+    """
+    Rows of one team stats table for a league season, with the team names.
+
+    Args:
+        table_name (str): One of TEAM_TABLES.
+        team_id (str): Only this team.
+        order_by (str): Stat column to rank by, highest first.
+        limit (int): At most this many rows (1 to MAX_LIMIT).
+    """
+    if table_name not in TEAM_TABLES:
+        raise QueryError(f'Unknown team table {table_name!r}')
+    filters = [sql.SQL("s.league_id = %s"), sql.SQL("s.season_id = %s")]
+    params = [league_id, season_id]
+    if team_id is not None:
+        filters.append(sql.SQL("s.team_id = %s"))
+        params.append(team_id)
+    query = sql.SQL(
+        "SELECT t.team_name, s.* FROM football.{} s "
+        "JOIN football.teams t USING (team_id, league_id, season_id) "
+        "WHERE {} {}"
+    ).format(sql.Identifier(table_name), sql.SQL(' AND ').join(filters),
+             _order_and_limit(table_name, 'team_id', order_by, limit))
+    return _fetch(query, params, int(limit))
+
+def cached(name, use_cache=True, **kwargs):
+    """
+    Runs player_stats or team_stats through the cache.
+
+    Returns:
+        tuple: (body bytes, ETag)
+    """
+    key = (name, tuple(sorted(kwargs.items())))
+    generation = _cache.generation
+    if use_cache:
+        hit = _cache.get(key)
+        if hit is not None:
+            return hit
+    query = {'player_stats': player_stats, 'team_stats': team_stats}[name]
+    result = encode(query(**kwargs))
+    if use_cache:
+        _cache.put(key, result, generation)
+    return result
@@ -0,0 +1,157 @@
+import os
+import sys
+import json
+import time
+import argparse
+from pathlib import Path
+from urllib.parse import urlsplit, parse_qs
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+sys.path.append(str(Path(__file__).resolve().parent.parent.parent))
+from connect import pool_metrics
+from src.api.queries import QueryError, cached, get_cache, start_listener
+from src.metrics import observe, prometheus_text
+
+API_HOST = os.getenv('API_HOST', '127.0.0.1')
+API_PORT = int(os.getenv('API_PORT', '8000'))
+
+# Query string parameters each endpoint accepts, mapped to query keyword arguments.
+PLAYER_PARAMS = {'table': 'table_name', 'team_id': 'team_id', 'order_by': 'order_by', 'limit': 'limit'}
+TEAM_PARAMS = {'table': 'table_name', 'order_by': 'order_by', 'limit': 'limit'}
+
+
+def route(path):
+    """
+    Maps a request path to a cached query.
+
+        /leagues/<league>/seasons/<season>/players[/<player_id>]
+        /leagues/<league>/seasons/<season>/teams[/<team_id>]
+
+    Returns:
+        tuple: (query name, fixed keyword arguments, allowed query parameters) or None.
+    """
+    parts = [part for part in path.split('/') if part]
+    if len(parts) not in (5, 6) or parts[0] != 'leagues' or parts[2] != 'seasons':
+        return None
+    kwargs = {'league_id': parts[1], 'season_id': parts[3]}
+    if parts[4] == 'players':
+        if len(parts) == 6:
+            kwargs['player_id'] = parts[5]
+        return 'player_stats', kwargs, PLAYER_PARAMS
+    if parts[4] == 'teams':
+        if len(parts) == 6:
+            kwargs['team_id'] = parts[5]
+        return 'team_stats', kwargs, TEAM_PARAMS
+    return None
+
+
+class StatsHandler(BaseHTTPRequestHandler):
+    """
+    Serves player and team stats as JSON. Responses carry an ETag and
+    requests with a matching If-None-Match get 304 Not Modified.
+    """
+    protocol_version = 'HTTP/1.1'
+    # Headers and body go out in separate writes; without this keep-alive clients stall on delayed ACKs.
+    disable_nagle_algorithm = True
+    use_cache = True
+
+    def do_GET(self):
+        url = urlsplit(self.path)
+        if url.path == '/health':
+            return self.send_json(200, {'cache': get_cache().stats(), 'pool': pool_metrics()})
+        if url.path == '/metrics':
+            return self.send_body(200, prometheus_text().encode(), content_type='text/plain; version=0.0.4')
+
+        start = time.perf_counter()
+        self.status = None
+        try:
+            name = self.handle_query(url)
+        except Exception as error:
+            name = (route(url.path) or ('unknown',))[0]
+            print(f"Error serving {self.path}: {type(error).__name__}: {error}")
+            if self.status is None:
+                self.send_json(500, {'error': 'Internal server error'})
+            else:
+                # The response was already under way; the client cannot be told, so drop the connection.
+                self.close_connection = True
+        observe('api_request_seconds', time.perf_counter() - start, route=name, status=self.status)
+
+    def handle_query(self, url):
+        """
+        Answers a stats request and returns the name of the query it matched.
+        """
+
+        matched = route(url.path)
+        if matched is None:
+            self.send_json(404, {'error': f'Unknown path {url.path}'})
+            return 'unknown'
+        name, kwargs, allowed = matched
+
+        for param, values in parse_qs(url.query).items():
+            if param not in allowed:
+                self.send_json(400, {'error': f'Unknown parameter {param!r}'})
+                return name
+            kwargs[allowed[param]] = values[-1]
+
+        try:
+            body, etag = cached(name, use_cache=self.use_cache, **kwargs)
+        except QueryError as error:
+            self.send_json(400, {'error': str(error)})
+            return name
+
+        if etag in (tag.strip() for tag in self.headers.get('If-None-Match', '').split(',')):
+            self.send_response(304)
+            self.send_header('ETag', etag)
+            self.send_header('Content-Length', '0')
+            self.end_headers()
+            return name
+        self.send_body(200, body, etag)
+        return name
+
+    def send_json(self, status, payload):
+        self.send_body(status, json.dumps(payload).encode())
+
+    def send_response(self, code, message=None):
+        self.status = code
+        super().send_response(code, message)
+
+    def send_body(self, status, body, etag=None, content_type='application/json'):
+        self.send_response(status)
+        self.send_header('Content-Type', content_type)
+        self.send_header('Content-Length', str(len(body)))
+        if etag:
+            self.send_header('ETag', etag)
+            self.send_header('Cache-Control', 'no-cache')
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+def make_server(host=API_HOST, port=API_PORT, use_cache=True):
+    """
+    Builds the threaded HTTP server. Each request runs on its own thread and
+    borrows a pooled connection only when its result is not cached.
+    """
+    handler = type('StatsHandler', (StatsHandler,), {'use_cache': use_cache})
+    server = ThreadingHTTPServer((host, port), handler)
+    server.daemon_threads = True
+    return server
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--host', default=API_HOST)
+    parser.add_argument('--port', type=int, default=API_PORT)
+    parser.add_argument('--no-cache', action='store_true')
+    args = parser.parse_args()
+
+    server = make_server(args.host, args.port, use_cache=not args.no_cache)
+    start_listener()
+    print(f"Serving football stats on http://{args.host}:{args.port}")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
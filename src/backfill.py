@@ -0,0 +1,253 @@
+"""
+Backfills a matrix of leagues x seasons in one unattended run:
+
+    python -m src.backfill --leagues 9 11 12 13 20 --first-season 2015 --last-season 2024 [--jobs 3] [--rate 5]
+    python -m src.backfill --status
+    python -m src.backfill --retry-failed
+
+Every league season becomes a job in a SQLite queue (data/cache/backfill.db).
+Jobs run the normal pipeline side by side, sharing the API rate limiter. Each
+finished stage is checkpointed, so a run that crashes or is interrupted picks
+up where it stopped when started again instead of starting over.
+"""
+import os
+import sys
+import time
+import sqlite3
+import argparse
+import threading
+from pathlib import Path
+from concurrent.futures import ThreadPoolExecutor
+
+sys.path.append(str(Path(__file__).resolve().parent.parent))
+from src.extract.http_client import get_limiter
+from src.pipeline import STAGES, run_pipeline
+from src.metrics import METRICS_DIR, write_jsonl, write_prometheus
+
+QUEUE_FILE = os.getenv('BACKFILL_QUEUE_FILE', 'data/cache/backfill.db')
+# League seasons processed at the same time. Extraction is bounded by the
+# shared rate limiter, and database writes are serialised by the pipeline.
+BACKFILL_JOBS = int(os.getenv('BACKFILL_JOBS', '3'))
+MAX_ATTEMPTS = int(os.getenv('BACKFILL_MAX_ATTEMPTS', '3'))
+
+
+class JobQueue:
+    """
+    Persistent queue of league-season jobs.
+
+    A job is pending, running, done or failed. completed_stages records the
+    pipeline stages already finished, so a retried job only runs the rest.
+    """
+
+    def __init__(self, path=QUEUE_FILE):
+        os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+        self.conn = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self.lock = threading.Lock()
+        with self.lock:
+            self.conn.execute("PRAGMA journal_mode=WAL")
+            self.conn.execute(
+                """
+                CREATE TABLE IF NOT EXISTS jobs (
+                    league_id TEXT NOT NULL,
+                    season_id TEXT NOT NULL,
+                    status TEXT NOT NULL DEFAULT 'pending',
+                    completed_stages TEXT NOT NULL DEFAULT '',
+                    attempts INTEGER NOT NULL DEFAULT 0,
+                    error TEXT,
+                    updated_at REAL,
+                    PRIMARY KEY (league_id, season_id)
+                )
+                """
+            )
+
+    def enqueue(self, league_ids, season_ids):
+        """
+        Adds every league x season pair that is not queued yet.
+
+        Returns:
+            int: Number of new jobs.
+        """
+        with self.lock:
+            cursor = self.conn.executemany(
+                "INSERT OR IGNORE INTO jobs (league_id, season_id, updated_at) VALUES (?, ?, ?)",
+                [(league_id, season_id, time.time()) for league_id in league_ids for season_id in season_ids]
+            )
+            return cursor.rowcount
+
+    def recover(self):
+        """
+        Puts jobs left running by a crashed or interrupted run back in the queue.
+        """
+        with self.lock:
+            return self.conn.execute("UPDATE jobs SET status = 'pending' WHERE status = 'running'").rowcount
+
+    def retry_failed(self):
+        with self.lock:
+            return self.conn.execute(
+                "UPDATE jobs SET status = 'pending', attempts = 0 WHERE status = 'failed'"
+            ).rowcount
+
+    def claim(self):
+        """
+        Marks the next pending job as running and returns it, or None when the queue is drained.
+
+        Returns:
+            tuple: (league_id, season_id, completed stages)
+        """
+        with self.lock:
+            row = self.conn.execute(
+                "SELECT league_id, season_id, completed_stages FROM jobs WHERE status = 'pending' "
+                "ORDER BY attempts, season_id DESC, league_id LIMIT 1"
+            ).fetchone()
+            if row is None:
+                return None
+            self.conn.execute(
+                "UPDATE jobs SET status = 'running', attempts = attempts + 1, updated_at = ? "
+                "WHERE league_id = ? AND season_id = ?",
+                (time.time(), row[0], row[1])
+            )
+        return row[0], row[1], [stage for stage in row[2].split(',') if stage]
+
+    def checkpoint(self, league_id, season_id, stage_name):
+        with self.lock:
+            self.conn.execute(
+                "UPDATE jobs SET completed_stages = completed_stages || ? || ',', updated_at = ? "
+                "WHERE league_id = ? AND season_id = ?",
+                (stage_name, time.time(), league_id, season_id)
+            )
+
+    def finish(self, league_id, season_id):
+        with self.lock:
+            self.conn.execute(
+                "UPDATE jobs SET status = 'done', error = NULL, updated_at = ? WHERE league_id = ? AND season_id = ?",
+                (time.time(), league_id, season_id)
+            )
+
+    def fail(self, league_id, season_id, error):
+        """
+        Records an error. The job goes back to pending until it has used up MAX_ATTEMPTS.
+        """
+        with self.lock:
+            self.conn.execute(
+                "UPDATE jobs SET status = CASE WHEN attempts >= ? THEN 'failed' ELSE 'pending' END, "
+                "error = ?, updated_at = ? WHERE league_id = ? AND season_id = ?",
+                (MAX_ATTEMPTS, error, time.time(), league_id, season_id)
+            )
+
+    def counts(self):
+        with self.lock:
+            return dict(self.conn.execute("SELECT status, COUNT(*) FROM jobs GROUP BY status").fetchall())
+
+    def jobs(self):
+        with self.lock:
+            return self.conn.execute(
+                "SELECT league_id, season_id, status, attempts, completed_stages, error FROM jobs "
+                "ORDER BY league_id, season_id"
+            ).fetchall()
+
+
+def seasons_between(first_year, last_year):
+    """
+    Season ids from first_year to last_year (start years), e.g. 2023 -> '2023-2024'.
+    """
+    return [f'{year}-{year + 1}' for year in range(first_year, last_year + 1)]
+
+def run_job(queue, league_id, season_id, completed, options):
+    """
+    Runs the pipeline stages of one league season that have not completed yet.
+    """
+    remaining = [stage.name for stage in STAGES if stage.name not in completed]
+    if not remaining:
+        # Interrupted after its last checkpoint; an empty only would make run_pipeline run every stage.
+        queue.finish(league_id, season_id)
+        print(f"[backfill] league {league_id} season {season_id} done")
+        return
+    job_options = argparse.Namespace(
+        league_id=league_id, season_id=season_id, incremental=options.incremental,
+        force=False, workers=1, only=remaining, profile=options.profile
+    )
+
+    def on_stage_done(stage_name, result):
+        queue.checkpoint(league_id, season_id, stage_name)
+
+    report = run_pipeline(job_options, on_stage_done=on_stage_done)
+    errors = [f"{name}: {result.get('error', result['status'])}"
+              for name, result in report.items() if result['status'] in ('failed', 'blocked')]
+    if errors:
+        queue.fail(league_id, season_id, '; '.join(errors))
+        print(f"[backfill] league {league_id} season {season_id} failed: {'; '.join(errors)}")
+    else:
+        queue.finish(league_id, season_id)
+        print(f"[backfill] league {league_id} season {season_id} done")
+
+def worker(queue, options):
+    while True:
+        job = queue.claim()
+        if job is None:
+            return
+        league_id, season_id, completed = job
+        try:
+            run_job(queue, league_id, season_id, completed, options)
+        except Exception as e:
+            queue.fail(league_id, season_id, str(e))
+            print(f"[backfill] league {league_id} season {season_id} failed: {e}")
+
+def run_backfill(queue, options):
+    """
+    Drains the queue with options.jobs league seasons in flight at a time.
+
+    Returns:
+        dict: Job count per status once the queue is drained.
+    """
+    recovered = queue.recover()
+    if recovered:
+        print(f"[backfill] resuming {recovered} interrupted jobs")
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=options.jobs) as executor:
+        for _ in range(options.jobs):
+            executor.submit(worker, queue, options)
+    counts = queue.counts()
+    print(f"[backfill] finished in {time.perf_counter() - start:.1f}s: {counts}")
+    return counts
+
+def print_status(queue):
+    print(f"{'league':<7} {'season':<10} {'status':<8} {'tries':>5}  completed / error")
+    for league_id, season_id, status, attempts, completed, error in queue.jobs():
+        detail = error if status == 'failed' else completed.rstrip(',')
+        print(f"{league_id:<7} {season_id:<10} {status:<8} {attempts:>5}  {detail}")
+    print(queue.counts())
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description='Backfill many league seasons through a resumable job queue.')
+    parser.add_argument('--leagues', nargs='+', default=[])
+    parser.add_argument('--seasons', nargs='+', default=[], help="Season ids such as 2023-2024.")
+    parser.add_argument('--first-season', type=int, help='First season start year, e.g. 2015.')
+    parser.add_argument('--last-season', type=int, help='Last season start year, e.g. 2024.')
+    parser.add_argument('--jobs', type=int, default=BACKFILL_JOBS, help='League seasons processed at once.')
+    parser.add_argument('--rate', type=float, help='API requests per second shared by all jobs.')
+    parser.add_argument('--incremental', action='store_true', help='Upsert instead of reloading each season.')
+    parser.add_argument('--retry-failed', action='store_true', help='Queue failed jobs again.')
+    parser.add_argument('--status', action='store_true', help='Print the queue and exit.')
+    parser.add_argument('--profile', action='store_true', help='Profile every stage (see src/pipeline.py).')
+    parser.add_argument('--metrics-dir', default=METRICS_DIR)
+    options = parser.parse_args()
+
+    queue = JobQueue()
+    if options.status:
+        print_status(queue)
+        sys.exit(0)
+
+    seasons = list(options.seasons)
+    if options.first_season is not None:
+        seasons += seasons_between(options.first_season, options.last_season or options.first_season)
+    if options.leagues and seasons:
+        print(f"[backfill] queued {queue.enqueue(options.leagues, seasons)} new jobs")
+    if options.retry_failed:
+        print(f"[backfill] re-queued {queue.retry_failed()} failed jobs")
+    if options.rate is not None:
+        get_limiter().rate = options.rate
+
+    counts = run_backfill(queue, options)
+    write_jsonl(os.path.join(options.metrics_dir, 'backfill.jsonl'))
+    write_prometheus(os.path.join(options.metrics_dir, 'backfill.prom'))
+    sys.exit(1 if counts.get('failed') else 0)
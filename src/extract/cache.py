@@ -0,0 +1,137 @@
+import os
+import json
+import time
+import hashlib
+import threading
+
+CACHE_DIR = os.getenv('FBREF_CACHE_DIR', 'data/cache')
+# Seconds a cached response is served without asking the API at all.
+CACHE_TTL = float(os.getenv('FBREF_CACHE_TTL', '3600'))
+CACHE_MAX_BYTES = int(float(os.getenv('FBREF_CACHE_MAX_MB', '512')) * 1024 * 1024)
+
+
+class ResponseCache:
+    """
+    On-disk cache of API responses keyed by endpoint and params.
+
+    Bodies are stored as <key>.json next to an index.json that keeps the
+    validators (ETag / Last-Modified), fetch time, size and last access of
+    every entry. Once the total size goes over max_bytes the least recently
+    used entries are evicted.
+    """
+
+    def __init__(self, cache_dir=CACHE_DIR, ttl=CACHE_TTL, max_bytes=CACHE_MAX_BYTES):
+        self.cache_dir = cache_dir
+        self.ttl = ttl
+        self.max_bytes = max_bytes
+        self.index_file = os.path.join(cache_dir, 'index.json')
+        self.lock = threading.Lock()
+        self.counters = {'hits': 0, 'misses': 0, 'revalidations': 0, 'evictions': 0}
+        os.makedirs(cache_dir, exist_ok=True)
+        try:
+            with open(self.index_file, 'r') as f:
+                self.index = json.load(f)
+        except (FileNotFoundError, json.JSONDecodeError):
+            self.index = {}
+
+    @staticmethod
+    def key(endpoint, params):
+        raw = json.dumps([endpoint, sorted((str(k), str(v)) for k, v in (params or {}).items())])
+        return hashlib.sha256(raw.encode()).hexdigest()
+
+    def _body_path(self, key):
+        return os.path.join(self.cache_dir, f'{key}.json')
+
+    def _save_index(self):
+        tmp_file = f'{self.index_file}.tmp'
+        with open(tmp_file, 'w') as f:
+            json.dump(self.index, f)
+        os.replace(tmp_file, self.index_file)
+
+    def lookup(self, key):
+        """
+        Returns (entry, is_fresh) for a key, or (None, False) if nothing usable is cached.
+        """
+        with self.lock:
+            entry = self.index.get(key)
+            if entry is None or not os.path.exists(self._body_path(key)):
+                return None, False
+            return dict(entry), time.time() - entry['fetched_at'] < self.ttl
+
+    def validators(self, entry):
+        """
+        Conditional-request headers for a stale entry.
+        """
+        headers = {}
+        if entry.get('etag'):
+            headers['If-None-Match'] = entry['etag']
+        if entry.get('last_modified'):
+            headers['If-Modified-Since'] = entry['last_modified']
+        return headers
+
+    def read(self, key):
+        with self.lock:
+            with open(self._body_path(key), 'rb') as f:
+                body = f.read()
+            self.index[key]['last_access'] = time.time()
+            self._save_index()
+            return body
+
+    def record_hit(self):
+        with self.lock:
+            self.counters['hits'] += 1
+
+    def revalidated(self, key):
+        """
+        Marks an entry as fresh again after the API answered 304 Not Modified.
+        """
+        with self.lock:
+            self.counters['revalidations'] += 1
+            now = time.time()
+            self.index[key]['fetched_at'] = now
+            self.index[key]['last_access'] = now
+            self._save_index()
+
+    def store(self, key, endpoint, params, response):
+        """
+        Saves a 200 response body together with its validators.
+        """
+        body = response.content
+        with self.lock:
+            self.counters['misses'] += 1
+            tmp_file = f'{self._body_path(key)}.tmp'
+            with open(tmp_file, 'wb') as f:
+                f.write(body)
+            os.replace(tmp_file, self._body_path(key))
+            now = time.time()
+            self.index[key] = {
+                'endpoint': endpoint,
+                'params': {str(k): str(v) for k, v in (params or {}).items()},
+                'etag': response.headers.get('ETag'),
+                'last_modified': response.headers.get('Last-Modified'),
+                'fetched_at': now,
+                'last_access': now,
+                'size': len(body)
+            }
+            self._evict()
+            self._save_index()
+
+    def _evict(self):
+        total = sum(entry['size'] for entry in self.index.values())
+        for key in sorted(self.index, key=lambda k: self.index[k]['last_access']):
+            if total <= self.max_bytes:
+                break
+            total -= self.index[key]['size']
+            del self.index[key]
+            try:
+                os.remove(self._body_path(key))
+            except FileNotFoundError:
+                pass
+            self.counters['evictions'] += 1
+
+    def stats(self):
+        with self.lock:
+            stats = dict(self.counters)
+            stats['entries'] = len(self.index)
+            stats['bytes'] = sum(entry['size'] for entry in self.index.values())
+            return stats
@@ -1,38 +1,164 @@
-import requests
 import os
+import sys
 import json
-from dotenv import load_dotenv
-from extract_team_stats import get_team_details
-
-load_dotenv()
-
-API_URL = os.getenv('FBREF_BASE_URL')
-API_KEY = os.getenv('FBREF_API_KEY')
-
-def get_players_stats():
-
-    team_details = get_team_details()
-
-    for team_data in team_details:
-        team_id = team_data['team_id']
-        team_name = team_data['team_name']
-        
-        params = {
-            'team_id': team_id ,
-            'league_id': '9'
-        }
-        HEADERS = {'X-API-KEY': API_KEY}
-        response = requests.get(f'{API_URL}/player-season-stats', params=params, headers=HEADERS)
-        if response.status_code == 200:
-            filename = f'data/raw/{team_name}/players_stats.json'
-            os.makedirs(os.path.dirname(filename), exist_ok=True)
-            with open(filename, 'w') as f:
-                json.dump(response.json(), f)
-        else:
-            return {
-            'status_code': response.status_code,
-            'error': response.json()
-        }
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from pathlib import Path
+
+sys.path.append(str(Path(__file__).resolve().parent.parent.parent))
+from src.extract.http_client import api_get, cache_stats, MAX_WORKERS
+from src.extract.extract_team_stats import (
+    get_team_stats, team_details_from_stats, raw_dir, store_raw, team_stats_file, LEAGUE_ID, SEASON_ID
+)
+from src.extract.raw_files import open_raw
+from src.manifest import get_manifest
+
+def dead_letter_file(league_id=LEAGUE_ID, season_id=SEASON_ID):
+    """
+    Teams whose player statistics could not be fetched, kept next to the raw
+    files of the league season so they can be retried on their own.
+    """
+    return os.path.join(raw_dir(league_id, season_id), 'dead_letter.json')
+
+def load_dead_letter(league_id=LEAGUE_ID, season_id=SEASON_ID):
+    """
+    Returns the failed teams of a league season: a list of dicts with team_id,
+    team_name, error, attempts and failed_at.
+    """
+    try:
+        with open(dead_letter_file(league_id, season_id), 'r') as f:
+            return json.load(f)['teams']
+    except (FileNotFoundError, json.JSONDecodeError, KeyError):
+        return []
+
+def save_dead_letter(teams, league_id=LEAGUE_ID, season_id=SEASON_ID):
+    """
+    Replaces the dead-letter list of a league season. An empty list removes the file.
+    """
+    filename = dead_letter_file(league_id, season_id)
+    if not teams:
+        if os.path.exists(filename):
+            os.remove(filename)
+        return
+    os.makedirs(os.path.dirname(filename), exist_ok=True)
+    tmp_file = f'{filename}.tmp'
+    with open(tmp_file, 'w') as f:
+        json.dump({'teams': teams}, f, indent=2)
+    os.replace(tmp_file, filename)
+
+def load_team_stats(league_id=LEAGUE_ID, season_id=SEASON_ID):
+    """
+    Returns the team-season payload saved by get_team_stats(), downloading it
+    only if it has not been fetched yet.
+    """
+    try:
+        with open_raw(team_stats_file(league_id, season_id)) as f:
+            return json.load(f)
+    except (OSError, EOFError, json.JSONDecodeError):
+        return get_team_stats(league_id, season_id)
+
+def get_team_players_stats(team_data, league_id=LEAGUE_ID, season_id=SEASON_ID):
+    """
+    Fetches player statistics for a single team and saves them to
+    data/raw/league=<id>/season=<id>/<team_name>/players_stats.json.gz. The file
+    is written atomically, and only when its content hash differs from the one
+    in the manifest.
+
+    Returns:
+        tuple: (file name, whether it was rewritten)
+    """
+    team_id = team_data['team_id']
+    team_name = team_data['team_name']
+
+    params = {
+        'team_id': team_id,
+        'league_id': league_id,
+        'season_id': season_id
+    }
+    response = api_get('player-season-stats', params)
+    if response.status_code == 200:
+        filename = os.path.join(raw_dir(league_id, season_id), team_name, 'players_stats.json')
+        return store_raw(filename, json.dumps(response.json()).encode())
+    else:
+        raise Exception(f"Error fetching player statistics for {team_name}: {response.status_code} - {response.text}")
+
+def get_players_stats(team_stats=None, max_workers=MAX_WORKERS, league_id=LEAGUE_ID, season_id=SEASON_ID,
+                      retry_failed=False):
+    """
+    Fetches player statistics for every team in the league concurrently.
+
+    A team that still fails after the HTTP client's retries does not stop the
+    others. It is recorded in the league season's dead-letter file
+    (see dead_letter_file) and removed from it once a later run succeeds.
+
+    Args:
+        team_stats (dict): team-season-stats payload. Defaults to the one already
+            saved by get_team_stats(), so the team list costs no extra request.
+        max_workers (int): Number of teams fetched at the same time.
+        league_id (str), season_id (str): League season to fetch.
+        retry_failed (bool): Only fetch the teams in the dead-letter file.
+
+    Returns:
+        dict: 'saved' lists the files written, 'unchanged' the files whose content
+        was the same as last time, 'errors' one entry per failed team.
+    """
+    dead_letter = {str(team['team_id']): team for team in load_dead_letter(league_id, season_id)}
+    if retry_failed:
+        team_details = [{'team_id': team['team_id'], 'team_name': team['team_name']}
+                        for team in dead_letter.values()]
+    else:
+        if team_stats is None:
+            team_stats = load_team_stats(league_id, season_id)
+        team_details = team_details_from_stats(team_stats)
+        # Teams no longer in the league season are dropped from the dead letter.
+        current = {str(team['team_id']) for team in team_details}
+        dead_letter = {key: team for key, team in dead_letter.items() if key in current}
+
+    saved = []
+    unchanged = []
+    errors = []
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        futures = {executor.submit(get_team_players_stats, team_data, league_id, season_id): team_data for team_data in team_details}
+        for future in as_completed(futures):
+            team_data = futures[future]
+            key = str(team_data['team_id'])
+            try:
+                filename, written = future.result()
+                (saved if written else unchanged).append(filename)
+                dead_letter.pop(key, None)
+            except Exception as e:
+                print(f"Error: {e}")
+                errors.append({
+                    'team_id': team_data['team_id'],
+                    'team_name': team_data['team_name'],
+                    'error': str(e)
+                })
+                dead_letter[key] = dict(errors[-1], attempts=dead_letter.get(key, {}).get('attempts', 0) + 1,
+                                        failed_at=time.strftime('%Y-%m-%dT%H:%M:%S'))
+
+    get_manifest().save()
+    save_dead_letter(sorted(dead_letter.values(), key=lambda team: str(team['team_name'])), league_id, season_id)
+    print(f"Player statistics saved for {len(saved)} of {len(team_details)} teams "
+          f"({len(unchanged)} unchanged).")
+    if dead_letter:
+        print(f"{len(dead_letter)} teams failed, listed in {dead_letter_file(league_id, season_id)}. "
+              f"Retry them with --retry-failed.")
+    print(f"Cache: {cache_stats()}")
+    return {
+        'saved': sorted(saved),
+        'unchanged': sorted(unchanged),
+        'errors': errors
+    }
 
 if __name__ == "__main__":
-    get_players_stats()
\ No newline at end of file
+    import argparse
+
+    parser = argparse.ArgumentParser(description='Download player statistics of every team in a league season.')
+    parser.add_argument('--league', default=LEAGUE_ID)
+    parser.add_argument('--season', default=SEASON_ID)
+    parser.add_argument('--retry-failed', action='store_true',
+                        help='Only fetch the teams listed in the dead-letter file of the last run.')
+    args = parser.parse_args()
+
+    result = get_players_stats(league_id=args.league, season_id=args.season, retry_failed=args.retry_failed)
+    sys.exit(1 if result['errors'] else 0)
@@ -1,61 +1,95 @@
-import requests
 import os
+import sys
 import json
-from dotenv import load_dotenv
+from pathlib import Path
 
-load_dotenv()
+sys.path.append(str(Path(__file__).resolve().parent.parent.parent))
+from src.extract.http_client import api_get, cache_stats
+from src.extract.raw_files import find_raw, raw_path, read_raw, write_raw
+from src.manifest import content_hash, get_manifest
 
-API_URL = os.getenv('FBREF_BASE_URL')
-API_KEY = os.getenv('FBREF_API_KEY')
+RAW_DIR = 'data/raw'
+LEAGUE_ID = '9'
+SEASON_ID = '2024-2025'
 
-def get_team_details():
+def raw_dir(league_id=LEAGUE_ID, season_id=SEASON_ID):
     """
-    Fetches Team ID and Team Name for the specified league and season.
+    Raw files of one league season: data/raw/league=<id>/season=<id>.
     """
+    return os.path.join(RAW_DIR, f'league={league_id}', f'season={season_id}')
 
-    params = {
-            'league_id': '9' ,  
-            'season_id': '2024-2025'
-        }
-    HEADERS = {'X-API-KEY': API_KEY}
-    response = requests.get(f'{API_URL}/team-season-stats', params=params, headers=HEADERS)
-    if response.status_code == 200:
-        team_stats = response.json()
+def team_stats_file(league_id=LEAGUE_ID, season_id=SEASON_ID):
+    """
+    The team-season payload of one league season: team_stats.json.gz, or a
+    plain team_stats.json written before raw files were compressed.
+    """
+    return raw_path(os.path.join(raw_dir(league_id, season_id), 'team_stats.json'))
 
-        team_details = []
+def store_raw(filename, body):
+    """
+    Saves a raw payload unless the stored copy already has the same content
+    hash. The stored copy is hashed from disk every time, also for responses
+    served from the cache: it may predate them, e.g. after a run that died
+    between caching a response and writing its file.
 
-        for team_data in team_stats['data']:
-            team_id = team_data['meta_data']['team_id']
-            team_name = team_data['meta_data']['team_name']
-            team_details.append({
-                'team_id': team_id,
-                'team_name': team_name
-            })
+    Args:
+        filename (str): Uncompressed name, e.g. .../players_stats.json.
+        body (bytes): JSON payload.
 
-        return team_details
+    Returns:
+        tuple: (path of the stored file, whether it was rewritten)
+    """
+    digest = content_hash(body)
+    manifest = get_manifest()
+    existing = find_raw(filename)
+    if existing and content_hash(read_raw(existing)) == digest:
+        manifest.update('raw', {existing: digest})
+        return existing, False
+    path = write_raw(filename, body)
+    if existing and existing != path:
+        manifest.forget('raw', [existing])
+    manifest.update('raw', {path: digest})
+    return path, True
 
-    else:
-        raise Exception(f"Error fetching team details: {response.status_code} - {response.text}")
-    
-def get_team_stats():
+def team_details_from_stats(team_stats):
+    """
+    Reads Team ID and Team Name out of a team-season-stats payload.
+    """
+    team_details = []
+
+    for team_data in team_stats['data']:
+        team_id = team_data['meta_data']['team_id']
+        team_name = team_data['meta_data']['team_name']
+        team_details.append({
+            'team_id': team_id,
+            'team_name': team_name
+        })
+
+    return team_details
+
+def get_team_stats(league_id=LEAGUE_ID, season_id=SEASON_ID):
     """
-    Fetches team statistics for the specified league and season.
+    Fetches team statistics for the specified league and season and saves
+    them to data/raw/league=<id>/season=<id>/team_stats.json.gz.
     """
     params = {
-            'league_id': '9' ,  
-            'season_id': '2024-2025'
+            'league_id': league_id,
+            'season_id': season_id
         }
-    HEADERS = {'X-API-KEY': API_KEY}
-    response = requests.get(f'{API_URL}/team-season-stats', params=params, headers=HEADERS)
+    response = api_get('team-season-stats', params)
     if response.status_code == 200:
-        filename = f'data/raw/team_stats.json'
-        os.makedirs(os.path.dirname(filename), exist_ok=True)
-        with open(filename, 'w') as f:
-            json.dump(response.json(), f)
-        print(f"Data saved to {filename}")
+        filename = os.path.join(raw_dir(league_id, season_id), 'team_stats.json')
+        body = json.dumps(response.json()).encode()
+        path, written = store_raw(filename, body)
+        if not written:
+            print(f"Team statistics unchanged, keeping {path}")
+            return response.json()
+        get_manifest().save()
+        print(f"Data saved to {path}")
         return response.json()
     else:
         raise Exception(f"Error fetching team statistics: {response.status_code} - {response.text}")
 
 if __name__ == "__main__":
-    get_team_stats()
\ No newline at end of file
+    get_team_stats()
+    print(f"Cache: {cache_stats()}")
@@ -0,0 +1,218 @@
+import os
+import sys
+import random
+import threading
+import time
+import requests
+from datetime import datetime, timezone
+from email.utils import parsedate_to_datetime
+from requests.adapters import HTTPAdapter
+from dotenv import load_dotenv
+from pathlib import Path
+
+sys.path.append(str(Path(__file__).resolve().parent.parent.parent))
+from src.extract.cache import ResponseCache, CACHE_DIR
+from src.metrics import observe
+
+load_dotenv()
+
+API_URL = os.getenv('FBREF_BASE_URL')
+API_KEY = os.getenv('FBREF_API_KEY')
+
+# Upper bound on simultaneous requests (and pooled keep-alive connections) to the API host.
+MAX_WORKERS = int(os.getenv('FBREF_MAX_WORKERS', '8'))
+# Token bucket: sustained requests per second and the size of the burst allowed on top.
+RATE_LIMIT = float(os.getenv('FBREF_RATE_LIMIT', '5'))
+RATE_BURST = int(os.getenv('FBREF_RATE_BURST', str(MAX_WORKERS)))
+REQUEST_TIMEOUT = float(os.getenv('FBREF_TIMEOUT', '30'))
+# Rate limiting (429), server errors and dropped connections are retried with
+# exponential backoff and full jitter: attempt n waits up to BACKOFF_BASE * 2**n seconds.
+MAX_RETRIES = int(os.getenv('FBREF_MAX_RETRIES', '4'))
+BACKOFF_BASE = float(os.getenv('FBREF_BACKOFF_BASE', '0.5'))
+# Longest wait between attempts, also for a Retry-After sent by the API.
+BACKOFF_MAX = float(os.getenv('FBREF_BACKOFF_MAX', '60'))
+RETRY_STATUSES = {429, 500, 502, 503, 504}
+
+
+class RateLimiter:
+    """
+    Token bucket shared by every thread that talks to the API.
+    """
+
+    def __init__(self, rate=RATE_LIMIT, burst=RATE_BURST):
+        self.rate = rate
+        self.capacity = max(1, burst)
+        self.tokens = float(self.capacity)
+        self.updated = time.monotonic()
+        self.resume_at = 0.0
+        self.lock = threading.Lock()
+
+    def pause(self, seconds):
+        """
+        Holds back every thread for the given time, e.g. after a 429 with Retry-After.
+        """
+        with self.lock:
+            self.resume_at = max(self.resume_at, time.monotonic() + seconds)
+
+    def acquire(self):
+        """
+        Blocks until a token is available (and any pause is over), then consumes it.
+        """
+        while True:
+            with self.lock:
+                now = time.monotonic()
+                if now < self.resume_at:
+                    wait = self.resume_at - now
+                elif self.rate <= 0:
+                    return
+                else:
+                    self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+                    self.updated = now
+                    if self.tokens >= 1:
+                        self.tokens -= 1
+                        return
+                    wait = (1 - self.tokens) / self.rate
+            time.sleep(wait)
+
+
+_session = None
+_limiter = None
+_cache = None
+_lock = threading.Lock()
+
+
+def get_session(max_connections=MAX_WORKERS):
+    """
+    Returns the process-wide requests session. Connections are kept alive and
+    pooled per host, and the pool blocks once max_connections are in use.
+    """
+    global _session
+    with _lock:
+        if _session is None:
+            session = requests.Session()
+            adapter = HTTPAdapter(pool_connections=1, pool_maxsize=max_connections, pool_block=True)
+            session.mount('https://', adapter)
+            session.mount('http://', adapter)
+            session.headers.update({'X-API-KEY': API_KEY})
+            _session = session
+        return _session
+
+
+def get_limiter():
+    global _limiter
+    with _lock:
+        if _limiter is None:
+            _limiter = RateLimiter()
+        return _limiter
+
+
+def get_cache():
+    """
+    Returns the shared response cache, or None when FBREF_CACHE_DIR is set empty.
+    """
+    global _cache
+    with _lock:
+        if _cache is None and CACHE_DIR:
+            _cache = ResponseCache()
+        return _cache
+
+
+def cache_stats():
+    cache = get_cache()
+    return cache.stats() if cache is not None else {}
+
+
+def _cached_response(cache, key):
+    response = requests.Response()
+    response.status_code = 200
+    response._content = cache.read(key)
+    response.headers['Content-Type'] = 'application/json'
+    response.from_cache = True
+    return response
+
+
+def retry_delay(attempt, response=None):
+    """
+    Seconds to wait before retrying. A Retry-After header (seconds or an HTTP
+    date) is honoured; otherwise the delay is drawn uniformly from
+    0..BACKOFF_BASE * 2**attempt (full jitter), so clients do not retry in lockstep.
+    """
+    retry_after = response.headers.get('Retry-After') if response is not None else None
+    if retry_after:
+        try:
+            return min(BACKOFF_MAX, max(0.0, float(retry_after)))
+        except ValueError:
+            pass
+        try:
+            date = parsedate_to_datetime(retry_after)
+            return min(BACKOFF_MAX, max(0.0, (date - datetime.now(timezone.utc)).total_seconds()))
+        except (TypeError, ValueError):
+            pass
+    return random.uniform(0, min(BACKOFF_MAX, BACKOFF_BASE * 2 ** attempt))
+
+
+def _send(endpoint, params, headers):
+    """
+    Sends one GET, retrying 429, 5xx, timeouts and connection errors up to
+    MAX_RETRIES times. Every attempt goes through the rate limiter and is timed.
+    The last response is returned (or the last error raised) once retries run out.
+    """
+    for attempt in range(MAX_RETRIES + 1):
+        get_limiter().acquire()
+        start = time.perf_counter()
+        try:
+            response = get_session().get(f'{API_URL}/{endpoint}', params=params, headers=headers,
+                                         timeout=REQUEST_TIMEOUT)
+        except requests.RequestException as e:
+            observe('http_request_seconds', time.perf_counter() - start, endpoint=endpoint, status='error')
+            if attempt == MAX_RETRIES or not isinstance(e, (requests.ConnectionError, requests.Timeout)):
+                raise
+            delay = retry_delay(attempt)
+            print(f"Request to {endpoint} failed ({type(e).__name__}), retrying in {delay:.1f}s")
+            time.sleep(delay)
+            continue
+        observe('http_request_seconds', time.perf_counter() - start, endpoint=endpoint, status=response.status_code)
+        if response.status_code not in RETRY_STATUSES or attempt == MAX_RETRIES:
+            return response
+        delay = retry_delay(attempt, response)
+        if response.status_code == 429:
+            get_limiter().pause(delay)
+        print(f"Request to {endpoint} returned {response.status_code}, retrying in {delay:.1f}s")
+        time.sleep(delay)
+
+
+def api_get(endpoint, params, use_cache=True):
+    """
+    Sends a rate-limited GET to the FBref API over the shared session.
+
+    Fresh cached responses are returned without touching the network. Stale
+    ones are revalidated with If-None-Match / If-Modified-Since, and a 304
+    answer is served from the cache. Responses served from the cache have
+    from_cache set to True. Transient failures are retried (see _send).
+
+    Args:
+        endpoint (str): API path, e.g. 'team-season-stats'.
+        params (dict): Query parameters.
+        use_cache (bool): Set to False to always go to the API.
+    """
+    cache = get_cache() if use_cache else None
+    headers = {}
+    if cache is not None:
+        key = cache.key(endpoint, params)
+        entry, is_fresh = cache.lookup(key)
+        if is_fresh:
+            cache.record_hit()
+            return _cached_response(cache, key)
+        if entry is not None:
+            headers = cache.validators(entry)
+
+    response = _send(endpoint, params, headers)
+    response.from_cache = False
+
+    if cache is not None:
+        if response.status_code == 304 and headers:
+            cache.revalidated(key)
+            return _cached_response(cache, key)
+        if response.status_code == 200:
+            cache.store(key, endpoint, params, response)
+    return response
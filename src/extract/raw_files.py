@@ -0,0 +1,70 @@
+import os
+import gzip
+
+# Raw API payloads are stored gzip-compressed (<name>.json.gz). Set FBREF_RAW_GZIP=0 to write plain JSON.
+RAW_GZIP = os.getenv('FBREF_RAW_GZIP', '1') != '0'
+
+def raw_variants(filename):
+    """
+    Both names a raw file can be stored under: compressed first, then plain.
+    """
+    return [f'{filename}.gz', filename]
+
+def find_raw(filename):
+    """
+    Returns the stored copy of a raw file (<filename>.gz or <filename>), or None if there is none.
+    """
+    for path in raw_variants(filename):
+        if os.path.exists(path):
+            return path
+    return None
+
+def raw_path(filename):
+    """
+    Path of a raw file as it is read: the stored copy if there is one, else
+    the name the next write will use.
+    """
+    return find_raw(filename) or (f'{filename}.gz' if RAW_GZIP else filename)
+
+def write_raw(filename, body, compress=RAW_GZIP):
+    """
+    Writes a raw payload atomically. The bytes go to a temporary file that is
+    renamed over the target, so a crash or a failed request never leaves a
+    truncated file behind. The copy under the other name, if any, is removed.
+
+    Args:
+        filename (str): Uncompressed name, e.g. .../players_stats.json.
+        body (bytes): JSON payload.
+        compress (bool): Store it gzip-compressed as <filename>.gz.
+
+    Returns:
+        str: Path written.
+    """
+    path = f'{filename}.gz' if compress else filename
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    tmp_file = f'{path}.tmp'
+    with open(tmp_file, 'wb') as f:
+        # mtime=0 keeps the compressed bytes identical for identical payloads.
+        f.write(gzip.compress(body, mtime=0) if compress else body)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp_file, path)
+    for stale in raw_variants(filename):
+        if stale != path and os.path.exists(stale):
+            os.remove(stale)
+    return path
+
+def read_raw(path):
+    """
+    Returns the payload of a stored raw file as bytes, decompressed if needed.
+    """
+    with (gzip.open(path, 'rb') if path.endswith('.gz') else open(path, 'rb')) as f:
+        return f.read()
+
+def open_raw(path):
+    """
+    Opens a raw file for reading as text, decompressing .gz files on the fly.
+    """
+    if path.endswith('.gz'):
+        return gzip.open(path, 'rt')
+    return open(path, 'r')
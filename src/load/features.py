@@ -0,0 +1,198 @@
+import sys
+import time
+from pathlib import Path
+from psycopg2 import sql
+
+sys.path.append(str(Path(__file__).resolve().parent.parent.parent))
+from connect import transaction
+from src.load.migrations import table_columns
+
+MINUTES_COLUMN = 'min'
+# Number of load snapshots (roughly matchdays) the rolling-form window covers.
+FORM_WINDOW = 5
+FORM_COLUMNS = ['min', 'gls', 'ast', 'xg', 'non_pen_xg', 'xg_assist']
+
+NUMERIC_TYPES = ('smallint', 'integer', 'bigint', 'real', 'double precision', 'numeric')
+KEY_COLUMNS = ('player_id', 'team_id', 'league_id', 'season_id')
+
+FEATURE_VIEWS = ['player_per90_features', 'team_strength_features', 'player_form_features']
+
+def is_rate(col):
+    """
+    Columns that are already rates or percentages are not scaled again.
+    """
+    return 'pct' in col or 'p90' in col or 'per_' in col or col.endswith('_per')
+
+def numeric_columns(cur, table_name):
+    return [col for col, data_type in table_columns(cur, table_name).items()
+            if data_type in NUMERIC_TYPES and col not in KEY_COLUMNS]
+
+def create_history_table(cur):
+    """
+    football.player_stats_history keeps one copy of player_stats per load that
+    changed it, which is what the rolling-form features are computed from.
+    """
+    cur.execute(
+        "CREATE TABLE IF NOT EXISTS football.player_stats_history "
+        "(LIKE football.player_stats, snapshot_at TIMESTAMPTZ NOT NULL DEFAULT now())"
+    )
+    cur.execute(
+        "CREATE INDEX IF NOT EXISTS player_stats_history_key_idx ON football.player_stats_history "
+        "(player_id, league_id, season_id, snapshot_at DESC)"
+    )
+
+def record_snapshot(cur, league_id, season_id):
+    """
+    Appends the current player_stats rows of a league season to the history
+    table, unless they are the same as in its latest snapshot. A reload that
+    changed nothing would otherwise use up a place in the form window.
+
+    Returns:
+        int: Rows appended, 0 if the season had not changed.
+    """
+    create_history_table(cur)
+    columns = sql.SQL(', ').join(map(sql.Identifier, table_columns(cur, 'player_stats')))
+    current = sql.SQL("SELECT {} FROM football.player_stats WHERE league_id = %(league)s "
+                      "AND season_id = %(season)s").format(columns)
+    latest = sql.SQL(
+        "SELECT {} FROM football.player_stats_history WHERE league_id = %(league)s AND season_id = %(season)s "
+        "AND snapshot_at = (SELECT max(snapshot_at) FROM football.player_stats_history "
+        "WHERE league_id = %(league)s AND season_id = %(season)s)"
+    ).format(columns)
+    params = {'league': league_id, 'season': season_id}
+    cur.execute(sql.SQL("SELECT EXISTS ({} EXCEPT {}) OR EXISTS ({} EXCEPT {})").format(
+        current, latest, latest, current), params)
+    if not cur.fetchone()[0]:
+        return 0
+    cur.execute(
+        sql.SQL("INSERT INTO football.player_stats_history ({}) {}").format(columns, current),
+        params
+    )
+    return cur.rowcount
+
+def per90_view_sql(cur):
+    stat_cols = [col for col in numeric_columns(cur, 'player_stats') if col != MINUTES_COLUMN and not is_rate(col)]
+    per90 = sql.SQL(', ').join(
+        sql.SQL("{col}::double precision / NULLIF({minutes}, 0) * 90 AS {alias}").format(
+            col=sql.Identifier(col), minutes=sql.Identifier(MINUTES_COLUMN), alias=sql.Identifier(f'{col}_p90'))
+        for col in stat_cols
+    )
+    return sql.SQL(
+        "SELECT player_id, league_id, season_id, team_id, {minutes}, {per90} FROM football.player_stats"
+    ).format(minutes=sql.Identifier(MINUTES_COLUMN), per90=per90)
+
+def team_strength_view_sql(cur):
+    stat_cols = [col for col in numeric_columns(cur, 'general_stats') if not is_rate(col)]
+    ratios = sql.SQL(', ').join(
+        sql.SQL("{col}::double precision / NULLIF(AVG({col}) OVER season, 0) AS {alias}").format(
+            col=sql.Identifier(col), alias=sql.Identifier(f'{col}_vs_avg'))
+        for col in stat_cols
+    )
+    return sql.SQL(
+        "SELECT team_id, league_id, season_id, {ratios} FROM football.general_stats "
+        "WINDOW season AS (PARTITION BY league_id, season_id)"
+    ).format(ratios=ratios)
+
+def form_view_sql(cur):
+    form_cols = [col for col in FORM_COLUMNS if col in numeric_columns(cur, 'player_stats_history')]
+    deltas = sql.SQL(', ').join(
+        sql.SQL("latest.{col} - COALESCE(base.{col}, 0) AS {alias}").format(
+            col=sql.Identifier(col), alias=sql.Identifier(f'form_{col}'))
+        for col in form_cols
+    )
+    return sql.SQL(
+        """
+        WITH ranked AS (
+            SELECT h.*, row_number() OVER (
+                PARTITION BY player_id, league_id, season_id ORDER BY snapshot_at DESC
+            ) AS snapshot_rank
+            FROM football.player_stats_history h
+        )
+        SELECT latest.player_id, latest.league_id, latest.season_id, latest.team_id,
+               latest.snapshot_at, {deltas}
+        FROM ranked latest
+        LEFT JOIN ranked base
+            ON base.player_id = latest.player_id
+           AND base.league_id = latest.league_id
+           AND base.season_id = latest.season_id
+           AND base.snapshot_rank = latest.snapshot_rank + {window}
+        WHERE latest.snapshot_rank = 1
+        """
+    ).format(deltas=deltas, window=sql.Literal(FORM_WINDOW))
+
+def create_feature_views(cur, rebuild=False):
+    """
+    Creates the materialised feature views (empty until their first refresh),
+    each with a unique index on its key so it can be refreshed concurrently.
+    Use rebuild=True after the stats tables gained or lost columns.
+    """
+    create_history_table(cur)
+    views = [
+        ('player_per90_features', per90_view_sql(cur), ['player_id', 'league_id', 'season_id']),
+        ('team_strength_features', team_strength_view_sql(cur), ['team_id', 'league_id', 'season_id']),
+        ('player_form_features', form_view_sql(cur), ['player_id', 'league_id', 'season_id']),
+    ]
+    for view_name, query, key_cols in views:
+        if rebuild:
+            cur.execute(sql.SQL("DROP MATERIALIZED VIEW IF EXISTS football.{}").format(sql.Identifier(view_name)))
+        cur.execute(sql.SQL("CREATE MATERIALIZED VIEW IF NOT EXISTS football.{} AS {} WITH NO DATA").format(
+            sql.Identifier(view_name), query))
+        cur.execute(sql.SQL("CREATE UNIQUE INDEX IF NOT EXISTS {} ON football.{} ({})").format(
+            sql.Identifier(f'{view_name}_key_idx'), sql.Identifier(view_name),
+            sql.SQL(', ').join(map(sql.Identifier, key_cols))))
+    print("Feature views created successfully.")
+
+def feature_views_exist(cur):
+    cur.execute("SELECT count(*) FROM pg_matviews WHERE schemaname = 'football' AND matviewname = ANY(%s)",
+                (FEATURE_VIEWS,))
+    return cur.fetchone()[0] == len(FEATURE_VIEWS)
+
+def refresh_features():
+    """
+    Refreshes every feature view, concurrently once it has been populated so
+    readers are never blocked.
+
+    Returns:
+        dict: View name -> refresh time in seconds.
+    """
+    timings = {}
+    for view_name in FEATURE_VIEWS:
+        with transaction() as cur:
+            cur.execute("SELECT ispopulated FROM pg_matviews WHERE schemaname = 'football' AND matviewname = %s",
+                        (view_name,))
+            row = cur.fetchone()
+            if row is None:
+                continue
+            concurrently = sql.SQL("CONCURRENTLY ") if row[0] else sql.SQL("")
+            start = time.perf_counter()
+            cur.execute(sql.SQL("REFRESH MATERIALIZED VIEW {}football.{}").format(
+                concurrently, sql.Identifier(view_name)))
+            timings[view_name] = time.perf_counter() - start
+        print(f"Refreshed football.{view_name} in {timings[view_name] * 1000:.1f} ms")
+    return timings
+
+def get_player_features(cur, player_id, league_id, season_id):
+    """
+    Ready-made features for one player: per-90 rates, rolling form and the
+    strength ratios of the player's team, read through the views' key indexes.
+    """
+    cur.execute(
+        """
+        SELECT t.*, f.*, p.*
+        FROM football.player_per90_features p
+        LEFT JOIN football.player_form_features f USING (player_id, league_id, season_id)
+        LEFT JOIN football.team_strength_features t
+            ON t.team_id = p.team_id AND t.league_id = p.league_id AND t.season_id = p.season_id
+        WHERE p.player_id = %s AND p.league_id = %s AND p.season_id = %s
+        """,
+        (player_id, league_id, season_id)
+    )
+    row = cur.fetchone()
+    if row is None:
+        return None
+    return dict(zip([column.name for column in cur.description], row))
+
+if __name__ == "__main__":
+    with transaction() as cur:
+        create_feature_views(cur, rebuild='--rebuild' in sys.argv)
+    refresh_features()
@@ -0,0 +1,486 @@
+import io
+import os
+import sys
+import psycopg2
+import pandas as pd
+from psycopg2 import sql
+from pathlib import Path
+
+sys.path.append(str(Path(__file__).resolve().parent.parent.parent))
+from connect import transaction, pool_metrics
+from src.transform.store import list_tables, read_columns, read_parts, read_table, table_files
+from src.manifest import get_manifest
+from src.load.schema import (
+    ensure_partition, leaf_partition, table_columns, foreign_keys, dependency_levels, run_per_table, LOAD_WORKERS
+)
+from src.load.features import create_feature_views, record_snapshot, refresh_features
+
+PROCESSED_DIR = Path(__file__).resolve().parent.parent.parent / 'data' / 'processed'
+
+LEAGUE_ID = '9'
+SEASON_ID = '2024-2025'
+LEAGUES = {
+    '9': ('Premier League', 'England'),
+    '11': ('Serie A', 'Italy'),
+    '12': ('La Liga', 'Spain'),
+    '13': ('Ligue 1', 'France'),
+    '20': ('Bundesliga', 'Germany'),
+}
+
+# Tables at least this large have their secondary indexes dropped and rebuilt around the COPY.
+INDEX_REBUILD_ROWS = 50000
+
+INTEGER_TYPES = ('smallint', 'integer', 'bigint')
+
+# Postgres NOTIFY channel signalled when a load commits.
+LOAD_CHANNEL = 'football_loaded'
+
+def prepare_frame(df, columns):
+    """
+    Selects the DataFrame columns that exist in the target table (matched
+    case-insensitively, as unquoted DDL lower-cases them) and makes integer
+    columns print without a trailing '.0'.
+    """
+    by_name = {col.lower(): col for col in df.columns}
+    selected = [col for col in columns if col in by_name]
+    frame = df[[by_name[col] for col in selected]].copy()
+    frame.columns = selected
+    for col in selected:
+        if columns[col] in INTEGER_TYPES and pd.api.types.is_float_dtype(frame[col]):
+            frame[col] = frame[col].round().astype('Int64')
+    return frame
+
+def copy_dataframe(cur, df, table_name):
+    """
+    Streams a DataFrame into football.<table_name> with COPY FROM STDIN,
+    through an in-memory CSV buffer.
+
+    Returns:
+        int: Number of rows copied.
+    """
+    frame = prepare_frame(df, table_columns(cur, table_name))
+    buffer = io.StringIO()
+    frame.to_csv(buffer, index=False, header=False)
+    buffer.seek(0)
+    copy_sql = sql.SQL("COPY football.{} ({}) FROM STDIN WITH (FORMAT csv)").format(
+        sql.Identifier(table_name),
+        sql.SQL(', ').join(map(sql.Identifier, frame.columns))
+    )
+    cur.copy_expert(copy_sql.as_string(cur), buffer)
+    return len(frame)
+
+def drop_secondary_indexes(cur, table_name):
+    """
+    Drops the non-unique indexes of football.<table_name>.
+
+    Returns:
+        list: The CREATE INDEX statements needed to rebuild them.
+    """
+    cur.execute(
+        """
+        SELECT i.relname, pg_get_indexdef(i.oid)
+        FROM pg_index x
+        JOIN pg_class i ON i.oid = x.indexrelid
+        JOIN pg_class t ON t.oid = x.indrelid
+        JOIN pg_namespace n ON n.oid = t.relnamespace
+        WHERE n.nspname = 'football' AND t.relname = %s
+          AND NOT x.indisprimary AND NOT x.indisunique
+        """,
+        (table_name,)
+    )
+    indexes = cur.fetchall()
+    for index_name, _ in indexes:
+        cur.execute(sql.SQL("DROP INDEX football.{}").format(sql.Identifier(index_name)))
+    return [index_def for _, index_def in indexes]
+
+def load_partition(cur, df, table_name, league_id, season_id):
+    """
+    Replaces the partition holding a league season (see leaf_partition) with
+    a freshly built one, so its indexes are built once after the COPY.
+
+    The rows are COPYed into a standalone table without indexes, which then
+    gets the old partition's indexes, keys and foreign keys, and a CHECK
+    constraint matching the partition bound. Only then is the old partition
+    dropped and the new one attached under its name. Dropping a partition
+    locks the parent table ACCESS EXCLUSIVE until the transaction commits,
+    so every reader of the table waits for that last catalog-only step, not
+    for the COPY or the index builds; the CHECK constraint lets ATTACH skip
+    its validation scan and the existing constraints are attached as they are.
+
+    A season partition that still holds rows of other leagues (tables created
+    without PARTITION_BY_LEAGUE) is not replaced.
+
+    Returns:
+        int: Rows copied, or None if the partition was left alone.
+    """
+    parent, partition, value = leaf_partition(cur, table_name, league_id, season_id)
+    bound_col = 'season_id' if parent == table_name else 'league_id'
+    if bound_col == 'season_id':
+        cur.execute(sql.SQL("SELECT EXISTS (SELECT 1 FROM football.{} WHERE league_id <> %s)").format(
+            sql.Identifier(partition)), (league_id,))
+        if cur.fetchone()[0]:
+            return None
+
+    target = sql.Identifier(partition)
+    new_table = sql.Identifier(f'{partition}_load')
+    cur.execute(sql.SQL("DROP TABLE IF EXISTS football.{}").format(new_table))
+    cur.execute(sql.SQL("CREATE TABLE football.{} (LIKE football.{} INCLUDING DEFAULTS INCLUDING CONSTRAINTS)").format(
+        new_table, target))
+    rows = copy_dataframe(cur, df, f'{partition}_load')
+
+    # Built under temporary names, as the old partition still holds the real ones.
+    cur.execute(
+        """
+        SELECT i.oid, i.relname, pg_get_indexdef(i.oid)
+        FROM pg_index x JOIN pg_class i ON i.oid = x.indexrelid
+        WHERE x.indrelid = %s::regclass
+          AND NOT EXISTS (SELECT 1 FROM pg_constraint c WHERE c.conindid = i.oid AND c.conrelid = x.indrelid)
+        """,
+        (f'football.{partition}',)
+    )
+    indexes = cur.fetchall()
+    cur.execute(
+        "SELECT oid, conname, pg_get_constraintdef(oid) FROM pg_constraint "
+        "WHERE conrelid = %s::regclass AND contype IN ('p', 'u', 'f') ORDER BY contype DESC",
+        (f'football.{partition}',)
+    )
+    constraints = cur.fetchall()
+    for oid, _, index_def in indexes:
+        on_table = f' ON football.{partition} USING '
+        columns = index_def[index_def.index(on_table) + len(on_table):]
+        cur.execute(sql.SQL("CREATE INDEX {} ON football.{} USING {}").format(
+            sql.Identifier(f'load_{oid}'), new_table, sql.SQL(columns)))
+    for oid, _, constraint_def in constraints:
+        cur.execute(sql.SQL("ALTER TABLE football.{} ADD CONSTRAINT {} {}").format(
+            new_table, sql.Identifier(f'load_{oid}'), sql.SQL(constraint_def)))
+    cur.execute(sql.SQL("ALTER TABLE football.{} ADD CONSTRAINT load_bound CHECK ({} IS NOT NULL AND {} = %s)").format(
+        new_table, sql.Identifier(bound_col), sql.Identifier(bound_col)), (value,))
+
+    cur.execute(sql.SQL("DROP TABLE football.{}").format(target))
+    cur.execute(sql.SQL("ALTER TABLE football.{} RENAME TO {}").format(new_table, target))
+    for oid, index_name, _ in indexes:
+        cur.execute(sql.SQL("ALTER INDEX football.{} RENAME TO {}").format(
+            sql.Identifier(f'load_{oid}'), sql.Identifier(index_name)))
+    for oid, constraint_name, _ in constraints:
+        cur.execute(sql.SQL("ALTER TABLE football.{} RENAME CONSTRAINT {} TO {}").format(
+            target, sql.Identifier(f'load_{oid}'), sql.Identifier(constraint_name)))
+    cur.execute(sql.SQL("ALTER TABLE football.{} ATTACH PARTITION football.{} FOR VALUES IN (%s)").format(
+        sql.Identifier(parent), target), (value,))
+    cur.execute(sql.SQL("ALTER TABLE football.{} DROP CONSTRAINT load_bound").format(target))
+    return rows
+
+def load_table(cur, df, table_name, rebuild_indexes=None, league_id=None, season_id=None):
+    """
+    COPYs a DataFrame into a table, dropping and rebuilding its secondary
+    indexes around the load when it is large. On a partitioned table the
+    league season's partition is rebuilt instead (see load_partition), which
+    needs league_id and season_id; without them, or when the partition also
+    holds other leagues, the indexes are kept.
+    """
+    if rebuild_indexes is None:
+        rebuild_indexes = len(df) >= INDEX_REBUILD_ROWS
+    if rebuild_indexes and leaf_partition(cur, table_name, league_id, season_id) is not None:
+        rows = load_partition(cur, df, table_name, league_id, season_id) if season_id is not None else None
+        if rows is None:
+            rows = copy_dataframe(cur, df, table_name)
+        print(f"Loaded {rows} rows into football.{table_name}")
+        return rows
+    index_defs = drop_secondary_indexes(cur, table_name) if rebuild_indexes else []
+    rows = copy_dataframe(cur, df, table_name)
+    for index_def in index_defs:
+        cur.execute(index_def)
+    print(f"Loaded {rows} rows into football.{table_name}")
+    return rows
+
+TEAM_KEY = ['team_id', 'league_id', 'season_id']
+PLAYER_KEY = ['player_id', 'league_id', 'season_id']
+
+def upsert_table(cur, df, table_name, key_cols):
+    """
+    Merges a DataFrame into a table without rewriting unchanged rows.
+
+    The frame is COPYed into the unlogged staging table football.<table_name>_staging
+    and merged with INSERT ... ON CONFLICT DO UPDATE. The update only fires when
+    the md5 hash of the incoming row differs from the stored one, so a rerun with
+    unchanged data writes no tuples.
+
+    Returns:
+        int: Number of rows inserted or updated.
+    """
+    staging_name = f'{table_name}_staging'
+    cur.execute(sql.SQL("CREATE UNLOGGED TABLE IF NOT EXISTS football.{} (LIKE football.{})").format(
+        sql.Identifier(staging_name), sql.Identifier(table_name)))
+    cur.execute(sql.SQL("TRUNCATE football.{}").format(sql.Identifier(staging_name)))
+    copy_dataframe(cur, df, staging_name)
+
+    columns = list(prepare_frame(df, table_columns(cur, table_name)).columns)
+    update_cols = [col for col in columns if col not in key_cols]
+    target = sql.Identifier(table_name)
+    column_list = sql.SQL(', ').join(map(sql.Identifier, columns))
+
+    if update_cols:
+        on_conflict = sql.SQL(
+            "DO UPDATE SET {} WHERE md5(ROW({})::text) IS DISTINCT FROM md5(ROW({})::text)"
+        ).format(
+            sql.SQL(', ').join(sql.SQL("{0} = EXCLUDED.{0}").format(sql.Identifier(col)) for col in update_cols),
+            sql.SQL(', ').join(sql.SQL("{}.{}").format(target, sql.Identifier(col)) for col in update_cols),
+            sql.SQL(', ').join(sql.SQL("EXCLUDED.{}").format(sql.Identifier(col)) for col in update_cols)
+        )
+    else:
+        on_conflict = sql.SQL("DO NOTHING")
+
+    cur.execute(sql.SQL("INSERT INTO football.{} ({}) SELECT {} FROM football.{} ON CONFLICT ({}) {}").format(
+        target, column_list, column_list, sql.Identifier(staging_name),
+        sql.SQL(', ').join(map(sql.Identifier, key_cols)), on_conflict
+    ))
+    rows = cur.rowcount
+    cur.execute(sql.SQL("TRUNCATE football.{}").format(sql.Identifier(staging_name)))
+    print(f"Upserted {rows} of {len(df)} rows into football.{table_name}")
+    return rows
+
+def read_needed_columns(cur, path, table_name, extra_cols=(), files=None):
+    """
+    Reads only the processed columns that football.<table_name> stores, plus extra_cols.
+    files limits a Parquet table to some of its part files.
+    """
+    wanted = set(table_columns(cur, table_name)) | set(extra_cols)
+    columns = [col for col in read_columns(path) if col.lower() in wanted]
+    if files is None or path.endswith('.csv'):
+        return read_table(path, columns=columns)
+    if not files:
+        return pd.DataFrame(columns=columns)
+    return read_parts(files, columns=columns)
+
+def removed_parts(manifest, path):
+    """
+    Part files of a processed table recorded at an earlier load that no longer
+    exist, e.g. those of a team whose raw file was removed.
+    """
+    directory = os.path.normpath(path)
+    return [part for part in manifest.keys('loaded')
+            if os.path.dirname(os.path.normpath(part)) == directory and not os.path.exists(part)]
+
+def build_reference_frames(team_tables, player_tables, league_id, season_id):
+    """
+    Derives the teams and players rows from the processed tables.
+    """
+    teams = read_table(team_tables['general_stats'], ['team_id', 'team_name']).drop_duplicates('team_id')
+    team_ids = dict(zip(teams['team_name'], teams['team_id']))
+
+    players = read_table(
+        player_tables['player_stats'],
+        ['player_id', 'player_name', 'team_name', 'player_country_code', 'player_age']
+    )
+    players['team_id'] = players['team_name'].map(team_ids)
+    players = players.dropna(subset=['team_id']).drop_duplicates('player_id', keep='last')
+
+    return {
+        'teams': teams.assign(league_id=league_id, season_id=season_id),
+        'players': players.assign(league_id=league_id, season_id=season_id),
+    }, team_ids
+
+def with_keys(df, key_cols, league_id, season_id, team_ids=None):
+    """
+    Adds league_id / season_id (and team_id for player tables) and keeps one row per key.
+    """
+    df = df.assign(league_id=league_id, season_id=season_id)
+    if team_ids is not None:
+        df['team_id'] = df['team_name'].map(team_ids)
+        df = df.dropna(subset=['team_id'])
+    return df.drop_duplicates(key_cols, keep='last')
+
+def load_league(cur, league_id):
+    """
+    Makes sure the leagues row exists.
+    """
+    league_name, country = LEAGUES.get(league_id, (league_id, 'Unknown'))
+    cur.execute(
+        "INSERT INTO football.leagues (league_id, league_name, country) VALUES (%s, %s, %s) "
+        "ON CONFLICT (league_id) DO NOTHING",
+        (league_id, league_name, country)
+    )
+    return cur.rowcount
+
+def load_season(cur, season_id):
+    """
+    Makes sure the seasons row exists.
+    """
+    start_year, end_year = (int(year) for year in season_id.split('-'))
+    cur.execute(
+        "INSERT INTO football.seasons (season_id, start_year, end_year) VALUES (%s, %s, %s) "
+        "ON CONFLICT (season_id) DO NOTHING",
+        (season_id, start_year, end_year)
+    )
+    return cur.rowcount
+
+def load_league_season(cur, league_id, season_id):
+    """
+    Makes sure the leagues and seasons rows exist.
+    """
+    load_league(cur, league_id)
+    load_season(cur, season_id)
+
+def load_stats_table(cur, table_name, path, league_id, season_id, incremental=False, files=None, team_ids=None):
+    """
+    Loads one processed stats table: upserted when incremental, otherwise the
+    league season is deleted and COPYed again. team_ids is given for player
+    tables, which get their team_id from it.
+
+    An incremental load also deletes the rows whose key is no longer in any
+    part of the table, e.g. those of a team whose raw file was removed.
+    """
+    ensure_partition(cur, table_name, league_id, season_id)
+    key_cols = PLAYER_KEY if team_ids is not None else TEAM_KEY
+    extra_cols = ['team_name'] if team_ids is not None else []
+    df = read_needed_columns(cur, path, table_name, extra_cols, files=files)
+    df = with_keys(df, key_cols[:1], league_id, season_id, team_ids)
+    if incremental:
+        rows = upsert_table(cur, df, table_name, key_cols)
+        if files is not None:
+            # Only the changed parts were read; the keys to keep come from all of them.
+            df = with_keys(read_table(path, columns=key_cols[:1] + extra_cols), key_cols[:1], league_id, season_id,
+                           team_ids)
+        return rows + prune_table(cur, df, table_name, key_cols, league_id, season_id)
+    cur.execute(
+        sql.SQL("DELETE FROM football.{} WHERE league_id = %s AND season_id = %s").format(sql.Identifier(table_name)),
+        (league_id, season_id)
+    )
+    return load_table(cur, df, table_name, league_id=league_id, season_id=season_id)
+
+def prune_table(cur, df, table_name, key_cols, league_id, season_id):
+    """
+    Deletes the rows of a league season whose key is no longer in df, e.g.
+    players who left the league. Fails if a stats row still references one.
+    """
+    key_col = key_cols[0]
+    cur.execute(
+        sql.SQL("DELETE FROM football.{} WHERE league_id = %s AND season_id = %s AND NOT ({} = ANY(%s))").format(
+            sql.Identifier(table_name), sql.Identifier(key_col)),
+        (league_id, season_id, [str(key) for key in df[key_col]])
+    )
+    if cur.rowcount:
+        print(f"Removed {cur.rowcount} stale rows from football.{table_name}")
+    return cur.rowcount
+
+def load_stats(league_id=LEAGUE_ID, season_id=SEASON_ID, processed_dir=PROCESSED_DIR, incremental=False,
+               only_changed=False, workers=LOAD_WORKERS):
+    """
+    Loads one league season of processed team and player statistics into the
+    football schema.
+
+    The tables are ordered by their foreign keys (leagues/seasons, teams,
+    players and team stats, player stats; see dependency_levels). The tables
+    of one level are loaded side by side over pooled connections, each in its
+    own transaction, so a table that fails does not roll back the others;
+    only the tables referencing it are skipped. teams and players are
+    upserted, as stats rows of the season may still reference them, and
+    stale rows are pruned once every stats table has been loaded (also when
+    incremental, see load_stats_table). A final
+    transaction records a player_stats snapshot for the rolling-form
+    features if player_stats changed, and the features are refreshed after
+    it commits.
+
+    Args:
+        incremental (bool): Merge into the existing rows with upsert_table instead
+            of deleting the season and COPYing it again. Only changed rows are written.
+        only_changed (bool): Also skip processed part files whose content hash
+            matches the one recorded in the manifest at the last load, and tables
+            with no changed or removed parts at all. Implies incremental.
+        workers (int): Number of tables loaded at the same time.
+
+    Returns:
+        dict: Table name -> rows loaded (or inserted/updated/deleted when incremental).
+        Raises RuntimeError after the others are committed if any table failed.
+    """
+    team_tables = all_team_tables = list_tables(os.path.join(processed_dir, 'team_stats'), league_id, season_id)
+    player_tables = all_player_tables = list_tables(os.path.join(processed_dir, 'player_stats'), league_id, season_id)
+    manifest = get_manifest()
+    changed_parts = {table_name: manifest.changed('loaded', table_files(path))
+                     for table_name, path in list(team_tables.items()) + list(player_tables.items())}
+    removed = {table_name: removed_parts(manifest, path)
+               for table_name, path in list(team_tables.items()) + list(player_tables.items())}
+    if only_changed:
+        incremental = True
+        skipped = [table_name for table_name, parts in changed_parts.items() if not parts and not removed[table_name]]
+        if skipped:
+            print(f"Skipping {len(skipped)} unchanged tables: {', '.join(skipped)}")
+        if len(skipped) == len(changed_parts):
+            return {}
+        team_tables = {table_name: path for table_name, path in team_tables.items() if table_name not in skipped}
+        player_tables = {table_name: path for table_name, path in player_tables.items() if table_name not in skipped}
+    reference_frames, team_ids = build_reference_frames(all_team_tables, all_player_tables, league_id, season_id)
+    reference_keys = {'teams': TEAM_KEY, 'players': PLAYER_KEY}
+
+    def load(table_name):
+        with transaction() as cur:
+            if table_name == 'leagues':
+                return load_league(cur, league_id)
+            if table_name == 'seasons':
+                return load_season(cur, season_id)
+            if table_name in reference_frames:
+                return upsert_table(cur, reference_frames[table_name], table_name, reference_keys[table_name])
+            files = sorted(changed_parts[table_name]) if only_changed else None
+            if table_name in team_tables:
+                return load_stats_table(cur, table_name, team_tables[table_name], league_id, season_id,
+                                        incremental, files)
+            return load_stats_table(cur, table_name, player_tables[table_name], league_id, season_id,
+                                    incremental, files, team_ids)
+
+    def prune(table_name):
+        with transaction() as cur:
+            return prune_table(cur, reference_frames[table_name], table_name, reference_keys[table_name],
+                               league_id, season_id)
+
+    loaded = {}
+    failed = {}
+    try:
+        with transaction() as cur:
+            references = foreign_keys(cur)
+        levels = dependency_levels(['leagues', 'seasons', 'teams', 'players'] + list(team_tables) + list(player_tables),
+                                   references)
+        for level in levels:
+            for table_name in level:
+                failed_parents = sorted(references.get(table_name, set()) & set(failed))
+                if failed_parents:
+                    failed[table_name] = f"skipped, {', '.join(failed_parents)} failed"
+            results, errors = run_per_table([table_name for table_name in level if table_name not in failed],
+                                            load, workers)
+            loaded.update(results)
+            failed.update(errors)
+        loaded = {table_name: rows for table_name, rows in loaded.items() if table_name not in ('leagues', 'seasons')}
+
+        if not failed:
+            # Children first: players before the teams they reference.
+            for table_name in ['players', 'teams']:
+                _, errors = run_per_table([table_name], prune, workers)
+                failed.update(errors)
+
+        if sum(loaded.values()):
+            with transaction() as cur:
+                create_feature_views(cur)
+                if loaded.get('player_stats'):
+                    record_snapshot(cur, league_id, season_id)
+                # Delivered on commit; tells the read API to drop its cached results.
+                cur.execute("SELECT pg_notify(%s, %s)", (LOAD_CHANNEL, f'{league_id}/{season_id}'))
+
+        for table_name in list(team_tables) + list(player_tables):
+            if table_name in loaded:
+                manifest.update('loaded', changed_parts[table_name])
+                manifest.forget('loaded', removed[table_name])
+        manifest.save()
+
+        print(f"Loaded {sum(loaded.values())} rows into {len(loaded)} tables.")
+        if sum(loaded.values()):
+            refresh_features()
+        if failed:
+            raise RuntimeError(f"{len(failed)} tables failed to load: "
+                               + '; '.join(f'{table_name}: {error}' for table_name, error in failed.items()))
+        return loaded
+
+    except (Exception, psycopg2.DatabaseError) as error:
+        print(f'Error loading statistics: {error}')
+        raise
+
+if __name__ == "__main__":
+    load_stats(incremental='--incremental' in sys.argv, only_changed='--only-changed' in sys.argv)
+    print(f"Connection pool: {pool_metrics()}")
@@ -0,0 +1,232 @@
+import os
+import sys
+from pathlib import Path
+from psycopg2 import sql
+
+sys.path.append(str(Path(__file__).resolve().parent.parent.parent))
+from connect import transaction
+
+# Milliseconds an ALTER TABLE waits for its lock before giving up, so a
+# migration never queues behind a long query while blocking every reader.
+LOCK_TIMEOUT_MS = int(os.getenv('MIGRATION_LOCK_TIMEOUT_MS', '5000'))
+
+# Column types in widening order, each with the types it can hold without loss.
+# A column is only ever moved to the first type holding both its current and its inferred type.
+WIDENING = [
+    ('boolean', {'boolean'}),
+    ('smallint', {'smallint'}),
+    ('integer', {'smallint', 'integer'}),
+    ('bigint', {'smallint', 'integer', 'bigint'}),
+    ('real', {'smallint', 'real'}),
+    ('double precision', {'smallint', 'integer', 'real', 'double precision'}),
+    ('numeric', {'smallint', 'integer', 'bigint', 'real', 'double precision', 'numeric'}),
+    ('text', {'boolean', 'smallint', 'integer', 'bigint', 'real', 'double precision', 'numeric', 'text'}),
+]
+
+# Float columns are widened through their text form, which is the shortest decimal that reads back
+# as the same value. A binary cast would turn a REAL 0.1 into 0.10000000149011612.
+FLOAT_TYPES = ('real', 'double precision')
+
+# Tables created with LIKE football.<table>, which have to follow its columns.
+COPIED_TABLES = {'player_stats': ['player_stats_history']}
+
+def table_columns(cur, table_name):
+    """
+    Returns {column_name: data_type} for football.<table_name>, in table order.
+    """
+    cur.execute(
+        """
+        SELECT column_name, data_type
+        FROM information_schema.columns
+        WHERE table_schema = 'football' AND table_name = %s
+        ORDER BY ordinal_position
+        """,
+        (table_name,)
+    )
+    return dict(cur.fetchall())
+
+def create_migrations_table(cur):
+    """
+    football.schema_migrations records every column added or widened, one
+    version number per change.
+    """
+    cur.execute(
+        """
+        CREATE TABLE IF NOT EXISTS football.schema_migrations (
+            version BIGSERIAL PRIMARY KEY,
+            table_name TEXT NOT NULL,
+            change TEXT NOT NULL,
+            column_name TEXT NOT NULL,
+            old_type TEXT,
+            new_type TEXT NOT NULL,
+            applied_at TIMESTAMPTZ NOT NULL DEFAULT now()
+        )
+        """
+    )
+
+def wider_type(current, inferred):
+    """
+    Type a column of type current has to be widened to so it also holds
+    inferred values, or None if it already does (or its type is not one the
+    loader creates). Columns are never narrowed.
+    """
+    current, inferred = current.lower(), inferred.lower()
+    holds = dict(WIDENING)
+    if current not in holds or inferred in holds[current]:
+        return None
+    for pg_type, types in WIDENING:
+        if current in types and inferred in types:
+            return pg_type.upper()
+    return None
+
+def plan_migration(existing, column_types):
+    """
+    Diffs the inferred columns of a table against the ones it has.
+
+    Args:
+        existing (dict): {column: data_type} as returned by table_columns.
+        column_types (dict): {column: Postgres type} from type inference.
+
+    Returns:
+        list: One dict per change with change ('add_column' or 'widen'),
+        column, old_type and new_type. Columns the table has but the data no
+        longer does are kept.
+    """
+    steps = []
+    for col, pg_type in column_types.items():
+        name = col.lower()
+        if name not in existing:
+            steps.append({'change': 'add_column', 'column': name, 'old_type': None, 'new_type': pg_type})
+            continue
+        target = wider_type(existing[name], pg_type)
+        if target is not None:
+            steps.append({'change': 'widen', 'column': name, 'old_type': existing[name], 'new_type': target})
+    return steps
+
+def drop_dependent_views(cur, table_name):
+    """
+    Drops the (materialised) views reading from football.<table_name>, which
+    would otherwise block a type change and miss added columns. The feature
+    views are created again by create_feature_views.
+
+    Returns:
+        list: Names of the views dropped.
+    """
+    cur.execute(
+        """
+        SELECT DISTINCT v.relname, v.relkind
+        FROM pg_depend d
+        JOIN pg_rewrite r ON r.oid = d.objid
+        JOIN pg_class v ON v.oid = r.ev_class
+        JOIN pg_class t ON t.oid = d.refobjid
+        JOIN pg_namespace n ON n.oid = t.relnamespace
+        WHERE n.nspname = 'football' AND t.relname = %s AND v.oid <> t.oid AND v.relkind IN ('v', 'm')
+        """,
+        (table_name,)
+    )
+    views = cur.fetchall()
+    for view_name, kind in views:
+        statement = "DROP MATERIALIZED VIEW IF EXISTS football.{} CASCADE" if kind == 'm' else \
+            "DROP VIEW IF EXISTS football.{} CASCADE"
+        cur.execute(sql.SQL(statement).format(sql.Identifier(view_name)))
+    return [view_name for view_name, _ in views]
+
+def apply_step(cur, table_name, step):
+    target = sql.Identifier(table_name)
+    column = sql.Identifier(step['column'])
+    if step['change'] == 'add_column':
+        # No default, so Postgres only updates the catalog and leaves the rows untouched.
+        cur.execute(sql.SQL("ALTER TABLE football.{} ADD COLUMN IF NOT EXISTS {} {}").format(
+            target, column, sql.SQL(step['new_type'])))
+    else:
+        value = sql.SQL("{}::text").format(column) if step['old_type'].lower() in FLOAT_TYPES else column
+        cur.execute(sql.SQL("ALTER TABLE football.{} ALTER COLUMN {} TYPE {} USING {}::{}").format(
+            target, column, sql.SQL(step['new_type']), value, sql.SQL(step['new_type'])))
+    cur.execute(
+        "INSERT INTO football.schema_migrations (table_name, change, column_name, old_type, new_type) "
+        "VALUES (%s, %s, %s, %s, %s) RETURNING version",
+        (table_name, step['change'], step['column'], step['old_type'], step['new_type'])
+    )
+    return cur.fetchone()[0]
+
+def migrate_table(cur, table_name, column_types):
+    """
+    Brings an existing football.<table_name> (and the tables copied from it)
+    up to the inferred column types with ALTER TABLE ADD COLUMN and type
+    widening, instead of dropping and reloading it.
+
+    The changes run under a savepoint of the caller's transaction: they are
+    committed with it, and a failed change rolls back all of them but leaves
+    the transaction usable. The unlogged staging table of an altered table is
+    dropped so the next upsert recreates it with the new columns.
+
+    Returns:
+        list: The applied steps (see plan_migration), each with its table and version.
+    """
+    plans = []
+    for name in [table_name] + COPIED_TABLES.get(table_name, []):
+        existing = table_columns(cur, name)
+        steps = plan_migration(existing, column_types) if existing else []
+        if steps:
+            plans.append((name, steps))
+    if not plans:
+        return []
+
+    create_migrations_table(cur)
+    cur.execute("SELECT current_setting('lock_timeout'), current_setting('extra_float_digits')")
+    lock_timeout, float_digits = cur.fetchone()
+    cur.execute("SAVEPOINT migrate_table")
+    applied = []
+    try:
+        cur.execute("SELECT set_config('lock_timeout', %s, true)", (f'{LOCK_TIMEOUT_MS}ms',))
+        # Shortest exact text for floats (the default since Postgres 12), whatever the session set.
+        cur.execute("SELECT set_config('extra_float_digits', '1', true)")
+        for name, steps in plans:
+            drop_dependent_views(cur, name)
+            for step in steps:
+                applied.append(dict(step, table=name, version=apply_step(cur, name, step)))
+            cur.execute(sql.SQL("DROP TABLE IF EXISTS football.{}").format(sql.Identifier(f'{name}_staging')))
+    except Exception:
+        cur.execute("ROLLBACK TO SAVEPOINT migrate_table")
+        raise
+    finally:
+        cur.execute("SELECT set_config('lock_timeout', %s, true)", (lock_timeout,))
+        cur.execute("SELECT set_config('extra_float_digits', %s, true)", (float_digits,))
+    cur.execute("RELEASE SAVEPOINT migrate_table")
+
+    for step in applied:
+        old_type = f" from {step['old_type'].upper()}" if step['old_type'] else ''
+        action = 'added' if step['change'] == 'add_column' else 'widened'
+        print(f"Migration {step['version']}: {action} football.{step['table']}.{step['column']}"
+              f"{old_type} to {step['new_type']}")
+    return applied
+
+def migration_history(cur, table_name=None):
+    """
+    Returns the recorded migrations, oldest first, optionally of one table only.
+    """
+    cur.execute("SELECT to_regclass('football.schema_migrations')")
+    if cur.fetchone()[0] is None:
+        return []
+    cur.execute(
+        "SELECT version, table_name, change, column_name, old_type, new_type, applied_at "
+        "FROM football.schema_migrations WHERE %s IS NULL OR table_name = %s ORDER BY version",
+        (table_name, table_name)
+    )
+    columns = [column.name for column in cur.description]
+    return [dict(zip(columns, row)) for row in cur.fetchall()]
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description='List the schema migrations applied to the football schema.')
+    parser.add_argument('--table', help='Only show migrations of this table.')
+    args = parser.parse_args()
+
+    with transaction() as cur:
+        history = migration_history(cur, args.table)
+    for migration in history:
+        print(f"{migration['version']:>5}  {migration['applied_at']:%Y-%m-%d %H:%M:%S}  "
+              f"{migration['table_name']}.{migration['column_name']}  {migration['change']}  "
+              f"{migration['old_type'] or '-'} -> {migration['new_type']}")
+    print(f"{len(history)} migrations.")
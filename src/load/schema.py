@@ -1,37 +1,158 @@
 import psycopg2
-from psycopg2 import sql
 import os
+import re
 import sys
-import pandas as pd
-import glob
+from concurrent.futures import ThreadPoolExecutor, as_completed
 from pathlib import Path
 
 sys.path.append(str(Path(__file__).resolve().parent.parent.parent))
-from config import load_config
+from connect import transaction, MAX_CONNECTIONS
+from src.transform.store import list_tables
+from src.load.type_inference import infer_table_schema
+from src.load.migrations import create_migrations_table, migrate_table, table_columns
+from src.load.features import create_feature_views, feature_views_exist, refresh_features
 
-def create_schema():
+# Stats tables are LIST-partitioned by season_id; set to '1' to sub-partition each season by league_id.
+PARTITION_BY_LEAGUE = os.getenv('PARTITION_BY_LEAGUE', '0') == '1'
 
-    config = load_config()
+# Stat columns the FPL bot ranks by. Each one present in a stats table gets a
+# (league_id, season_id, <column> DESC) index that also covers the row key.
+RANKING_COLUMNS = ['xg', 'non_pen_xg', 'xg_assist', 'gls', 'ast', 'min']
+
+# Tables created or loaded at the same time, each in its own transaction on a pooled connection.
+LOAD_WORKERS = int(os.getenv('DB_LOAD_WORKERS', str(MAX_CONNECTIONS)))
+
+PROCESSED_DIR = Path(__file__).resolve().parent.parent.parent / 'data' / 'processed'
+
+def create_schema(league_id='9', season_id='2024-2025', workers=LOAD_WORKERS):
+    """
+    Creates the football schema and the stats tables of one league season.
+
+    The reference tables (leagues, seasons, teams, players), which the stats
+    tables reference, are created first in one transaction. The stats tables
+    do not reference each other, so they are then created side by side, each
+    in its own transaction; one that fails does not undo the others. Tables
+    that already exist are migrated to the inferred columns (see
+    src/load/migrations.py), and feature views dropped by a migration are
+    created again and refreshed.
+
+    Args:
+        workers (int): Number of tables created at the same time.
+
+    Returns:
+        list: The migrations applied.
+    """
     try:
-        with psycopg2.connect(**config) as conn:
-            with conn.cursor() as cur:
-                cur.execute("CREATE SCHEMA IF NOT EXISTS football")
-                print("Schema 'football' created successfully.")
-                
-                create_reference_tables(cur)
-                
-                team_stats_path = str(Path(__file__).resolve().parent.parent.parent / 'data' / 'processed' / 'team_stats')
-                create_team_stats_tables(cur, team_stats_path)
-                
-                player_stats_path = str(Path(__file__).resolve().parent.parent.parent / 'data' / 'processed' / 'player_stats.csv')
-                create_player_stats_tables(cur, player_stats_path)
-                
-                print("All tables created successfully.")
+        with transaction() as cur:
+            cur.execute("CREATE SCHEMA IF NOT EXISTS football")
+            print("Schema 'football' created successfully.")
+            
+            create_reference_tables(cur)
+            create_migrations_table(cur)
+
+        tables = {}
+        for kind, table_type in [('team_stats', 'team'), ('player_stats', 'player')]:
+            stats_dir = str(PROCESSED_DIR / kind)
+            found = list_tables(stats_dir, league_id, season_id)
+            if not found:
+                print(f"No processed tables found in {stats_dir}")
+            tables.update({table_name: (path, table_type) for table_name, path in found.items()})
+
+        def create(table_name):
+            path, table_type = tables[table_name]
+            with transaction() as cur:
+                migrations = create_table_from_types(cur, infer_table_schema(path), table_name, table_type)
+                ensure_partition(cur, table_name, league_id, season_id)
+            return migrations
+
+        results, errors = run_per_table(list(tables), create, workers)
+        migrations = [migration for table_name in tables for migration in results.get(table_name, [])]
+
+        rebuild_views = False
+        if migrations:
+            with transaction() as cur:
+                rebuild_views = not feature_views_exist(cur)
+                if rebuild_views:
+                    create_feature_views(cur)
+        if rebuild_views:
+            refresh_features()
+
+        print(f"{len(results)} of {len(tables)} stats tables created successfully.")
+        return migrations
 
     except (Exception, psycopg2.DatabaseError) as error:
         print(f'Error creating schema: {error}')
         raise
 
+def foreign_keys(cur):
+    """
+    Returns {table: set of tables it references} for the football schema.
+    Partitions are left out, as they inherit the foreign keys of their parent.
+    """
+    cur.execute(
+        """
+        SELECT c.relname, r.relname
+        FROM pg_constraint k
+        JOIN pg_class c ON c.oid = k.conrelid
+        JOIN pg_class r ON r.oid = k.confrelid
+        JOIN pg_namespace n ON n.oid = c.relnamespace
+        WHERE k.contype = 'f' AND n.nspname = 'football' AND NOT c.relispartition
+        """
+    )
+    references = {}
+    for table_name, referenced in cur.fetchall():
+        references.setdefault(table_name, set()).add(referenced)
+    return references
+
+def dependency_levels(tables, references):
+    """
+    Orders tables by their foreign keys: every table comes in a later level
+    than the tables it references, and the tables of one level can be loaded
+    at the same time (e.g. [leagues, seasons], [teams], [players, team stats],
+    [player stats]). References to tables outside the list are ignored.
+
+    Returns:
+        list: Lists of table names, in the input order within a level.
+    """
+    remaining = {table_name: {referenced for referenced in references.get(table_name, ())
+                              if referenced in tables and referenced != table_name}
+                 for table_name in tables}
+    levels = []
+    while remaining:
+        level = [table_name for table_name in tables if table_name in remaining and not remaining[table_name]]
+        if not level:
+            raise ValueError(f"Foreign key cycle between {', '.join(sorted(remaining))}")
+        levels.append(level)
+        for table_name in level:
+            del remaining[table_name]
+        for referenced in remaining.values():
+            referenced.difference_update(level)
+    return levels
+
+def run_per_table(table_names, work, workers=LOAD_WORKERS):
+    """
+    Calls work(table_name) for every table, up to workers at a time. work
+    opens its own transaction, so a table that fails does not stop or roll
+    back the others.
+
+    Returns:
+        tuple: ({table: result} of the tables that succeeded, {table: error} of the ones that failed)
+    """
+    results = {}
+    errors = {}
+    if not table_names:
+        return results, errors
+    with ThreadPoolExecutor(max_workers=max(1, min(workers, len(table_names)))) as executor:
+        futures = {executor.submit(work, table_name): table_name for table_name in table_names}
+        for future in as_completed(futures):
+            table_name = futures[future]
+            try:
+                results[table_name] = future.result()
+            except Exception as e:
+                print(f"Error processing football.{table_name}: {e}")
+                errors[table_name] = str(e)
+    return results, errors
+
 def create_reference_tables(cur):
 
     commands = [
@@ -79,35 +200,58 @@ def create_reference_tables(cur):
     for command in commands:
         cur.execute(command)
 
+    # Foreign-key lookup: all players of a team.
+    create_index(cur, 'players', ['team_id', 'league_id', 'season_id'])
+
     print("Reference tables created successfully.")
 
-def create_team_stats_tables(cur, team_stats_dir):
+def create_team_stats_tables(cur, team_stats_dir, league_id='9', season_id='2024-2025'):
     
-    csv_files = glob.glob(os.path.join(team_stats_dir, "*.csv"))
+    tables = list_tables(team_stats_dir, league_id, season_id)
     
-    if not csv_files:
-        print(f"No CSV files found in {team_stats_dir}")
-        return
+    if not tables:
+        print(f"No processed tables found in {team_stats_dir}")
+        return []
     
-    for csv_path in csv_files:
+    migrations = []
+    for table_name, path in tables.items():
         try:
-            create_table_from_csv(cur, csv_path, table_type='team')
+            migrations += create_table_from_types(cur, infer_table_schema(path), table_name, table_type='team')
+            ensure_partition(cur, table_name, league_id, season_id)
         except Exception as e:
-            print(f"Error processing {csv_path}: {e}")
+            print(f"Error processing {path}: {e}")
+    return migrations
 
-def create_player_stats_tables(cur, player_stats_path):
+def create_player_stats_tables(cur, player_stats_dir, league_id='9', season_id='2024-2025'):
 
-    try:
-        create_table_from_csv(cur, player_stats_path, table_type='player')
-    except Exception as e:
-        print(f"Error processing player stats: {e}")
+    tables = list_tables(player_stats_dir, league_id, season_id)
 
-def create_table_from_csv(cur, csv_path, table_type='team'):
+    if not tables:
+        print(f"No processed tables found in {player_stats_dir}")
+        return []
     
-    df = pd.read_csv(csv_path)
+    migrations = []
+    for table_name, path in tables.items():
+        try:
+            migrations += create_table_from_types(cur, infer_table_schema(path), table_name, table_type='player')
+            ensure_partition(cur, table_name, league_id, season_id)
+        except Exception as e:
+            print(f"Error processing {path}: {e}")
+    return migrations
+
+def create_table_from_csv(cur, csv_path, table_type='team'):
     
     table_name = os.path.splitext(os.path.basename(csv_path))[0]
-    
+    return create_table_from_types(cur, infer_table_schema(csv_path), table_name, table_type)
+
+def create_table_from_types(cur, column_types, table_name, table_type='team'):
+    """
+    Creates football.<table_name> from inferred column types, or migrates it
+    when it already exists with other columns.
+
+    Returns:
+        list: The migrations applied (see migrate_table).
+    """
     if table_type == 'team':
         primary_key_cols = ['team_id']
         reference_cols = primary_key_cols + ['team_name']
@@ -115,19 +259,9 @@ def create_table_from_csv(cur, csv_path, table_type='team'):
         primary_key_cols = ['player_id']
         reference_cols = primary_key_cols + ['player_name', 'team_name', 'player_country_code', 'player_age', 'section']
     
-    stat_cols = [col for col in df.columns if col not in reference_cols]
-    
-    
-    column_definitions = []
-    for col in stat_cols:
-        
-        if pd.api.types.is_numeric_dtype(df[col]):
-            if df[col].apply(lambda x: x == int(x) if pd.notnull(x) else True).all():
-                column_definitions.append(f"{col} INTEGER")
-            else:
-                column_definitions.append(f"{col} FLOAT")
-        else:
-            column_definitions.append(f"{col} TEXT")    
+    stats_types = {col: pg_type for col, pg_type in column_types.items() if col not in reference_cols}
+    column_definitions = [f"{col} {pg_type}" for col, pg_type in stats_types.items()]
+    migrations = migrate_table(cur, table_name, stats_types)
 
     if table_type == 'team':
         create_table_sql = f"""
@@ -139,7 +273,7 @@ def create_table_from_csv(cur, csv_path, table_type='team'):
             PRIMARY KEY (team_id, league_id, season_id),
             FOREIGN KEY (team_id, league_id, season_id)
                 REFERENCES football.teams (team_id, league_id, season_id)
-        )
+        ) PARTITION BY LIST (season_id)
         """
     else:  
         create_table_sql = f"""
@@ -154,14 +288,96 @@ def create_table_from_csv(cur, csv_path, table_type='team'):
                 REFERENCES football.players (player_id, league_id, season_id),
             FOREIGN KEY (team_id, league_id, season_id)
                 REFERENCES football.teams (team_id, league_id, season_id)
-        )
+        ) PARTITION BY LIST (season_id)
         """
     cur.execute(create_table_sql)
+    create_stats_indexes(cur, table_name, table_type, column_types)
     print(f"Table football.{table_name} created successfully.")
+    return migrations
 
-if __name__ == "__main__":
+def create_index(cur, table_name, columns, include=()):
+    """
+    CREATE INDEX IF NOT EXISTS on football.<table_name>. Columns may carry
+    an ordering such as 'xg DESC NULLS LAST'.
+    """
+    name_parts = [column.split()[0] for column in columns]
+    index_name = f"{table_name}_{'_'.join(name_parts)}_idx"[:63]
+    include_sql = f" INCLUDE ({', '.join(include)})" if include else ''
+    cur.execute(
+        f"CREATE INDEX IF NOT EXISTS {index_name} ON football.{table_name} ({', '.join(columns)}){include_sql}"
+    )
 
+def create_stats_indexes(cur, table_name, table_type, column_types):
+    """
+    Indexes a stats table for the bot's query patterns: the team foreign key
+    (all player stats for a team) and ranking columns (top N by a stat this season).
+    """
+    key_col = 'team_id' if table_type == 'team' else 'player_id'
+    if table_type == 'player':
+        create_index(cur, table_name, ['team_id', 'league_id', 'season_id'])
+    for col in RANKING_COLUMNS:
+        if col in column_types:
+            create_index(cur, table_name, ['league_id', 'season_id', f'{col} DESC NULLS LAST'], include=[key_col])
 
-    
+def partition_name(table_name, value):
+    return f"{table_name}_{re.sub(r'[^0-9a-zA-Z]+', '_', str(value))}"
+
+def is_partitioned(cur, table_name):
+    cur.execute(
+        """
+        SELECT 1
+        FROM pg_partitioned_table p
+        JOIN pg_class c ON c.oid = p.partrelid
+        JOIN pg_namespace n ON n.oid = c.relnamespace
+        WHERE n.nspname = 'football' AND c.relname = %s
+        """,
+        (table_name,)
+    )
+    return cur.fetchone() is not None
+
+def ensure_partition(cur, table_name, league_id, season_id):
+    """
+    Attaches the season partition (and league sub-partition when
+    PARTITION_BY_LEAGUE is set) of a stats table if it does not exist yet.
+    Tables created before partitioning was introduced are left alone.
+    """
+    if not is_partitioned(cur, table_name):
+        return
+    season_partition = partition_name(table_name, season_id)
+    if PARTITION_BY_LEAGUE:
+        cur.execute(
+            f"CREATE TABLE IF NOT EXISTS football.{season_partition} PARTITION OF football.{table_name} "
+            f"FOR VALUES IN (%s) PARTITION BY LIST (league_id)",
+            (season_id,)
+        )
+        cur.execute(
+            f"CREATE TABLE IF NOT EXISTS football.{partition_name(season_partition, league_id)} "
+            f"PARTITION OF football.{season_partition} FOR VALUES IN (%s)",
+            (league_id,)
+        )
+    else:
+        cur.execute(
+            f"CREATE TABLE IF NOT EXISTS football.{season_partition} PARTITION OF football.{table_name} "
+            f"FOR VALUES IN (%s)",
+            (season_id,)
+        )
+
+def leaf_partition(cur, table_name, league_id, season_id):
+    """
+    Partition holding the rows of one league season: the season partition, or
+    its league sub-partition when PARTITION_BY_LEAGUE was set at creation.
+
+    Returns:
+        tuple: (parent table, partition, the partition's list value), or None
+        when the table is not partitioned.
+    """
+    if not is_partitioned(cur, table_name):
+        return None
+    season_partition = partition_name(table_name, season_id)
+    if is_partitioned(cur, season_partition):
+        return season_partition, partition_name(season_partition, league_id), league_id
+    return table_name, season_partition, season_id
+
+if __name__ == "__main__":
+    create_schema()
     print("\nSchema creation process completed.")
-    
\ No newline at end of file
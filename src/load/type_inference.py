@@ -0,0 +1,101 @@
+import os
+import sys
+import json
+import threading
+import numpy as np
+import pandas as pd
+from pathlib import Path
+
+sys.path.append(str(Path(__file__).resolve().parent.parent.parent))
+from src.transform.store import fingerprint, read_table
+from src.transform.dtypes import fits_real, widen_float32
+
+# Larger inputs are inferred from a random sample of this many rows,
+# taken from at most READ_ROWS rows read off disk.
+SAMPLE_ROWS = 100000
+READ_ROWS = 1000000
+# Integer columns must fit this many times over in the chosen type, so a
+# growing season total does not overflow a narrow column mid-season.
+HEADROOM = 4
+
+INTEGER_RANGES = [
+    ('SMALLINT', np.iinfo(np.int16)),
+    ('INTEGER', np.iinfo(np.int32)),
+    ('BIGINT', np.iinfo(np.int64)),
+]
+
+SCHEMA_CACHE_FILE = Path(__file__).resolve().parent.parent.parent / 'data' / 'cache' / 'schema_types.json'
+_cache_lock = threading.Lock()
+
+def is_percentage(col):
+    name = str(col).lower()
+    return name.startswith('pct_') or name.endswith('_pct') or '_pct_' in name
+
+def infer_column_type(col, series):
+    """
+    Picks the narrowest safe Postgres type for one column using vectorised checks.
+    """
+    if pd.api.types.is_bool_dtype(series):
+        return 'BOOLEAN'
+    if not pd.api.types.is_numeric_dtype(series):
+        return 'TEXT'
+
+    values = series.to_numpy(dtype='float64', na_value=np.nan)
+    if series.dtype == np.float32:
+        values = widen_float32(values)
+    values = values[np.isfinite(values)]
+    if values.size == 0:
+        return 'INTEGER'
+
+    if np.all(np.mod(values, 1) == 0):
+        low, high = values.min() * HEADROOM, values.max() * HEADROOM
+        for pg_type, limits in INTEGER_RANGES:
+            if limits.min <= low and high <= limits.max:
+                return pg_type
+        return 'NUMERIC'
+
+    if is_percentage(col):
+        return 'NUMERIC'
+    return 'REAL' if fits_real(values) else 'DOUBLE PRECISION'
+
+def infer_schema(df, sample_rows=SAMPLE_ROWS):
+    """
+    Returns {column: Postgres type} for a DataFrame, sampling large frames.
+    """
+    if len(df) > sample_rows:
+        df = df.sample(n=sample_rows, random_state=0)
+    return {col: infer_column_type(col, df[col]) for col in df.columns}
+
+def _load_cache():
+    try:
+        with open(SCHEMA_CACHE_FILE, 'r') as f:
+            return json.load(f)
+    except (FileNotFoundError, json.JSONDecodeError):
+        return {}
+
+def _save_cache(cache):
+    os.makedirs(os.path.dirname(SCHEMA_CACHE_FILE), exist_ok=True)
+    tmp_file = f'{SCHEMA_CACHE_FILE}.tmp'
+    with open(tmp_file, 'w') as f:
+        json.dump(cache, f, indent=2)
+    os.replace(tmp_file, SCHEMA_CACHE_FILE)
+
+def infer_table_schema(path, sample_rows=SAMPLE_ROWS):
+    """
+    Infers the column types of a processed table (CSV file or Parquet
+    directory). The result is cached per input path and reused while its
+    fingerprint is unchanged, so the file is not even read again.
+    """
+    path = str(path)
+    input_fingerprint = fingerprint(path)
+    with _cache_lock:
+        cached = _load_cache().get(path)
+    if cached and cached['fingerprint'] == input_fingerprint:
+        return dict(cached['columns'])
+
+    column_types = infer_schema(read_table(path, nrows=READ_ROWS, compact=False), sample_rows)
+    with _cache_lock:
+        cache = _load_cache()
+        cache[path] = {'fingerprint': input_fingerprint, 'columns': list(column_types.items())}
+        _save_cache(cache)
+    return column_types
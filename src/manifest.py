@@ -0,0 +1,98 @@
+import os
+import json
+import hashlib
+import threading
+
+MANIFEST_FILE = os.getenv('ETL_MANIFEST_FILE', 'data/cache/manifest.json')
+
+
+def file_hash(path):
+    """
+    SHA-256 of a file's contents.
+    """
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for block in iter(lambda: f.read(1 << 20), b''):
+            digest.update(block)
+    return digest.hexdigest()
+
+def content_hash(data):
+    return hashlib.sha256(data).hexdigest()
+
+
+class Manifest:
+    """
+    Content hashes of the files each stage has handled, kept in one JSON file:
+
+        raw          raw file -> hash of the content last written by extract
+        transformed  raw file -> hash it had when its processed parts were written
+        loaded       processed part file -> hash it had when it was loaded
+
+    A stage compares the current hash of its inputs with its own section and
+    only reprocesses the files that differ.
+    """
+
+    def __init__(self, path=MANIFEST_FILE):
+        self.path = path
+        self.lock = threading.Lock()
+        try:
+            with open(path, 'r') as f:
+                self.entries = json.load(f)
+        except (FileNotFoundError, json.JSONDecodeError):
+            self.entries = {}
+
+    def get(self, stage, key):
+        with self.lock:
+            return self.entries.get(stage, {}).get(key)
+
+    def keys(self, stage):
+        with self.lock:
+            return list(self.entries.get(stage, {}))
+
+    def changed(self, stage, paths):
+        """
+        Returns:
+            dict: Path -> current hash, for the paths whose hash differs from the one recorded for stage.
+        """
+        current = {path: file_hash(path) for path in paths}
+        with self.lock:
+            recorded = self.entries.get(stage, {})
+            return {path: digest for path, digest in current.items() if recorded.get(path) != digest}
+
+    def update(self, stage, hashes):
+        with self.lock:
+            self.entries.setdefault(stage, {}).update(hashes)
+
+    def forget(self, stage, keys=None):
+        """
+        Drops the given keys from a stage's section, or the whole section.
+        """
+        with self.lock:
+            if keys is None:
+                self.entries.pop(stage, None)
+                return
+            section = self.entries.get(stage, {})
+            for key in keys:
+                section.pop(key, None)
+
+    def save(self):
+        with self.lock:
+            os.makedirs(os.path.dirname(self.path) or '.', exist_ok=True)
+            tmp_file = f'{self.path}.tmp'
+            with open(tmp_file, 'w') as f:
+                json.dump(self.entries, f, indent=2, sort_keys=True)
+            os.replace(tmp_file, self.path)
+
+
+_manifest = None
+_manifest_lock = threading.Lock()
+
+def get_manifest():
+    """
+    Returns the process-wide Manifest, so concurrent stages never overwrite each other's records.
+    """
+    global _manifest
+    with _manifest_lock:
+        if _manifest is None:
+            _manifest = Manifest()
+        return _manifest
@@ -0,0 +1,272 @@
+"""
+Process-wide instrumentation: stage spans, latency histograms and profiles.
+
+    with span('stage', stage='load', league='9') as s:
+        ...
+        s.add(rows_out=1200, bytes_written=40960)
+
+    observe('http_request_seconds', 0.21, endpoint='player-season-stats', status='200')
+
+write_jsonl() appends every finished span and histogram as JSON lines and
+prometheus_text() renders the same data in the Prometheus text format.
+profile() wraps a block in cProfile and tracemalloc and writes both reports to disk.
+"""
+import os
+import io
+import json
+import time
+import pstats
+import cProfile
+import threading
+import tracemalloc
+from contextlib import contextmanager
+from datetime import datetime, timezone
+
+METRICS_DIR = os.getenv('ETL_METRICS_DIR', 'data/metrics')
+PROFILE_DIR = os.path.join(METRICS_DIR, 'profiles')
+# Upper bounds in seconds, shared by every latency histogram.
+BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+# Lines of cProfile and tracemalloc output kept in a profile report.
+PROFILE_TOP = 40
+
+SPAN_COUNTERS = ('rows_in', 'rows_out', 'bytes_read', 'bytes_written')
+
+
+class Span:
+    """
+    One timed unit of work: wall and CPU seconds plus the rows and bytes it
+    read and wrote. CPU time is the running thread's, so spans of stages
+    running side by side do not count each other's work.
+    """
+
+    def __init__(self, name, labels):
+        self.name = name
+        self.labels = labels
+        self.counters = dict.fromkeys(SPAN_COUNTERS, 0)
+        self.status = 'ok'
+        self.started_at = time.time()
+        self.wall_seconds = 0.0
+        self.cpu_seconds = 0.0
+
+    def add(self, **counters):
+        for counter, value in counters.items():
+            self.counters[counter] = self.counters.get(counter, 0) + (value or 0)
+
+    def to_dict(self):
+        return {
+            'type': 'span',
+            'name': self.name,
+            'labels': self.labels,
+            'status': self.status,
+            'started_at': datetime.fromtimestamp(self.started_at, timezone.utc).isoformat(),
+            'wall_seconds': self.wall_seconds,
+            'cpu_seconds': self.cpu_seconds,
+            **self.counters,
+        }
+
+
+class Histogram:
+    """
+    Cumulative-bucket histogram of one metric and label set.
+    """
+
+    def __init__(self, buckets=BUCKETS):
+        self.buckets = buckets
+        self.counts = [0] * len(buckets)
+        self.count = 0
+        self.sum = 0.0
+
+    def observe(self, value):
+        self.count += 1
+        self.sum += value
+        for i, bound in enumerate(self.buckets):
+            if value <= bound:
+                self.counts[i] += 1
+
+
+class Registry:
+    """
+    Finished spans and histograms, shared by every thread of the process.
+    """
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.spans = []
+        self.histograms = {}
+
+    def record_span(self, span):
+        with self.lock:
+            self.spans.append(span)
+
+    def observe(self, name, value, labels):
+        key = (name, tuple(sorted(labels.items())))
+        with self.lock:
+            histogram = self.histograms.get(key)
+            if histogram is None:
+                histogram = self.histograms[key] = Histogram()
+            histogram.observe(value)
+
+    def reset(self):
+        with self.lock:
+            self.spans = []
+            self.histograms = {}
+
+
+_registry = Registry()
+# Profiles running in parallel threads share tracemalloc, which stays on until the last one ends.
+_tracing_lock = threading.Lock()
+_tracing_users = 0
+
+def get_registry():
+    return _registry
+
+@contextmanager
+def span(name, **labels):
+    """
+    Times the block as a span. The yielded Span takes row and byte counts via add().
+    A span whose block raises is recorded with status 'error'.
+    """
+    current = Span(name, {key: str(value) for key, value in labels.items()})
+    wall_start, cpu_start = time.perf_counter(), time.thread_time()
+    try:
+        yield current
+    except BaseException:
+        current.status = 'error'
+        raise
+    finally:
+        current.wall_seconds = time.perf_counter() - wall_start
+        current.cpu_seconds = time.thread_time() - cpu_start
+        _registry.record_span(current)
+
+def observe(name, seconds, **labels):
+    """
+    Adds a latency observation to the histogram of name and labels.
+    """
+    _registry.observe(name, seconds, {key: str(value) for key, value in labels.items()})
+
+def file_bytes(paths):
+    return sum(os.path.getsize(path) for path in paths if os.path.exists(path))
+
+def records():
+    """
+    Returns:
+        list: Every finished span, then every histogram, as dicts.
+    """
+    with _registry.lock:
+        spans = [span.to_dict() for span in _registry.spans]
+        histograms = [{
+            'type': 'histogram',
+            'name': name,
+            'labels': dict(labels),
+            'count': histogram.count,
+            'sum': histogram.sum,
+            'buckets': dict(zip(map(str, histogram.buckets), histogram.counts)),
+        } for (name, labels), histogram in _registry.histograms.items()]
+    return spans + histograms
+
+def write_jsonl(path):
+    """
+    Appends the current spans and histograms to a JSON lines file.
+    """
+    os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+    with open(path, 'a') as f:
+        for record in records():
+            f.write(json.dumps(record) + '\n')
+
+def _labels(labels, **extra):
+    labels = {**labels, **extra}
+    if not labels:
+        return ''
+    return '{' + ','.join(f'{key}="{_escape(value)}"' for key, value in labels.items()) + '}'
+
+def _escape(value):
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+def prometheus_text(prefix='football_etl'):
+    """
+    Renders spans as per-span gauges (last value) and histograms in the
+    Prometheus text exposition format.
+    """
+    lines = []
+    with _registry.lock:
+        spans = list(_registry.spans)
+        histograms = list(_registry.histograms.items())
+
+    latest = {}
+    for finished in spans:
+        latest[(finished.name, tuple(sorted(finished.labels.items())))] = finished
+    for field in ('wall_seconds', 'cpu_seconds') + SPAN_COUNTERS:
+        metric = f'{prefix}_span_{field}'
+        lines.append(f'# TYPE {metric} gauge')
+        for (name, labels), finished in latest.items():
+            value = getattr(finished, field) if field.endswith('seconds') else finished.counters[field]
+            lines.append(f'{metric}{_labels(dict(labels), span=name)} {value}')
+
+    for name in sorted({name for (name, _), _ in histograms}):
+        metric = f'{prefix}_{name}'
+        lines.append(f'# TYPE {metric} histogram')
+        for (histogram_name, labels), histogram in histograms:
+            if histogram_name != name:
+                continue
+            labels = dict(labels)
+            for bound, count in zip(histogram.buckets, histogram.counts):
+                lines.append(f'{metric}_bucket{_labels(labels, le=bound)} {count}')
+            lines.append(f'{metric}_bucket{_labels(labels, le="+Inf")} {histogram.count}')
+            lines.append(f'{metric}_sum{_labels(labels)} {histogram.sum}')
+            lines.append(f'{metric}_count{_labels(labels)} {histogram.count}')
+    return '\n'.join(lines) + '\n'
+
+def write_prometheus(path):
+    """
+    Writes prometheus_text() atomically, e.g. for node_exporter's textfile collector.
+    """
+    os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+    tmp_file = f'{path}.tmp'
+    with open(tmp_file, 'w') as f:
+        f.write(prometheus_text())
+    os.replace(tmp_file, path)
+
+@contextmanager
+def profile(name, directory=PROFILE_DIR):
+    """
+    Runs the block under cProfile and tracemalloc and writes <name>.prof (load
+    it with pstats or snakeviz) and <name>.txt, with the heap peak, the lines
+    holding the most memory at the end of the block and the top functions by
+    cumulative time.
+
+    cProfile only sees the calling thread, and work done in worker processes
+    is not included. tracemalloc is process-wide, so when stages are profiled
+    side by side their heap figures include each other's allocations.
+    """
+    global _tracing_users
+    os.makedirs(directory, exist_ok=True)
+    profiler = cProfile.Profile()
+    with _tracing_lock:
+        if _tracing_users == 0 and not tracemalloc.is_tracing():
+            tracemalloc.start()
+            tracemalloc.reset_peak()
+        _tracing_users += 1
+    profiler.enable()
+    try:
+        yield
+    finally:
+        profiler.disable()
+        current, peak = tracemalloc.get_traced_memory()
+        top_lines = tracemalloc.take_snapshot().statistics('lineno')[:PROFILE_TOP]
+        with _tracing_lock:
+            _tracing_users -= 1
+            if _tracing_users == 0:
+                tracemalloc.stop()
+
+        base = os.path.join(directory, name)
+        profiler.dump_stats(f'{base}.prof')
+        report = io.StringIO()
+        pstats.Stats(profiler, stream=report).sort_stats('cumulative').print_stats(PROFILE_TOP)
+        with open(f'{base}.txt', 'w') as f:
+            f.write(f'Python heap: {current / 1024 / 1024:.1f} MB at exit, {peak / 1024 / 1024:.1f} MB peak\n\n')
+            f.write('Largest allocations still held at exit:\n')
+            for stat in top_lines:
+                f.write(f'  {stat}\n')
+            f.write('\n')
+            f.write(report.getvalue())
+        print(f"Profile written to {base}.prof and {base}.txt")
@@ -0,0 +1,292 @@
+"""
+Runs the whole ETL as one command:
+
+    python -m src.pipeline [--league 9] [--season 2024-2025] [--force] [--incremental]
+                           [--workers 4] [--only load ...] [--profile] [--metrics-dir data/metrics]
+
+Stages form a small DAG (extract -> transform -> schema -> load). Team and
+player work run side by side, and a stage is skipped when the fingerprint of
+its input files and of its outputs matches the last successful run. With
+--incremental, only the teams and tables whose content hash changed are
+transformed and loaded (see src/manifest.py).
+
+Every stage is recorded as a metrics span (see src/metrics.py). The spans and
+the HTTP and database latency histograms are written to the metrics directory
+as JSON lines and in the Prometheus text format.
+"""
+import os
+import sys
+import json
+import time
+import hashlib
+import argparse
+import threading
+from pathlib import Path
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+
+sys.path.append(str(Path(__file__).resolve().parent.parent))
+from src.extract.extract_team_stats import get_team_stats, raw_dir, team_stats_file
+from src.extract.extract_player_stats import dead_letter_file, get_players_stats
+from src.transform.transform_team_stats import transform_team_stats
+from src.transform.transform_player_stats import (
+    transform_player_stats, transform_changed_player_stats, find_player_files
+)
+from src.transform.store import list_tables, table_files
+from src.load.schema import create_schema
+from src.load.load_stats import load_stats, LEAGUE_ID, SEASON_ID
+from src.metrics import METRICS_DIR, PROFILE_DIR, file_bytes, profile, span, write_jsonl, write_prometheus
+
+PROCESSED_DIR = 'data/processed'
+STATE_FILE = 'data/cache/pipeline_state.json'
+
+_state_lock = threading.Lock()
+# Schema changes and loads take locks on the shared parent tables, so league
+# seasons running side by side (see src/backfill.py) write to the database one at a time.
+_database_lock = threading.Lock()
+
+
+class Stage:
+    """
+    One step of the pipeline.
+
+    Args:
+        name (str): Stage name used in the report and state file.
+        run (callable): Called with the parsed CLI options; returns the row
+            count and a list of the items (files or tables) it left unchanged.
+        depends_on (list): Stages that must succeed first.
+        inputs (callable): Returns the files the stage reads, given the options.
+            None means the stage always runs (the extract stages, whose HTTP cache decides).
+        outputs (callable): Returns the files the stage writes, given the options.
+    """
+
+    def __init__(self, name, run, depends_on=(), inputs=None, outputs=None):
+        self.name = name
+        self.run = run
+        self.depends_on = list(depends_on)
+        self.inputs = inputs
+        self.outputs = outputs or (lambda options: [])
+
+
+def processed_files(options, kinds=('team_stats', 'player_stats')):
+    """
+    Processed files of the league season being run.
+    """
+    return [file for kind in kinds
+            for path in list_tables(os.path.join(PROCESSED_DIR, kind), options.league_id, options.season_id).values()
+            for file in table_files(path)]
+
+def player_files(options):
+    return find_player_files(raw_dir(options.league_id, options.season_id))
+
+def team_file(options):
+    return [team_stats_file(options.league_id, options.season_id)]
+
+def files_fingerprint(paths):
+    """
+    Hash of the names, sizes and mtimes of a set of files.
+    """
+    digest = hashlib.sha1()
+    for path in sorted(paths):
+        stat = os.stat(path)
+        digest.update(f'{path}:{stat.st_size}:{stat.st_mtime_ns}\n'.encode())
+    return digest.hexdigest()
+
+def frame_rows(frames):
+    if frames is None:
+        raise RuntimeError('transform produced no output')
+    return sum(len(df) for df in frames.values())
+
+def extract_teams(options):
+    return len(get_team_stats(options.league_id, options.season_id)['data']), []
+
+def extract_players(options):
+    result = get_players_stats(league_id=options.league_id, season_id=options.season_id)
+    if result['errors']:
+        raise RuntimeError(f"{len(result['errors'])} teams failed to download, see "
+                           f"{dead_letter_file(options.league_id, options.season_id)}")
+    return len(result['saved']), result['unchanged']
+
+def transform_teams(options):
+    frames = transform_team_stats(team_file(options)[0], os.path.join(PROCESSED_DIR, 'team_stats'),
+                                  workers=options.workers, league_id=options.league_id, season_id=options.season_id)
+    return frame_rows(frames), []
+
+def transform_players(options):
+    input_dir = raw_dir(options.league_id, options.season_id)
+    output_dir = os.path.join(PROCESSED_DIR, 'player_stats')
+    if options.incremental:
+        result = transform_changed_player_stats(input_dir, output_dir, workers=options.workers,
+                                                league_id=options.league_id, season_id=options.season_id)
+        return result['rows'], result['skipped']
+    frames = transform_player_stats(input_dir, output_dir, workers=options.workers,
+                                    league_id=options.league_id, season_id=options.season_id)
+    return frame_rows(frames), []
+
+def create_tables(options):
+    with _database_lock:
+        create_schema(options.league_id, options.season_id)
+    return 0, []
+
+def load(options):
+    with _database_lock:
+        loaded = load_stats(options.league_id, options.season_id, incremental=options.incremental,
+                            only_changed=options.incremental)
+    tables = [table_name for kind in ('team_stats', 'player_stats')
+              for table_name in list_tables(os.path.join(PROCESSED_DIR, kind), options.league_id, options.season_id)]
+    return sum(loaded.values()), [table_name for table_name in tables if table_name not in loaded]
+
+STAGES = [
+    Stage('extract_teams', extract_teams, outputs=team_file),
+    Stage('extract_players', extract_players, ['extract_teams'], outputs=player_files),
+    Stage('transform_teams', transform_teams, ['extract_teams'],
+          inputs=team_file, outputs=lambda options: processed_files(options, ['team_stats'])),
+    Stage('transform_players', transform_players, ['extract_players'],
+          inputs=player_files, outputs=lambda options: processed_files(options, ['player_stats'])),
+    Stage('schema', create_tables, ['transform_teams', 'transform_players'], inputs=processed_files),
+    Stage('load', load, ['schema'], inputs=processed_files),
+]
+
+def load_state():
+    try:
+        with open(STATE_FILE, 'r') as f:
+            return json.load(f)
+    except (FileNotFoundError, json.JSONDecodeError):
+        return {}
+
+def record_state(key, entry):
+    """
+    Stores one stage's fingerprints. The file is re-read under a lock so
+    pipelines running in parallel threads keep each other's entries.
+    """
+    with _state_lock:
+        state = load_state()
+        state[key] = entry
+        os.makedirs(os.path.dirname(STATE_FILE), exist_ok=True)
+        tmp_file = f'{STATE_FILE}.tmp'
+        with open(tmp_file, 'w') as f:
+            json.dump(state, f, indent=2)
+        os.replace(tmp_file, STATE_FILE)
+
+def run_stage(stage, options, rows_in=0):
+    """
+    Runs one stage unless its inputs and outputs are unchanged since its last
+    successful run for the same league season. The run is recorded as a
+    'stage' span, and profiled when options.profile is set.
+
+    Args:
+        rows_in (int): Rows produced by the stages this one depends on.
+
+    Returns:
+        dict: status ('ran' or 'skipped'), seconds, rows and the unchanged items.
+    """
+    start = time.perf_counter()
+    key = f'{options.league_id}/{options.season_id}/{stage.name}'
+    with span('stage', stage=stage.name, league=options.league_id, season=options.season_id) as stage_span:
+        input_fingerprint = None
+        if stage.inputs is not None:
+            inputs = stage.inputs(options)
+            input_fingerprint = files_fingerprint(inputs)
+            with _state_lock:
+                previous = load_state().get(key)
+            if (not options.force and previous
+                    and previous['inputs'] == input_fingerprint
+                    and previous['outputs'] == files_fingerprint(stage.outputs(options))):
+                stage_span.status = 'skipped'
+                return {'status': 'skipped', 'seconds': time.perf_counter() - start, 'rows': previous['rows'],
+                        'unchanged': []}
+            stage_span.add(bytes_read=file_bytes(inputs))
+
+        if options.profile:
+            with profile(f'{options.league_id}_{options.season_id}_{stage.name}', PROFILE_DIR):
+                rows, unchanged = stage.run(options)
+        else:
+            rows, unchanged = stage.run(options)
+        outputs = stage.outputs(options)
+        stage_span.add(rows_in=rows_in, rows_out=rows, bytes_written=file_bytes(outputs))
+        if input_fingerprint is not None:
+            record_state(key, {
+                'inputs': input_fingerprint,
+                'outputs': files_fingerprint(outputs),
+                'rows': rows,
+            })
+    return {'status': 'ran', 'seconds': time.perf_counter() - start, 'rows': rows, 'unchanged': unchanged}
+
+def run_pipeline(options, stages=STAGES, on_stage_done=None):
+    """
+    Runs the stages in dependency order, each as soon as everything it depends
+    on has succeeded. A failed stage blocks its dependents but not the others.
+
+    Args:
+        options: Parsed CLI options (league_id, season_id, incremental, force, workers, only, profile).
+        on_stage_done (callable): Called with (stage name, result) after each stage succeeds.
+
+    Returns:
+        dict: Stage name -> {'status', 'seconds', 'rows'} (plus 'error' on failure).
+    """
+    selected = [stage for stage in stages if not options.only or stage.name in options.only]
+    names = {stage.name for stage in selected}
+    report = {}
+    pending = list(selected)
+    running = {}
+
+    with ThreadPoolExecutor(max_workers=len(selected) or 1) as executor:
+        while pending or running:
+            for stage in list(pending):
+                deps = [dep for dep in stage.depends_on if dep in names]
+                if any(report.get(dep, {}).get('status') in ('failed', 'blocked') for dep in deps):
+                    report[stage.name] = {'status': 'blocked', 'seconds': 0.0, 'rows': None, 'unchanged': []}
+                    pending.remove(stage)
+                elif all(dep in report for dep in deps):
+                    print(f"[pipeline] starting {stage.name}")
+                    rows_in = sum(report[dep]['rows'] or 0 for dep in deps)
+                    future = executor.submit(run_stage, stage, options, rows_in)
+                    running[future] = (stage, time.perf_counter())
+                    pending.remove(stage)
+            if not running:
+                continue
+
+            done, _ = wait(running, return_when=FIRST_COMPLETED)
+            for future in done:
+                stage, started = running.pop(future)
+                try:
+                    report[stage.name] = future.result()
+                    print(f"[pipeline] {stage.name} {report[stage.name]['status']}")
+                    if on_stage_done is not None:
+                        on_stage_done(stage.name, report[stage.name])
+                except Exception as e:
+                    print(f"[pipeline] {stage.name} failed: {e}")
+                    report[stage.name] = {'status': 'failed', 'seconds': time.perf_counter() - started,
+                                          'rows': None, 'unchanged': [], 'error': str(e)}
+
+    return {stage.name: report[stage.name] for stage in selected}
+
+def print_report(report):
+    print(f"\n{'stage':<18} {'status':<8} {'seconds':>8} {'rows':>8} {'unchanged':>9}")
+    for name, result in report.items():
+        rows = '' if result['rows'] is None else result['rows']
+        print(f"{name:<18} {result['status']:<8} {result['seconds']:8.2f} {rows:>8} {len(result['unchanged']):>9}")
+    for name, result in report.items():
+        if result['unchanged']:
+            print(f"{name} left unchanged: {', '.join(map(str, result['unchanged']))}")
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description='Run the football ETL pipeline.')
+    parser.add_argument('--league', dest='league_id', default=LEAGUE_ID)
+    parser.add_argument('--season', dest='season_id', default=SEASON_ID)
+    parser.add_argument('--force', action='store_true', help='Run every stage even if its inputs are unchanged.')
+    parser.add_argument('--incremental', action='store_true',
+                        help='Transform and load only the teams and tables whose content changed.')
+    parser.add_argument('--workers', type=int, default=1, help='Worker processes per transform.')
+    parser.add_argument('--only', nargs='+', choices=[stage.name for stage in STAGES],
+                        help='Run only these stages (their dependencies are assumed done).')
+    parser.add_argument('--profile', action='store_true',
+                        help=f'Write a cProfile and tracemalloc report per stage to {PROFILE_DIR}.')
+    parser.add_argument('--metrics-dir', default=METRICS_DIR,
+                        help='Where pipeline.jsonl and pipeline.prom are written.')
+    options = parser.parse_args()
+
+    report = run_pipeline(options)
+    print_report(report)
+    write_jsonl(os.path.join(options.metrics_dir, 'pipeline.jsonl'))
+    write_prometheus(os.path.join(options.metrics_dir, 'pipeline.prom'))
+    sys.exit(1 if any(result['status'] in ('failed', 'blocked') for result in report.values()) else 0)
@@ -0,0 +1,181 @@
+"""
+Compact in-memory representation of the stats tables.
+
+Repeated strings (team_name, section, player_country_code, ...) become
+categoricals, integer columns are downcast to the narrowest signed type, and
+whole-number float columns (ints that were widened to float64 by a missing
+value) become nullable integers. Fractional columns become float32 when every
+value has at most REAL_DIGITS significant digits, which float32 round-trips
+exactly; widen_float32 recovers the original float64 values.
+"""
+import os
+import sys
+import numpy as np
+import pandas as pd
+
+# Set ETL_COMPACT_DTYPES=0 to keep pandas' default object/int64/float64 columns.
+COMPACT_DTYPES = os.getenv('ETL_COMPACT_DTYPES', '1') != '0'
+# Smaller frames are left as they are: compacting them saves a few kilobytes
+# and costs more time (a fixed overhead per column) than it saves.
+COMPACT_MIN_ROWS = int(os.getenv('ETL_COMPACT_MIN_ROWS', '256'))
+# Text columns with at most this share of distinct values are stored as categoricals.
+CATEGORY_RATIO = 0.5
+# float32 and Postgres REAL keep about 6 significant digits.
+REAL_DIGITS = 6
+
+INTEGER_DTYPES = [
+    ('int8', 'Int8', np.iinfo(np.int8)),
+    ('int16', 'Int16', np.iinfo(np.int16)),
+    ('int32', 'Int32', np.iinfo(np.int32)),
+    ('int64', 'Int64', np.iinfo(np.int64)),
+]
+
+def significant_scale(values):
+    return 10.0 ** (REAL_DIGITS - 1 - np.floor(np.log10(np.abs(values))))
+
+def fits_real(values):
+    """
+    True when every value has at most REAL_DIGITS significant digits.
+    """
+    nonzero = np.abs(values[values != 0])
+    if nonzero.size == 0:
+        return True
+    scaled = nonzero * significant_scale(nonzero)
+    return bool(np.all(np.abs(scaled - np.round(scaled)) < 1e-9 * scaled))
+
+def widen_float32(values):
+    """
+    Converts float32 values written by compact_frame back to the float64 values
+    they came from, by rounding to REAL_DIGITS significant digits.
+    """
+    values = np.asarray(values, dtype='float64')
+    result = values.copy()
+    mask = np.isfinite(values) & (values != 0)
+    scale = significant_scale(values[mask])
+    result[mask] = np.round(values[mask] * scale) / scale
+    return result
+
+def integer_dtype(low, high, nullable=False):
+    """
+    Narrowest signed integer dtype holding low..high, or None when not even int64 does.
+    """
+    for numpy_dtype, nullable_dtype, limits in INTEGER_DTYPES:
+        if limits.min <= low and high <= limits.max:
+            return nullable_dtype if nullable else numpy_dtype
+    return None
+
+def compact_column(series):
+    """
+    Returns one column in its most compact dtype, or None to keep it as it is.
+    Conversions work on the underlying numpy arrays, which is much cheaper than
+    a pandas astype per column on frames this wide.
+    """
+    dtype = series.dtype
+    if isinstance(dtype, pd.CategoricalDtype) or pd.api.types.is_bool_dtype(dtype):
+        return None
+    if not pd.api.types.is_numeric_dtype(dtype):
+        count = series.count()
+        if count and series.nunique() <= CATEGORY_RATIO * count:
+            return pd.Categorical(series)
+        return None
+
+    if isinstance(dtype, np.dtype) and dtype.kind == 'i':
+        if not len(series):
+            return None
+        values = series.to_numpy()
+        target = integer_dtype(values.min(), values.max())
+        return None if target is None or dtype == target else values.astype(target)
+
+    values = series.to_numpy(dtype='float64', na_value=np.nan)
+    if dtype == np.float32:
+        values = widen_float32(values)
+    finite_mask = np.isfinite(values)
+    finite = values[finite_mask]
+    if finite.size == 0:
+        return None
+    if np.all(np.mod(finite, 1) == 0):
+        nullable = finite.size < values.size or pd.api.types.is_extension_array_dtype(dtype)
+        target = integer_dtype(finite.min(), finite.max(), nullable)
+        if target is None or dtype == target:
+            return None
+        if not nullable:
+            return values.astype(target)
+        numpy_type = target.lower()
+        return pd.arrays.IntegerArray(np.where(finite_mask, values, 0).astype(numpy_type), ~finite_mask)
+    if dtype != np.float32 and fits_real(finite):
+        return values.astype('float32')
+    return None
+
+def compact_frame(df):
+    """
+    Returns df with every column in its most compact dtype (see the module docstring).
+    """
+    if not COMPACT_DTYPES or len(df) < COMPACT_MIN_ROWS:
+        return df
+    columns = {}
+    changed = False
+    for col in df.columns:
+        compacted = compact_column(df[col])
+        changed = changed or compacted is not None
+        columns[col] = df[col] if compacted is None else compacted
+    if not changed:
+        return df
+    return pd.DataFrame(columns, index=df.index, copy=False)
+
+def expanded_mb(df):
+    """
+    Size the same data would take in pandas' default dtypes: plain strings
+    instead of categoricals and 8-byte numbers. Used to measure what compacting saves.
+    """
+    total = df.index.memory_usage()
+    for col in df.columns:
+        series = df[col]
+        if isinstance(series.dtype, pd.CategoricalDtype):
+            total += series.astype(series.cat.categories.dtype).memory_usage(index=False, deep=True)
+        elif pd.api.types.is_numeric_dtype(series.dtype) and not pd.api.types.is_bool_dtype(series.dtype):
+            total += 8 * len(series)
+        else:
+            total += series.memory_usage(index=False, deep=True)
+    return total / 1024 / 1024
+
+def memory_mb(df):
+    return df.memory_usage(index=True, deep=True).sum() / 1024 / 1024
+
+def memory_report(frames, label='Memory'):
+    """
+    Prints the size of a set of frames against the same data in default dtypes.
+
+    Args:
+        frames (dict): Table name -> DataFrame.
+
+    Returns:
+        dict: 'before_mb' and 'after_mb' over all frames.
+    """
+    before = after = 0.0
+    for df in frames.values():
+        if isinstance(df, pd.DataFrame):
+            before += expanded_mb(df)
+            after += memory_mb(df)
+    ratio = before / after if after else 1.0
+    print(f"{label}: {before:.1f} MB in default dtypes, {after:.1f} MB compacted ({ratio:.1f}x smaller).")
+    return {'before_mb': before, 'after_mb': after}
+
+if __name__ == "__main__":
+    import argparse
+    from pathlib import Path
+
+    sys.path.append(str(Path(__file__).resolve().parent.parent.parent))
+    from src.transform.store import list_tables, read_table
+
+    parser = argparse.ArgumentParser(description='Report the in-memory size of processed tables.')
+    parser.add_argument('--processed-dir', default='data/processed')
+    parser.add_argument('--league', default='9')
+    parser.add_argument('--seasons', nargs='+', default=['2024-2025'])
+    args = parser.parse_args()
+
+    for kind in ('team_stats', 'player_stats'):
+        frames = {f'{season_id}/{table_name}': read_table(path)
+                  for season_id in args.seasons
+                  for table_name, path in list_tables(os.path.join(args.processed_dir, kind),
+                                                      args.league, season_id).items()}
+        memory_report(frames, f'{kind} ({len(frames)} tables)')
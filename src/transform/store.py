@@ -0,0 +1,194 @@
+import os
+import sys
+import glob
+import pandas as pd
+import pyarrow as pa
+import pyarrow.parquet as pq
+from pathlib import Path
+
+sys.path.append(str(Path(__file__).resolve().parent.parent.parent))
+from src.transform.stream import ChunkedCSVWriter
+from src.transform.dtypes import compact_frame
+
+# 'parquet' (default) or 'csv' for the hand-off between transform and load.
+PROCESSED_FORMAT = os.getenv('PROCESSED_FORMAT', 'parquet')
+
+# Identifier columns are kept as text so IDs like '00123' keep their leading zeros.
+ID_DTYPES = {'team_id': str, 'player_id': str, 'player_country_code': str}
+
+def table_dir(output_dir, table_name, league_id, season_id):
+    """
+    Partition directory of one table: <output_dir>/league=<id>/season=<id>/<table_name>.
+    """
+    return os.path.join(output_dir, f'league={league_id}', f'season={season_id}', table_name)
+
+class ParquetPartitionWriter:
+    """
+    Writes DataFrame chunks as numbered part files in a table's partition
+    directory. Parts from a previous run are removed on the first write.
+    """
+
+    def __init__(self, directory):
+        self.directory = directory
+        self.parts = 0
+        self.rows = 0
+
+    def write(self, df):
+        if df.empty:
+            return
+        if self.parts == 0:
+            os.makedirs(self.directory, exist_ok=True)
+            for old_part in glob.glob(os.path.join(self.directory, 'part-*.parquet')):
+                os.remove(old_part)
+        table = pa.Table.from_pandas(df, preserve_index=False)
+        pq.write_table(table, os.path.join(self.directory, f'part-{self.parts:05d}.parquet'))
+        self.parts += 1
+        self.rows += len(df)
+
+def write_part(directory, name, df):
+    """
+    Writes (or replaces) one named part file, part-<name>.parquet, in a table's
+    partition directory. An empty frame removes the part instead.
+    """
+    path = os.path.join(directory, f'part-{name}.parquet')
+    if df.empty:
+        if os.path.exists(path):
+            os.remove(path)
+        return None
+    os.makedirs(directory, exist_ok=True)
+    tmp_file = f'{path}.tmp'
+    pq.write_table(pa.Table.from_pandas(df, preserve_index=False), tmp_file)
+    os.replace(tmp_file, path)
+    return path
+
+def numbered_parts(directory):
+    """
+    Part files written by ParquetPartitionWriter (part-00000.parquet, ...).
+    """
+    return sorted(glob.glob(os.path.join(directory, 'part-[0-9]*.parquet')))
+
+def open_writer(output_dir, table_name, league_id, season_id, fmt=PROCESSED_FORMAT):
+    """
+    Returns a chunk writer for one processed table in the requested format.
+    """
+    if fmt == 'csv':
+        return ChunkedCSVWriter(os.path.join(output_dir, f'{table_name}.csv'))
+    return ParquetPartitionWriter(table_dir(output_dir, table_name, league_id, season_id))
+
+def list_tables(output_dir, league_id, season_id, fmt=PROCESSED_FORMAT):
+    """
+    Finds the processed tables of one league season.
+
+    Returns:
+        dict: Table name -> path (a CSV file or a Parquet partition directory).
+    """
+    if fmt == 'csv':
+        paths = glob.glob(os.path.join(output_dir, '*.csv'))
+        return {os.path.splitext(os.path.basename(path))[0]: path for path in sorted(paths)}
+    paths = glob.glob(os.path.join(table_dir(output_dir, '*', league_id, season_id), 'part-*.parquet'))
+    return {os.path.basename(os.path.dirname(path)): os.path.dirname(path) for path in sorted(paths)}
+
+def read_columns(path):
+    """
+    Column names of a processed table, read from the CSV header or Parquet schema only.
+    """
+    if path.endswith('.csv'):
+        return list(pd.read_csv(path, nrows=0).columns)
+    return pq.read_schema(table_files(path)[0]).names
+
+def table_files(path):
+    """
+    Files backing a processed table: the CSV itself or the Parquet part files.
+    """
+    if path.endswith('.csv'):
+        return [path]
+    return sorted(glob.glob(os.path.join(path, 'part-*.parquet')))
+
+def fingerprint(path):
+    """
+    Cheap change marker for a processed table built from file names, sizes and mtimes.
+    """
+    marker = []
+    for file in table_files(path):
+        stat = os.stat(file)
+        marker.append(f'{os.path.basename(file)}:{stat.st_size}:{stat.st_mtime_ns}')
+    return '|'.join(marker)
+
+# Integer columns come back as pandas nullable integers, so missing values do not turn them into floats.
+NULLABLE_TYPES = {
+    pa.int8(): pd.Int8Dtype(),
+    pa.int16(): pd.Int16Dtype(),
+    pa.int32(): pd.Int32Dtype(),
+    pa.int64(): pd.Int64Dtype(),
+}
+
+def unify_parts(tables):
+    """
+    Makes part files written with different compact dtypes concatenable.
+    Where parts disagree on a column's type, dictionary (categorical) columns
+    are decoded and float32 columns widened exactly through their shortest
+    decimal form; integer and float widths are then promoted by pyarrow.
+    """
+    types = {}
+    for table in tables:
+        for field in table.schema:
+            types.setdefault(field.name, set()).add(field.type)
+    mixed = {name for name, column_types in types.items() if len(column_types) > 1}
+    if not mixed:
+        return tables
+    widen_floats = {name for name in mixed if pa.float64() in types[name]}
+
+    unified = []
+    for table in tables:
+        for i, field in enumerate(table.schema):
+            if field.name not in mixed:
+                continue
+            column = table.column(i)
+            if pa.types.is_dictionary(field.type):
+                column = column.cast(field.type.value_type)
+            elif field.type == pa.float32() and field.name in widen_floats:
+                column = column.cast(pa.string()).cast(pa.float64())
+            else:
+                continue
+            table = table.set_column(i, field.name, column)
+        unified.append(table)
+    return unified
+
+def to_frame(tables, nrows=None, compact=True):
+    """
+    Concatenates Parquet tables into one (compact) DataFrame. The pandas metadata
+    of the first part is dropped, as later parts may hold wider types.
+    """
+    table = pa.concat_tables(unify_parts(tables), promote_options='permissive')
+    if nrows is not None:
+        table = table.slice(0, nrows)
+    df = table.replace_schema_metadata(None).to_pandas(types_mapper=NULLABLE_TYPES.get)
+    return compact_frame(df) if compact else df
+
+def read_parts(files, columns=None):
+    """
+    Reads the given Parquet part files of one table into a DataFrame.
+    """
+    return to_frame([pq.read_table(part, columns=columns) for part in files])
+
+def read_table(path, columns=None, nrows=None, compact=True):
+    """
+    Reads a processed table into a DataFrame.
+
+    Args:
+        path (str): CSV file or Parquet partition directory, as returned by list_tables.
+        columns (list): Only read these columns. Parquet skips the others on disk.
+        nrows (int): Stop after this many rows.
+        compact (bool): Convert columns to compact dtypes (see src/transform/dtypes.py).
+    """
+    if path.endswith('.csv'):
+        df = pd.read_csv(path, usecols=columns, dtype=ID_DTYPES, nrows=nrows)
+        return compact_frame(df) if compact else df
+    parts = []
+    rows = 0
+    for part in table_files(path):
+        parts.append(pq.read_table(part, columns=columns))
+        rows += parts[-1].num_rows
+        if nrows is not None and rows >= nrows:
+            break
+    return to_frame(parts, nrows, compact)
@@ -0,0 +1,181 @@
+import os
+import sys
+import json
+import pandas as pd
+from pathlib import Path
+
+sys.path.append(str(Path(__file__).resolve().parent.parent.parent))
+from src.transform.dtypes import compact_frame
+from src.extract.raw_files import open_raw
+
+READ_SIZE = 1 << 16
+# Characters that can follow a complete value inside a JSON object or array.
+VALUE_DELIMITERS = ',]}:'
+
+def flatten_record(record, prefix=''):
+    """
+    Flattens nested dicts into dotted column names, the same way pd.json_normalize does.
+    """
+    flat = {}
+    for key, value in record.items():
+        name = f"{prefix}{key}"
+        if isinstance(value, dict):
+            flat.update(flatten_record(value, f"{name}."))
+        else:
+            flat[name] = value
+    return flat
+
+class ColumnBuffer:
+    """
+    Collects rows as one Python list per column so the DataFrame is built once.
+    Columns that first appear part-way through are back-filled with None.
+    """
+
+    def __init__(self):
+        self.columns = {}
+        self.rows = 0
+
+    def append(self, row):
+        for col, value in row.items():
+            column = self.columns.get(col)
+            if column is None:
+                column = self.columns[col] = [None] * self.rows
+            column.append(value)
+        self.rows += 1
+        for column in self.columns.values():
+            if len(column) < self.rows:
+                column.append(None)
+
+    def to_frame(self):
+        return compact_frame(pd.DataFrame(self.columns))
+
+class _Reader:
+    """
+    Text buffer over a file that refills itself while a JSON value is being decoded.
+    """
+
+    def __init__(self, file, read_size=READ_SIZE):
+        self.file = file
+        self.read_size = read_size
+        self.buffer = ''
+        self.pos = 0
+        self.eof = False
+
+    def _fill(self):
+        if self.pos > self.read_size:
+            self.buffer = self.buffer[self.pos:]
+            self.pos = 0
+        data = self.file.read(self.read_size)
+        if not data:
+            self.eof = True
+        self.buffer += data
+
+    def peek(self):
+        while True:
+            while self.pos < len(self.buffer) and self.buffer[self.pos].isspace():
+                self.pos += 1
+            if self.pos < len(self.buffer):
+                return self.buffer[self.pos]
+            if self.eof:
+                raise json.JSONDecodeError("Unexpected end of file", self.buffer, self.pos)
+            self._fill()
+
+    def expect(self, char):
+        if self.peek() != char:
+            raise json.JSONDecodeError(f"Expecting '{char}'", self.buffer, self.pos)
+        self.pos += 1
+
+    def decode(self, decoder):
+        """
+        Decodes the value at the current position. A value is only accepted
+        when a delimiter follows it, as a number cut at the buffer end (e.g.
+        '-2.' of '-2.5e-3') would otherwise decode as a shorter one.
+        """
+        self.peek()
+        while True:
+            try:
+                value, end = decoder.raw_decode(self.buffer, self.pos)
+                after = end
+                while after < len(self.buffer) and self.buffer[after].isspace():
+                    after += 1
+                if after < len(self.buffer) and self.buffer[after] in VALUE_DELIMITERS:
+                    self.pos = end
+                    return value
+                if self.eof:
+                    if after == len(self.buffer):
+                        self.pos = end
+                        return value
+                    raise json.JSONDecodeError("Expecting ',' delimiter", self.buffer, after)
+            except json.JSONDecodeError:
+                if self.eof:
+                    raise
+            self._fill()
+
+def iter_json_array(path, key, read_size=READ_SIZE):
+    """
+    Yields the elements of the array stored under a top-level key of a JSON
+    object one at a time, without loading the whole file.
+
+    Args:
+        path (str): JSON file, e.g. data/raw/team_stats.json (or .json.gz).
+        key (str): Top-level key holding the array, e.g. 'data' or 'players'.
+    """
+    decoder = json.JSONDecoder()
+    with open_raw(path) as file:
+        reader = _Reader(file, read_size)
+        reader.expect('{')
+        while reader.peek() != '}':
+            if reader.peek() == ',':
+                reader.pos += 1
+                continue
+            name = reader.decode(decoder)
+            reader.expect(':')
+            if name != key:
+                reader.decode(decoder)
+                continue
+            reader.expect('[')
+            while reader.peek() != ']':
+                if reader.peek() == ',':
+                    reader.pos += 1
+                    continue
+                yield reader.decode(decoder)
+            reader.pos += 1
+
+def iter_records(path, key):
+    """
+    Yields records one at a time from either an NDJSON file (.ndjson / .jsonl,
+    one record per line) or a JSON object holding them under key. Either may
+    be gzip-compressed (.gz).
+    """
+    if path.removesuffix('.gz').endswith(('.ndjson', '.jsonl')):
+        with open_raw(path) as file:
+            for line in file:
+                if line.strip():
+                    yield json.loads(line)
+    else:
+        yield from iter_json_array(path, key)
+
+class ChunkedCSVWriter:
+    """
+    Appends DataFrame chunks to one CSV file. The header and column order are
+    taken from the first chunk; later chunks are aligned to them.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self.columns = None
+        self.rows = 0
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+
+    def write(self, df):
+        if df.empty:
+            return
+        if self.columns is None:
+            self.columns = list(df.columns)
+            df.to_csv(self.path, index=False)
+        else:
+            extra = [col for col in df.columns if col not in self.columns]
+            if extra:
+                print(f"Warning: dropping columns {extra} not present in the first chunk of {self.path}")
+            df.reindex(columns=self.columns).to_csv(self.path, mode='a', header=False, index=False)
+        self.rows += len(df)
@@ -1,143 +1,232 @@
 import os
+import re
+import sys
 import json
-import pandas as pd
 import glob
+import pandas as pd
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+
+sys.path.append(str(Path(__file__).resolve().parent.parent.parent))
+from src.transform.stream import ColumnBuffer, flatten_record, iter_records
+from src.transform.store import open_writer, table_dir, write_part, numbered_parts, PROCESSED_FORMAT
+from src.transform.dtypes import compact_frame, memory_report
+from src.manifest import get_manifest
+
+# (key under player_data['stats'], value of the 'section' column, output table name)
+PLAYER_SECTIONS = [
+    ('stats', 'stats', 'player_stats'),
+    ('shooting', 'shooting', 'player_shooting'),
+    ('passing', 'passing', 'player_passing'),
+    ('passing_types', 'passing_types', 'player_passing_types'),
+    ('gca', 'goal_creation_actions', 'player_goal_creation_actions'),
+    ('defense', 'defense', 'player_defense'),
+    ('possession', 'possession', 'player_possession'),
+    ('playingtime', 'playing_time', 'player_playing_time'),
+    ('misc', 'miscellaneous', 'player_miscellaneous'),
+]
+
+# Raw file names of a team, in order of preference when a directory holds more than one.
+PLAYER_FILE_NAMES = ['players_stats.json.gz', 'players_stats.json', 'players_stats.ndjson.gz', 'players_stats.ndjson']
+
+def find_player_files(input_dir):
+    """
+    Lists <input_dir>/<team_name>/players_stats.json (or .ndjson, either of
+    them optionally .gz) files in a stable order, one per team.
+    """
+    files = {}
+    for name in PLAYER_FILE_NAMES:
+        for path in glob.glob(os.path.join(input_dir, '*', name)):
+            files.setdefault(os.path.dirname(path), path)
+    return sorted(files.values())
 
-def transform_player_stats(input_file: str, output_file: str) -> None:
+def append_player_sections(buffers, player_data, team_name):
+    """
+    Adds one player's rows to the per-section buffers.
     """
-    Transforms raw player statistics into structured data.
+    meta = {
+        'player_id': player_data['meta_data']['player_id'],
+        'player_name': player_data['meta_data']['player_name'],
+        'team_name': team_name,
+        'player_country_code': player_data['meta_data']['player_country_code'],
+        'player_age': player_data['meta_data']['age'],
+    }
+    for key, section, table_name in PLAYER_SECTIONS:
+        records = player_data['stats'].get(key)
+        if records is None:
+            continue
+        if isinstance(records, dict):
+            records = [records]
+        for record in records:
+            row = flatten_record(record)
+            row.update(meta)
+            row['section'] = section
+            buffers[table_name].append(row)
+
+def transform_player_file(input_file: str) -> dict:
+    """
+    Normalises one team's players_stats file into per-section DataFrames.
+    Runs in a worker process when transform_player_stats is given workers > 1.
+    """
+    team_name = os.path.basename(os.path.dirname(input_file))
+    buffers = {table_name: ColumnBuffer() for _, _, table_name in PLAYER_SECTIONS}
+    try:
+        for player_data in iter_records(input_file, 'players'):
+            append_player_sections(buffers, player_data, team_name)
+    except FileNotFoundError:
+        print(f"Error: The file '{input_file}' was not found.")
+    except json.JSONDecodeError:
+        print(f"Error: The file '{input_file}' is not a valid JSON.")
+    return {table_name: buffer.to_frame() for table_name, buffer in buffers.items()}
+
+def transform_player_stats(input_dir: str = 'data/raw/league=9/season=2024-2025',
+                           output_dir: str = 'data/processed/player_stats', chunk_size: int = None,
+                           workers: int = 1, league_id: str = '9', season_id: str = '2024-2025',
+                           fmt: str = PROCESSED_FORMAT) -> dict:
+    """
+    Transforms raw player statistics into one structured table per stats section.
     
     Args:
-        input_file (str): Path to the input JSON file containing raw player statistics.
-        output_file (str): Path to the output CSV file where transformed data will be saved.
+        input_dir (str): Directory holding <team_name>/players_stats.json files.
+        output_dir (str): Directory where the section tables are saved.
+        chunk_size (int): If set, players are streamed from disk and written out
+            this many at a time, so memory stays flat however large the input is.
+        workers (int): If above 1, team files are normalised in this many worker
+            processes. Results are merged in file order, so the tables match a
+            serial run. With chunk_size set, each file is written as one chunk.
+        league_id (str), season_id (str): Partition the Parquet output is written to.
+        fmt (str): 'parquet' (partitioned by league/season/section) or 'csv'.
+
+    Returns:
+        dict: Table name -> DataFrame for every section in PLAYER_SECTIONS, or
+        table name -> rows written when chunk_size is set.
     """
 
-    player_files = glob.glob('data/raw/*/players_stats.json')
+    player_files = find_player_files(input_dir)
 
     if not player_files:
         print("No player statistics files found.")
         raise FileNotFoundError("No player statistics files found.")
     
-    player_stats_df = pd.DataFrame()
-    player_shooting_df = pd.DataFrame()
-    player_passing_df = pd.DataFrame()
-    player_passing_types_df = pd.DataFrame()
-    player_goal_creation_actions_df = pd.DataFrame()
-    player_defense_df = pd.DataFrame()
-    player_possession_df = pd.DataFrame()
-    player_playing_time_df = pd.DataFrame()
-    player_miscellaneous_df = pd.DataFrame()
-
-    for player_file in player_files:
+    writers = {table_name: open_writer(output_dir, table_name, league_id, season_id, fmt)
+               for _, _, table_name in PLAYER_SECTIONS}
+    buffers = {table_name: ColumnBuffer() for table_name in writers}
+    buffered_players = 0
+    frames = {}
+
+    if workers > 1:
+        collected = {table_name: [] for table_name in writers}
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+            for file_frames in executor.map(transform_player_file, player_files):
+                for table_name, df in file_frames.items():
+                    if chunk_size:
+                        writers[table_name].write(df)
+                    else:
+                        collected[table_name].append(df)
+        if chunk_size:
+            return {table_name: writer.rows for table_name, writer in writers.items()}
+        for table_name, dfs in collected.items():
+            dfs = [df for df in dfs if not df.empty]
+            # Categories differ between teams, so the concatenated columns are compacted again.
+            frames[table_name] = compact_frame(pd.concat(dfs, ignore_index=True)) if dfs else pd.DataFrame()
+            writers[table_name].write(frames[table_name])
+        memory_report(frames, 'Player stats memory')
+        return frames
+
+    def flush():
+        for table_name, buffer in buffers.items():
+            frames[table_name] = buffer.to_frame()
+            writers[table_name].write(frames[table_name])
+            buffers[table_name] = ColumnBuffer()
+
+    for input_file in player_files:
+        team_name = os.path.basename(os.path.dirname(input_file))
         try:
-            input_file = player_file
-            directory_name = os.path.dirname(input_file)
-            team_name = os.path.basename(directory_name)
-
-            with open(input_file, 'r') as file:
-                raw_data = json.load(file)
-            
-            for player_data in raw_data['players']:
-                player_id = player_data['meta_data']['player_id']
-                player_name = player_data['meta_data']['player_name']
-                player_country_code = player_data['meta_data']['player_country_code']
-                player_age = player_data['meta_data']['age']
-        
-                stats = pd.json_normalize(player_data["stats"]["stats"])
-                stats['player_id'] = player_id
-                stats['player_name'] = player_name
-                stats['team_name'] = team_name
-                stats['player_country_code'] = player_country_code
-                stats['player_age'] = player_age
-                stats['section'] = "stats"
-                player_stats_df = pd.concat([player_stats_df, stats], ignore_index=True)
-
-                stats = pd.json_normalize(player_data["stats"]["shooting"])
-                stats['player_id'] = player_id
-                stats['player_name'] = player_name
-                stats['team_name'] = team_name
-                stats['player_country_code'] = player_country_code
-                stats['player_age'] = player_age
-                stats['section'] = "shooting"
-                player_shooting_df = pd.concat([player_shooting_df, stats], ignore_index=True)
-
-                stats = pd.json_normalize(player_data["stats"]["passing"])
-                stats['player_id'] = player_id
-                stats['player_name'] = player_name
-                stats['team_name'] = team_name
-                stats['player_country_code'] = player_country_code
-                stats['player_age'] = player_age
-                stats['section'] = "passing"
-                player_passing_df = pd.concat([player_passing_df, stats], ignore_index=True)
-
-                stats = pd.json_normalize(player_data["stats"]["passing_types"])
-                stats['player_id'] = player_id
-                stats['player_name'] = player_name
-                stats['team_name'] = team_name
-                stats['player_country_code'] = player_country_code
-                stats['player_age'] = player_age
-                stats['section'] = "passing_types"
-                player_passing_types_df = pd.concat([player_passing_types_df, stats], ignore_index=True)
-
-                stats = pd.json_normalize(player_data["stats"]["gca"])
-                stats['player_id'] = player_id
-                stats['player_name'] = player_name
-                stats['team_name'] = team_name
-                stats['player_country_code'] = player_country_code
-                stats['player_age'] = player_age
-                stats['section'] = "goal_creation_actions"
-                player_goal_creation_actions_df = pd.concat([player_goal_creation_actions_df, stats], ignore_index=True)
-
-                stats = pd.json_normalize(player_data["stats"]["defense"])
-                stats['player_id'] = player_id
-                stats['player_name'] = player_name
-                stats['team_name'] = team_name
-                stats['player_country_code'] = player_country_code
-                stats['player_age'] = player_age
-                stats['section'] = "defense"
-                player_defense_df = pd.concat([player_defense_df, stats], ignore_index=True)
-
-                stats = pd.json_normalize(player_data["stats"]["possession"])
-                stats['player_id'] = player_id
-                stats['player_name'] = player_name
-                stats['team_name'] = team_name
-                stats['player_country_code'] = player_country_code
-                stats['player_age'] = player_age
-                stats['section'] = "possession"
-                player_possession_df = pd.concat([player_possession_df, stats], ignore_index=True)
-
-                stats = pd.json_normalize(player_data["stats"]["playingtime"])
-                stats['player_id'] = player_id
-                stats['player_name'] = player_name
-                stats['team_name'] = team_name
-                stats['player_country_code'] = player_country_code
-                stats['player_age'] = player_age
-                stats['section'] = "playing_time"
-                player_playing_time_df = pd.concat([player_playing_time_df, stats], ignore_index=True)
-
-                stats = pd.json_normalize(player_data["stats"]["misc"])
-                stats['player_id'] = player_id
-                stats['player_name'] = player_name
-                stats['team_name'] = team_name
-                stats['player_country_code'] = player_country_code
-                stats['player_age'] = player_age
-                stats['section'] = "miscellaneous"
-                player_miscellaneous_df = pd.concat([player_miscellaneous_df, stats], ignore_index=True)
-
+            for player_data in iter_records(input_file, 'players'):
+                append_player_sections(buffers, player_data, team_name)
+                buffered_players += 1
+                if chunk_size and buffered_players >= chunk_size:
+                    flush()
+                    buffered_players = 0
         except FileNotFoundError:
             print(f"Error: The file '{input_file}' was not found.")
-            return
         except json.JSONDecodeError:
             print(f"Error: The file '{input_file}' is not a valid JSON.")
-            return
 
-    # Save the transformed data to a CSV file
-    output_file = output_file or 'data/processed/player_stats.csv'
-    os.makedirs(os.path.dirname(output_file), exist_ok=True)
-    player_stats_df.to_csv(output_file, index=False)
+    flush()
+
+    if chunk_size:
+        return {table_name: writer.rows for table_name, writer in writers.items()}
+    memory_report(frames, 'Player stats memory')
+    return frames
+
+def team_part_name(input_file: str) -> str:
+    """
+    Name of the part files holding one team's rows, derived from its raw directory.
+    """
+    team_name = os.path.basename(os.path.dirname(input_file))
+    return 'team-' + re.sub(r'[^A-Za-z0-9]+', '_', team_name).strip('_')
+
+def transform_changed_player_stats(input_dir: str = 'data/raw/league=9/season=2024-2025',
+                                   output_dir: str = 'data/processed/player_stats', workers: int = 1,
+                                   league_id: str = '9', season_id: str = '2024-2025', manifest=None) -> dict:
+    """
+    Re-transforms only the teams whose raw file changed since it was last
+    transformed, according to the manifest. Each team's rows are kept in their
+    own part file (part-team-<name>.parquet) of every section table, so
+    unchanged teams are never read or rewritten.
+
+    Returns:
+        dict: 'transformed' and 'skipped' team files, and 'rows' written.
+    """
+    manifest = manifest or get_manifest()
+    player_files = find_player_files(input_dir)
+    table_dirs = {table_name: table_dir(output_dir, table_name, league_id, season_id)
+                  for _, _, table_name in PLAYER_SECTIONS}
+
+    # Output of a full transform_player_stats run is not split by team; replace it.
+    stale_parts = [part for directory in table_dirs.values() for part in numbered_parts(directory)]
+    for part in stale_parts:
+        os.remove(part)
+    if stale_parts:
+        manifest.forget('transformed', [input_file for input_file in manifest.keys('transformed')
+                                        if input_file.startswith(str(input_dir))])
+
+    changed = manifest.changed('transformed', player_files)
+    for input_file in player_files:
+        part = os.path.join(table_dirs['player_stats'], f'part-{team_part_name(input_file)}.parquet')
+        if input_file not in changed and not os.path.exists(part):
+            changed[input_file] = manifest.get('transformed', input_file)
+
+    # Teams whose raw file is gone lose their parts as well.
+    removed = [input_file for input_file in manifest.keys('transformed')
+               if input_file.startswith(str(input_dir)) and input_file not in player_files]
+    for input_file in removed:
+        for directory in table_dirs.values():
+            write_part(directory, team_part_name(input_file), pd.DataFrame())
+    manifest.forget('transformed', removed)
+
+    changed_files = sorted(changed)
+    if workers > 1 and len(changed_files) > 1:
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+            results = list(executor.map(transform_player_file, changed_files))
+    else:
+        results = [transform_player_file(input_file) for input_file in changed_files]
+
+    rows = 0
+    for input_file, file_frames in zip(changed_files, results):
+        for table_name, df in file_frames.items():
+            write_part(table_dirs[table_name], team_part_name(input_file), df)
+            rows += len(df)
+        manifest.update('transformed', {input_file: changed[input_file]})
+    manifest.save()
+
+    skipped = [input_file for input_file in player_files if input_file not in changed]
+    print(f"Transformed {len(changed_files)} of {len(player_files)} team files "
+          f"({len(skipped)} unchanged, {len(removed)} removed).")
+    return {'transformed': changed_files, 'skipped': skipped, 'rows': rows}
 
 if __name__ == "__main__":
-    input_file = 'data/raw/players_stats.json'
-    output_file = 'data/processed/player_stats.csv'
-    transform_player_stats(input_file, output_file)
-    print(f"Transformed player statistics saved to {output_file}")
\ No newline at end of file
+    output_dir = 'data/processed/player_stats'
+    transform_player_stats(output_dir=output_dir)
+    print(f"Transformed player statistics saved to {output_dir}")
@@ -1,121 +1,129 @@
 import json
-import os
-import pandas as pd
+import sys
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
 
-def transform_team_stats():
-    """
-    Transforms raw team statistics into structured data.
-    """
-    try:
-        with open('data/raw/team_stats.json', 'r') as file:
-            raw_data = json.load(file)
-    except FileNotFoundError:
-        print("Error: The file 'data/raw/team_stats.json' was not found.")
-        return None
-    except json.JSONDecodeError:
-        print("Error: The file 'data/raw/team_stats.json' is not a valid JSON.")
-        return None
-    
-    general_stats_df = pd.DataFrame()
-    keeper_stats_df = pd.DataFrame()
-    keeper_stats_advanced_df = pd.DataFrame()
-    shooting_stats_df =pd.DataFrame()
-    passing_stats_df = pd.DataFrame()
-    passing_types_stats_df = pd.DataFrame()
-    goal_creation_stats_df = pd.DataFrame()
-    defense_stats_df = pd.DataFrame()
-    possession_stats_df = pd.DataFrame()
-    playing_time_stats_df = pd.DataFrame()
-    miscellaneous_stats_df = pd.DataFrame()
-
-    for team_data in raw_data['data']:
-        team_id = team_data['meta_data']['team_id']
-        team_name = team_data['meta_data']['team_name']
-        
-        general_stats = pd.json_normalize(team_data["stats"]["stats"])
-        general_stats['team_id'] = team_id
-        general_stats['team_name'] = team_name
-        general_stats_df = pd.concat([general_stats_df, general_stats], ignore_index=True)
+sys.path.append(str(Path(__file__).resolve().parent.parent.parent))
+from src.transform.stream import ColumnBuffer, flatten_record, iter_records
+from src.transform.store import open_writer, PROCESSED_FORMAT
+from src.transform.dtypes import memory_report
+from src.extract.extract_team_stats import team_stats_file
 
-        
-        keeper_stats = pd.json_normalize(team_data["stats"]["keepers"])
-        keeper_stats['team_id'] = team_id
-        keeper_stats['team_name'] = team_name
-        keeper_stats_df = pd.concat([keeper_stats_df, keeper_stats], ignore_index=True)
-        
-        keeper_stats_advanced = pd.json_normalize(team_data["stats"]["keepersadv"])
-        keeper_stats_advanced['team_id'] = team_id
-        keeper_stats_advanced['team_name'] = team_name
-        keeper_stats_advanced_df = pd.concat([keeper_stats_advanced_df, keeper_stats_advanced], ignore_index=True)
+# (key under team_data['stats'], output table name)
+TEAM_SECTIONS = [
+    ('stats', 'general_stats'),
+    ('keepers', 'keeper_stats'),
+    ('keepersadv', 'keeper_stats_advanced'),
+    ('shooting', 'shooting_stats'),
+    ('passing', 'passing_stats'),
+    ('passing_types', 'passing_types_stats'),
+    ('gca', 'goal_creation_stats'),
+    ('defense', 'defense_stats'),
+    ('possession', 'possession_stats'),
+    ('playingtime', 'playing_time_stats'),
+    ('misc', 'miscellaneous_stats'),
+]
 
-        shooting_stats = pd.json_normalize(team_data["stats"]["shooting"])
-        shooting_stats['team_id'] = team_id
-        shooting_stats['team_name'] = team_name
-        shooting_stats_df = pd.concat([shooting_stats_df, shooting_stats], ignore_index=True)
-
-        passing_stats = pd.json_normalize(team_data["stats"]["passing"])
-        passing_stats['team_id'] = team_id
-        passing_stats['team_name'] = team_name
-        passing_stats_df = pd.concat([passing_stats_df, passing_stats], ignore_index=True)
+def append_team_sections(buffers, team_data, sections=TEAM_SECTIONS):
+    """
+    Adds one team's rows to the per-section buffers.
+    """
+    meta = {
+        'team_id': team_data['meta_data']['team_id'],
+        'team_name': team_data['meta_data']['team_name'],
+    }
+    for key, table_name in sections:
+        records = team_data['stats'].get(key)
+        if records is None:
+            continue
+        if isinstance(records, dict):
+            records = [records]
+        for record in records:
+            row = flatten_record(record)
+            row.update(meta)
+            buffers[table_name].append(row)
 
-        passing_types_stats = pd.json_normalize(team_data["stats"]["passing_types"])
-        passing_types_stats['team_id'] = team_id
-        passing_types_stats['team_name'] = team_name
-        passing_types_stats_df = pd.concat([passing_types_stats_df, passing_types_stats], ignore_index=True)
+def transform_team_section(section, teams):
+    """
+    Normalises a single stats section for a list of teams. Runs in a worker
+    process when transform_team_stats is given workers > 1.
+    """
+    table_name = section[1]
+    buffers = {table_name: ColumnBuffer()}
+    for team_data in teams:
+        append_team_sections(buffers, team_data, [section])
+    return buffers[table_name].to_frame()
 
-        goal_creation_stats = pd.json_normalize(team_data["stats"]["gca"])
-        goal_creation_stats['team_id'] = team_id
-        goal_creation_stats['team_name'] = team_name
-        goal_creation_stats_df = pd.concat([goal_creation_stats_df, goal_creation_stats], ignore_index=True)
+def transform_team_stats(input_file=None,
+                         output_dir='data/processed/team_stats', chunk_size=None, workers=1,
+                         league_id='9', season_id='2024-2025', fmt=PROCESSED_FORMAT):
+    """
+    Transforms raw team statistics into structured data.
 
-        defense_stats = pd.json_normalize(team_data["stats"]["defense"])
-        defense_stats['team_id'] = team_id
-        defense_stats['team_name'] = team_name
-        defense_stats_df = pd.concat([defense_stats_df, defense_stats], ignore_index=True)
+    Args:
+        input_file (str): team-season-stats JSON (or NDJSON with one team per line), plain or
+            .gz. Defaults to the stored raw file of the league season (see team_stats_file).
+        output_dir (str): Directory where the section tables are saved.
+        chunk_size (int): If set, teams are streamed from disk and written out
+            this many at a time instead of being held in memory.
+        workers (int): If above 1, each stats section is normalised in its own
+            worker process. The output matches a serial run.
+        league_id (str), season_id (str): Partition the Parquet output is written to.
+        fmt (str): 'parquet' (partitioned by league/season/section) or 'csv'.
 
-        possession_stats = pd.json_normalize(team_data["stats"]["possession"])
-        possession_stats['team_id'] = team_id
-        possession_stats['team_name'] = team_name
-        possession_stats_df = pd.concat([possession_stats_df, possession_stats], ignore_index=True)
+    Returns:
+        dict: Table name -> DataFrame, or table name -> rows written when
+        chunk_size is set. None if the input is missing or invalid.
+    """
+    input_file = input_file or team_stats_file(league_id, season_id)
+    writers = {table_name: open_writer(output_dir, table_name, league_id, season_id, fmt)
+               for _, table_name in TEAM_SECTIONS}
+    buffers = {table_name: ColumnBuffer() for table_name in writers}
+    buffered_teams = 0
+    pending_teams = []
+    frames = {}
+    executor = ProcessPoolExecutor(max_workers=workers) if workers > 1 else None
 
-        playing_time_stats = pd.json_normalize(team_data["stats"]["playingtime"])
-        playing_time_stats['team_id'] = team_id
-        playing_time_stats['team_name'] = team_name
-        playing_time_stats_df = pd.concat([playing_time_stats_df, playing_time_stats], ignore_index=True)
+    def flush():
+        if executor is not None:
+            results = executor.map(transform_team_section, TEAM_SECTIONS, [pending_teams] * len(TEAM_SECTIONS))
+            for (_, table_name), df in zip(TEAM_SECTIONS, results):
+                frames[table_name] = df
+                writers[table_name].write(df)
+            pending_teams.clear()
+            return
+        for table_name, buffer in buffers.items():
+            frames[table_name] = buffer.to_frame()
+            writers[table_name].write(frames[table_name])
+            buffers[table_name] = ColumnBuffer()
 
-        miscellaneous_stats = pd.json_normalize(team_data["stats"]["misc"])
-        miscellaneous_stats['team_id'] = team_id
-        miscellaneous_stats['team_name'] = team_name
-        miscellaneous_stats_df = pd.concat([miscellaneous_stats_df, miscellaneous_stats], ignore_index=True)
+    try:
+        for team_data in iter_records(input_file, 'data'):
+            if executor is not None:
+                pending_teams.append(team_data)
+            else:
+                append_team_sections(buffers, team_data)
+            buffered_teams += 1
+            if chunk_size and buffered_teams >= chunk_size:
+                flush()
+                buffered_teams = 0
+        flush()
+    except FileNotFoundError:
+        print(f"Error: The file '{input_file}' was not found.")
+        return None
+    except json.JSONDecodeError:
+        print(f"Error: The file '{input_file}' is not a valid JSON.")
+        return None
+    finally:
+        if executor is not None:
+            executor.shutdown()
 
-    os.makedirs('data/processed/team_stats', exist_ok=True)
-    general_stats_df.to_csv('data/processed/team_stats/general_stats.csv', index=False)
-    keeper_stats_df.to_csv('data/processed/team_stats/keeper_stats.csv', index=False)
-    keeper_stats_advanced_df.to_csv('data/processed/team_stats/keeper_stats_advanced.csv', index=False)
-    shooting_stats_df.to_csv('data/processed/team_stats/shooting_stats.csv', index=False)
-    passing_stats_df.to_csv('data/processed/team_stats/passing_stats.csv', index=False)
-    passing_types_stats_df.to_csv('data/processed/team_stats/passing_types_stats.csv', index=False)
-    goal_creation_stats_df.to_csv('data/processed/team_stats/goal_creation_stats.csv', index=False)
-    defense_stats_df.to_csv('data/processed/team_stats/defense_stats.csv', index=False)
-    possession_stats_df.to_csv('data/processed/team_stats/possession_stats.csv', index=False)
-    playing_time_stats_df.to_csv('data/processed/team_stats/playing_time_stats.csv', index=False)
-    miscellaneous_stats_df.to_csv('data/processed/team_stats/miscellaneous_stats.csv', index=False)
-    print("Data transformation complete. Processed files saved in 'data/processed/team_stats' directory.")
+    print(f"Data transformation complete. Processed files saved in '{output_dir}' directory.")
 
-    return {
-        'general_stats': general_stats_df,
-        'keeper_stats': keeper_stats_df,
-        'keeper_stats_advanced': keeper_stats_advanced_df,
-        'shooting_stats': shooting_stats_df,
-        'passing_stats': passing_stats_df,
-        'passing_types_stats': passing_types_stats_df,
-        'goal_creation_stats': goal_creation_stats_df,
-        'defense_stats': defense_stats_df,
-        'possession_stats': possession_stats_df,
-        'playing_time_stats': playing_time_stats_df,
-        'miscellaneous_stats': miscellaneous_stats_df
-    }
+    if chunk_size:
+        return {table_name: writer.rows for table_name, writer in writers.items()}
+    memory_report(frames, 'Team stats memory')
+    return frames
 
 if __name__ == "__main__":
     transform_team_stats()
-        
\ No newline at end of file
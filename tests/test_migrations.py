@@ -0,0 +1,40 @@
+import sys
+from pathlib import Path
+
+import pytest
+
+sys.path.append(str(Path(__file__).resolve().parent.parent))
+from src.load.migrations import plan_migration, wider_type
+
+@pytest.mark.parametrize('current, inferred, expected', [
+    ('smallint', 'smallint', None),
+    ('integer', 'smallint', None),
+    ('smallint', 'integer', 'INTEGER'),
+    ('integer', 'bigint', 'BIGINT'),
+    ('real', 'smallint', None),
+    ('real', 'double precision', 'DOUBLE PRECISION'),
+    ('real', 'integer', 'DOUBLE PRECISION'),
+    ('integer', 'real', 'DOUBLE PRECISION'),
+    ('bigint', 'real', 'NUMERIC'),
+    ('double precision', 'bigint', 'NUMERIC'),
+    ('boolean', 'smallint', 'TEXT'),
+    ('numeric', 'text', 'TEXT'),
+    ('TEXT', 'BIGINT', None),
+    ('double precision', 'real', None),
+])
+def test_wider_type(current, inferred, expected):
+    assert wider_type(current, inferred) == expected
+
+def test_wider_type_ignores_types_it_does_not_create():
+    assert wider_type('timestamp with time zone', 'text') is None
+
+def test_plan_migration_adds_and_widens_columns():
+    existing = {'team_id': 'text', 'gls': 'smallint', 'xg': 'real', 'old_col': 'integer'}
+    column_types = {'team_id': 'TEXT', 'Gls': 'INTEGER', 'xg': 'REAL', 'npxg': 'DOUBLE PRECISION'}
+    assert plan_migration(existing, column_types) == [
+        {'change': 'widen', 'column': 'gls', 'old_type': 'smallint', 'new_type': 'INTEGER'},
+        {'change': 'add_column', 'column': 'npxg', 'old_type': None, 'new_type': 'DOUBLE PRECISION'},
+    ]
+
+def test_plan_migration_never_narrows():
+    assert plan_migration({'min': 'bigint', 'xg': 'double precision'}, {'min': 'SMALLINT', 'xg': 'REAL'}) == []
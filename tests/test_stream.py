@@ -0,0 +1,28 @@
+import json
+import sys
+from pathlib import Path
+
+import pytest
+
+sys.path.append(str(Path(__file__).resolve().parent.parent))
+from src.transform.stream import iter_json_array
+
+DOCUMENTS = [
+    '{"players": [-2.5e-3, 12]}',
+    '{"meta": 1.25E+10, "players": [{"xg": -0.75, "min": 900}, 3.0e-2, true, null, "a,b"]}',
+    '{ "players" : [ 1e5 , -0.0 ,  7 ] }',
+]
+
+@pytest.mark.parametrize('document', DOCUMENTS)
+@pytest.mark.parametrize('read_size', range(1, 9))
+def test_values_split_at_read_boundaries(tmp_path, document, read_size):
+    path = tmp_path / 'players_stats.json'
+    path.write_text(document)
+    assert list(iter_json_array(str(path), 'players', read_size)) == json.loads(document)['players']
+
+@pytest.mark.parametrize('read_size', range(1, 9))
+def test_malformed_number_is_rejected(tmp_path, read_size):
+    path = tmp_path / 'players_stats.json'
+    path.write_text('{"players": [1.5x, 2]}')
+    with pytest.raises(json.JSONDecodeError):
+        list(iter_json_array(str(path), 'players', read_size))